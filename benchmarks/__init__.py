@@ -0,0 +1,10 @@
+'''
+Speed benchmarks for the order book, predictors, signals and full runs, and the import time
+of the simulation modules.
+
+    python -m benchmarks                      # quick set, print a table
+    python -m benchmarks --out results.json   # also write JSON results
+    python -m benchmarks --save-baseline      # store results as benchmarks/baseline.json
+    python -m benchmarks --compare            # compare against the stored baseline
+    python -m benchmarks --full --filter book # include the 100k-step runs; only book benchmarks
+'''
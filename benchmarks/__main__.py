@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+
+import benchmarks.imports
+import benchmarks.micro
+import benchmarks.macro
+
+from benchmarks import harness
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Run the mmabm benchmarks.')
+    parser.add_argument('--filter', help='only benchmarks whose name contains this')
+    parser.add_argument('--full', action='store_true', help='include the long (100k-step) runs')
+    parser.add_argument('--repeat', type=int, help='override the number of repeats')
+    parser.add_argument('--out', help='write the results as JSON to this file')
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE, metavar='FILE',
+                        help='store the results as the baseline (default: %(const)s)')
+    parser.add_argument('--compare', nargs='?', const=BASELINE, metavar='FILE',
+                        help='compare with a baseline (default: %(const)s)')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change reported as slower/faster')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit 1 if any benchmark is slower')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit')
+    args = parser.parse_args(argv)
+    selected = harness.select(args.filter, args.full)
+    if args.list:
+        for b in selected:
+            print('%-40s %s' % (b.name, b.group))
+        return 0
+    results = harness.run_all(selected, args.repeat)
+    if args.out:
+        harness.save(results, args.out)
+    if args.save_baseline:
+        harness.save(results, args.save_baseline)
+    if args.compare:
+        rows = harness.compare(results, harness.load(args.compare), args.threshold)
+        print(harness.format_comparison(rows))
+        if args.out:
+            results['comparison'] = [dict(zip(('name', 'baseline', 'new', 'ratio', 'status'), r)) for r in rows]
+            harness.save(results, args.out)
+        if args.fail_on_regression and any(r[4] == 'slower' for r in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+'''
+Benchmark registry, timer, JSON results and baseline comparison.
+
+A benchmark is a setup function that returns a zero-argument callable; setup runs outside
+the timer before every repeat, so each timed call starts from the same fresh state. A
+measured benchmark's callable returns its own time in seconds (e.g. one measured in a
+subprocess), which is recorded instead of the time of the call.
+'''
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+REGISTRY = []
+
+
+class Benchmark:
+
+    def __init__(self, name, group, setup, ops=1, repeat=5, full=False, measured=False):
+        self.name = name
+        self.group = group
+        self.setup = setup
+        self.ops = ops
+        self.repeat = repeat
+        self.full = full
+        self.measured = measured
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1}, {2})'.format(class_name, self.name, self.group)
+
+    def run(self, repeat=None):
+        '''Return a result dict: min/median/mean seconds per call, seconds per op and ops/second'''
+        times = []
+        for _ in range(repeat or self.repeat):
+            fn = self.setup()
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                seconds = fn()
+                times.append(seconds if self.measured else time.perf_counter() - start)
+            finally:
+                gc.enable()
+        best = min(times)
+        return {'group': self.group, 'ops': self.ops, 'repeat': len(times), 'min': best,
+                'median': statistics.median(times), 'mean': statistics.mean(times),
+                'per_op': best / self.ops, 'ops_per_second': self.ops / best if best else None}
+
+
+def register(name, group, ops=1, repeat=5, full=False, measured=False):
+    '''Decorator: register a setup function as a Benchmark; full=True runs only with --full'''
+    def wrap(setup):
+        REGISTRY.append(Benchmark(name, group, setup, ops, repeat, full, measured))
+        return setup
+    return wrap
+
+def select(pattern=None, full=False):
+    return [b for b in REGISTRY if (full or not b.full) and (not pattern or pattern in b.name)]
+
+def run_all(benchmarks, repeat=None, log=print):
+    results = {}
+    for b in benchmarks:
+        results[b.name] = r = b.run(repeat)
+        log('%-40s %12.6f s  %14s ops/s' % (b.name, r['min'], '{:,.0f}'.format(r['ops_per_second'] or 0)))
+    return {'meta': metadata(), 'results': results}
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit or None, 'python': sys.version.split()[0],
+            'numpy': np.__version__, 'platform': platform.platform(), 'processor': platform.processor()}
+
+def save(results, filename):
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+def load(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+def compare(results, baseline, threshold=0.1):
+    '''
+    Return rows (name, baseline min, new min, ratio, status) for benchmarks in both;
+    status is 'slower' or 'faster' if the ratio is beyond 1 +/- threshold, else 'same'
+    '''
+    rows = []
+    for name, r in results['results'].items():
+        b = baseline['results'].get(name)
+        if b is None:
+            continue
+        ratio = r['min'] / b['min'] if b['min'] else float('inf')
+        status = 'slower' if ratio > 1 + threshold else 'faster' if ratio < 1 - threshold else 'same'
+        rows.append((name, b['min'], r['min'], ratio, status))
+    return rows
+
+def format_comparison(rows):
+    lines = ['%-40s %12s %12s %8s' % ('benchmark', 'baseline', 'new', 'ratio')]
+    for name, base, new, ratio, status in rows:
+        lines.append('%-40s %12.6f %12.6f %8.2f %s' % (name, base, new, ratio, '' if status == 'same' else status))
+    return '\n'.join(lines)
@@ -0,0 +1,35 @@
+'''
+Import benchmarks: the cumulative import time of each simulation module, as reported by
+python -X importtime in a fresh interpreter. The simulation modules import only the
+standard library and NumPy; pandas loads on the first h5 write.
+'''
+import os
+import subprocess
+import sys
+
+from benchmarks.harness import register
+
+
+MODULES = ('mmabm.orderbook', 'mmabm.trader', 'mmabm.genetics2', 'mmabm.signal2', 'mmabm.learner2', 'mmabm.runner2')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module):
+    '''Import module in a fresh interpreter; return {imported module: cumulative seconds}'''
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and not line.endswith('| imported package'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+def _import(module):
+    def setup():
+        return lambda: import_times(module)[module]
+    return setup
+
+for _module in MODULES:
+    register('import[%s]' % _module, 'imports', 1, repeat=5, measured=True)(_import(_module))
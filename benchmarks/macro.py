@@ -0,0 +1,50 @@
+'''
+Macro benchmarks: fixed-seed end-to-end runs (build, prime, run and write the h5 output)
+of runner.Runner and runner2.Runner. The 100k-step runs only run with --full.
+'''
+import os
+import random
+import shutil
+import tempfile
+import warnings
+
+import numpy as np
+
+import mmabm.runner as runner
+import mmabm.runner2 as runner2
+
+from benchmarks.harness import register
+
+
+SEED = 51
+STEPS = ((10000, False), (100000, True))
+
+# settings for runner.Runner, which takes them as keyword arguments
+RUNNER_SETTINGS = {'Provider': True, 'numProviders': 38, 'providerMaxQ': 1, 'pAlpha': 0.0375, 'pDelta': 0.025, 'qProvide': 0.5,
+                   'Taker': True, 'numTakers': 50, 'takerMaxQ': 1, 'tMu': 0.001,
+                   'InformedTrader': False, 'informedMaxQ': 1, 'informedRunLength': 1, 'iMu': 0.005,
+                   'PennyJumper': False, 'AlphaPJ': 0.05,
+                   'MarketMaker': True, 'NumMMs': 1, 'arrInt': 1, 'geneticInt': 250,
+                   'QTake': True, 'WhiteNoise': 0.001, 'CLambda': 10.0, 'Lambda0': 100}
+
+
+def _run(make_runner, steps):
+    def setup():
+        def fn():
+            tmpdir = tempfile.mkdtemp()
+            try:
+                random.seed(SEED)
+                np.random.seed(SEED)
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    make_runner(os.path.join(tmpdir, 'bench.h5'), steps).run()
+            finally:
+                shutil.rmtree(tmpdir)
+        return fn
+    return setup
+
+for _steps, _full in STEPS:
+    register('runner.run[steps=%d]' % _steps, 'macro', _steps, repeat=1, full=_full)(
+        _run(lambda h5, steps: runner.Runner(h5filename=h5, run_steps=steps, **RUNNER_SETTINGS), _steps))
+    register('runner2.run[steps=%d]' % _steps, 'macro', _steps, repeat=1, full=_full)(
+        _run(lambda h5, steps: runner2.Runner(h5filename=h5, run_steps=steps), _steps))
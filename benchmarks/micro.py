@@ -0,0 +1,204 @@
+'''
+Micro benchmarks: Orderbook add/cancel/match at several book depths (match also with
+Fills, Orderbook(fills=True)), Predictors
+match/forecast and new_genes at several population sizes, state matching by linear scan
+and by the condition trie (mmabm.trie), signal generation and one generation of several
+Predictors, serial and in a GeneticsPool (mmabm.gapool) of several sizes.
+'''
+import atexit
+import random
+
+import numpy as np
+
+from mmabm.config import Config
+from mmabm.gapool import GeneticsPool
+from mmabm.genetics2 import Predictors
+from mmabm.orderbook import Orderbook
+from mmabm.rng import RandomStreams, GENETICS
+from mmabm.shared import Side, OType
+from mmabm.trie import ConditionTrie, IndexedPredictors
+from mmabm.signal2 import ImbalanceSignal, OrderFlowSignal
+
+from benchmarks.harness import register
+
+
+ORDERS = 5000
+FORECASTS = 200
+DEPTHS = (10, 100, 1000)
+POPULATIONS = (100, 500, 2000)
+MATCH_POPULATIONS = (100, 1000, 10000)
+SIGNAL_STEPS = 10000
+GA_SETS = 8 # Predictors per generation: a cohort of 4 MarketMakers, 2 sets each
+GA_PROCESSES = (1, 2, 4, 8) # 1: serial
+GA_POPULATIONS = (100, 1000)
+
+BID = 999999
+ASK = 1000001
+
+
+def _order(order_id, otype, side, price, quantity=1, trader_id=1, timestamp=1):
+    return {'order_id': order_id, 'trader_id': trader_id, 'timestamp': timestamp, 'type': otype,
+            'quantity': quantity, 'side': side, 'price': price}
+
+def make_book(depth, per_level, fills=False):
+    '''An Orderbook with depth price levels of per_level one-lot orders on each side; return (book, resting orders)'''
+    book = Orderbook(fills)
+    resting = []
+    for i in range(depth):
+        for _ in range(per_level):
+            for side, price in ((Side.BID, BID - i), (Side.ASK, ASK + i)):
+                order = _order(len(resting) + 1, OType.ADD, side, price)
+                book.add_order_to_book(order)
+                resting.append(order)
+    return book, resting
+
+def _per_level(depth):
+    return max(2, ORDERS // depth + 1)
+
+def _book_add(depth):
+    def setup():
+        rng = random.Random(depth)
+        book, resting = make_book(depth, 2)
+        orders = [_order(len(resting) + i + 1, OType.ADD, side, BID - k if side == Side.BID else ASK + k)
+                  for i, (side, k) in enumerate((rng.choice((Side.BID, Side.ASK)), rng.randrange(depth)) for _ in range(ORDERS))]
+        def fn():
+            for order in orders:
+                book.process_order(order)
+        return fn
+    return setup
+
+def _book_cancel(depth):
+    def setup():
+        rng = random.Random(depth)
+        book, resting = make_book(depth, _per_level(depth))
+        cancels = [dict(order, type=OType.CANCEL) for order in rng.sample(resting, ORDERS)]
+        def fn():
+            for order in cancels:
+                book.process_order(order)
+        return fn
+    return setup
+
+def _book_match(depth, fills=False):
+    def setup():
+        book, resting = make_book(depth, _per_level(depth), fills)
+        takers = [_order(i + 1, OType.ADD, Side.BID, 2000000, trader_id=2) if i % 2 else
+                  _order(i + 1, OType.ADD, Side.ASK, 0, trader_id=2) for i in range(ORDERS)]
+        def fn():
+            for order in takers:
+                book.process_order(order)
+        return fn
+    return setup
+
+for _depth in DEPTHS:
+    register('book.add[depth=%d]' % _depth, 'orderbook', ORDERS, repeat=7)(_book_add(_depth))
+    register('book.cancel[depth=%d]' % _depth, 'orderbook', ORDERS, repeat=7)(_book_cancel(_depth))
+    register('book.match[depth=%d]' % _depth, 'orderbook', ORDERS, repeat=7)(_book_match(_depth))
+    register('book.match_fills[depth=%d]' % _depth, 'orderbook', ORDERS, repeat=7)(_book_match(_depth, True))
+
+
+def make_predictors(num_chroms, seed=7, predictors_class=Predictors, rng=None):
+    config = Config()
+    random.seed(seed)
+    np.random.seed(seed)
+    return predictors_class(num_chroms, config.oi_cond_len, config.oi_action_len, config.oi_cond_probs,
+                      config.oi_action_mutate_p, config.oi_cond_cross_p, config.oi_cond_mutate_p,
+                      config.oi_theta, config.oi_keep_pct, config.oi_symm, config.oi_weights, rng)
+
+def _states(n, length, seed=7):
+    rng = random.Random(seed)
+    return [''.join(rng.choice('01') for _ in range(length)) for _ in range(n)]
+
+def _predictors_forecast(num_chroms):
+    def setup():
+        predictors = make_predictors(num_chroms)
+        states = _states(FORECASTS, predictors._condition_len)
+        def fn():
+            for state in states:
+                predictors.get_forecast(state)
+                predictors.update_accuracies(1)
+        return fn
+    return setup
+
+def _predictors_new_genes(num_chroms):
+    def setup():
+        predictors = make_predictors(num_chroms)
+        rng = random.Random(num_chroms)
+        for c in predictors.predictors:
+            c.used = rng.randrange(3)
+            c.accuracy = rng.random()
+        return predictors.new_genes
+    return setup
+
+for _n in POPULATIONS:
+    register('predictors.forecast[n=%d]' % _n, 'predictors', FORECASTS, repeat=3)(_predictors_forecast(_n))
+    register('predictors.new_genes[n=%d]' % _n, 'predictors', 1, repeat=9)(_predictors_new_genes(_n))
+
+def _predictors_match(num_chroms, predictors_class):
+    def setup():
+        predictors = make_predictors(num_chroms, predictors_class=predictors_class)
+        rng = random.Random(num_chroms)
+        for c in predictors.predictors:
+            c.used = 1
+            c.accuracy = rng.random()
+        if predictors_class is IndexedPredictors:
+            predictors._index = ConditionTrie(predictors.predictors)
+        states = _states(FORECASTS, predictors._condition_len)
+        def fn():
+            for state in states:
+                predictors._match_state(state)
+        return fn
+    return setup
+
+for _n in MATCH_POPULATIONS:
+    register('predictors.match[n=%d]' % _n, 'predictors', FORECASTS, repeat=3, full=_n > 2000)(_predictors_match(_n, Predictors))
+    register('predictors.match_trie[n=%d]' % _n, 'predictors', FORECASTS, repeat=3, full=_n > 2000)(_predictors_match(_n, IndexedPredictors))
+
+
+_pools = {}
+
+def _close_pools():
+    for pool in _pools.values():
+        pool.close()
+
+atexit.register(_close_pools)
+
+def _ga_generation(num_chroms, processes):
+    def setup():
+        sets = []
+        for i in range(GA_SETS):
+            predictors = make_predictors(num_chroms, rng=RandomStreams(i).stream(GENETICS))
+            rng = random.Random(i)
+            for c in predictors.predictors:
+                c.used = rng.randrange(3)
+                c.accuracy = rng.random()
+            sets.append(predictors)
+        if processes not in _pools:
+            # the workers start once, as in a run; the first generation is not timed
+            _pools[processes] = pool = GeneticsPool(processes)
+            pool.new_genes([make_predictors(10, rng=RandomStreams(i).stream(GENETICS)) for i in range(GA_SETS)])
+        pool = _pools[processes]
+        return lambda: pool.new_genes(sets)
+    return setup
+
+for _n in GA_POPULATIONS:
+    for _p in GA_PROCESSES:
+        register('gapool.new_genes[n=%d,processes=%d]' % (_n, _p), 'gapool', GA_SETS, repeat=5,
+                 full=_n > 100 or _p > 4)(_ga_generation(_n, _p))
+
+
+def _signal(signal_class, inputs, hist_len):
+    def setup():
+        signal = signal_class(inputs, hist_len)
+        rng = random.Random(3)
+        values = [rng.randint(-5, 5) for _ in range(SIGNAL_STEPS)]
+        def fn():
+            for step, v in enumerate(values):
+                signal.update_v(v)
+                signal.make_signal(step)
+                signal.reset_current()
+        return fn
+    return setup
+
+_config = Config()
+register('signal.imbalance', 'signal', SIGNAL_STEPS)(_signal(ImbalanceSignal, _config.oi_signal, _config.oi_hist_len))
+register('signal.orderflow', 'signal', SIGNAL_STEPS)(_signal(OrderFlowSignal, _config.of_signal, _config.of_hist_len))
@@ -0,0 +1,114 @@
+'''
+Checkpoint and restore a runner2.Runner.
+
+A snapshot holds the whole Runner - the Orderbook books, lookup and unwritten collectors,
+every trader's local book, the MarketMakers' Predictors and signals, the q_take series,
+the RNG streams and current_time - plus the state of the global random and np.random
+generators (used when config.seed is None) and the number of rows already written to
+each table in the h5 file. It is a pickle compressed with zlib behind a short header.
+
+Restoring puts back the global RNG state and truncates the h5 tables to the recorded row
+counts (dropping anything written after the snapshot), so the restored Runner continues
+bit-identically to the run it was taken from:
+
+    market = checkpoint.load('run.h5.ckpt')
+    market.finish()
+
+or, from the command line, python -m mmabm.checkpoint run.h5.ckpt
+'''
+import io
+import os
+import pickle
+import random
+import sys
+import zlib
+
+import numpy as np
+
+
+MAGIC = b'MMABMCK1'
+
+_MODULES = {'random': random, 'np.random': np.random}
+_MODULE_IDS = {id(m): k for k, m in _MODULES.items()}
+
+
+class _Pickler(pickle.Pickler):
+    # random and np.random are held by agents in place of a RandomStream; save a reference
+    def persistent_id(self, obj):
+        return _MODULE_IDS.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        return _MODULES[pid]
+
+
+def h5_rows(h5filename):
+    '''Return {key: rows} for the tables in h5filename ({} if there is no file)'''
+    import pandas as pd
+    if not os.path.exists(h5filename):
+        return {}
+    with pd.HDFStore(h5filename, 'r') as store:
+        return {key: store.get_storer(key).nrows for key in store.keys()}
+
+def truncate_h5(h5filename, rows):
+    '''Truncate the tables in h5filename to rows ({key: rows}); remove tables not in rows'''
+    import pandas as pd
+    current = h5_rows(h5filename)
+    for key, n in rows.items():
+        if current.get(key, 0) < n:
+            raise ValueError('{0} has {1} rows in {2}; the checkpoint expects {3}'.format(key, current.get(key, 0), h5filename, n))
+    if current == rows:
+        return
+    with pd.HDFStore(h5filename, 'a') as store:
+        for key, n in current.items():
+            if not rows.get(key):
+                store.remove(key)
+            elif n > rows[key]:
+                store.remove(key, start=rows[key])
+
+def dumps(runner, level=6):
+    '''Return a snapshot of runner as bytes'''
+    state = {'runner': runner, 'random': random.getstate(), 'np_random': np.random.get_state(),
+             'h5_rows': h5_rows(runner.h5filename)}
+    buffer = io.BytesIO()
+    _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(state)
+    return MAGIC + zlib.compress(buffer.getvalue(), level)
+
+def loads(data, h5filename=None, truncate=True):
+    '''
+    Return the Runner in snapshot data and reset the global random and np.random state.
+
+    h5filename redirects the output to another file; truncate=False leaves the h5 file alone.
+    '''
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not an mmabm checkpoint')
+    state = _Unpickler(io.BytesIO(zlib.decompress(data[len(MAGIC):]))).load()
+    runner = state['runner']
+    if h5filename is not None:
+        runner.h5filename = h5filename
+    if truncate and state['h5_rows']:
+        truncate_h5(runner.h5filename, state['h5_rows'])
+    random.setstate(state['random'])
+    np.random.set_state(state['np_random'])
+    return runner
+
+def save(runner, filename):
+    '''Write a snapshot of runner to filename (atomically)'''
+    part = filename + '.part'
+    with open(part, 'wb') as f:
+        f.write(dumps(runner))
+    os.replace(part, filename)
+
+def load(filename, h5filename=None, truncate=True):
+    '''Return the Runner saved in filename; see loads'''
+    with open(filename, 'rb') as f:
+        return loads(f.read(), h5filename, truncate)
+
+
+if __name__ == '__main__':
+
+    for filename in sys.argv[1:]:
+        market = load(filename)
+        print('Resuming {0} at step {1} of {2}'.format(market.h5filename, market.current_time, market.run_steps - 1))
+        market.finish()
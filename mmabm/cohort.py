@@ -0,0 +1,153 @@
+'''
+Many MarketMakers' Predictors evaluated together.
+
+PredictorCohort stacks the populations of several Predictors - one per MarketMaker - as
+MM x chromosome arrays: the condition as two bitmasks (the bits that must match and their
+values), strategy, accuracy and theta. Matching a state, the forecasts and the accuracy
+updates of every member are one numpy call each. The Chromosome objects stay the members':
+accuracy updates are written back to the chromosomes they touch, each member's current list
+is set by forecast(), and the GA runs per member as before (Predictors.new_genes) - reload()
+restacks that member's row afterwards.
+
+MarketMakerCohort puts a group of MarketMakerL in the trader list as one trader. When the
+group is due, every member learns from and forecasts the same market state and quotes
+against the same top of book; each member's new quotes are part of the top of book the next
+member sees, so members never cross each other. With one member a run is the same as
+without the cohort. Config(cohort=True) groups the Runner's MarketMakers; with
+ga_processes the GA generations of the members due are run together in a
+gapool.GeneticsPool.
+'''
+import numpy as np
+
+from mmabm.shared import Side, TType
+
+
+def _masks(condition):
+    '''(care, value) bitmasks of a condition string of '0', '1' and '2' (don't care)'''
+    care = int(''.join('0' if x == '2' else '1' for x in condition), 2)
+    value = int(condition.replace('2', '0'), 2)
+    return care, value
+
+
+class PredictorCohort:
+
+    def __init__(self, members):
+        self.members = list(members)
+        if self.members[0]._condition_len > 63:
+            raise ValueError('conditions longer than 63 bits do not fit the bitmasks')
+        self._allocate(max(len(m.predictors) for m in self.members))
+        self._chroms = [None] * len(self.members)
+        for i in range(len(self.members)):
+            self.reload(i)
+
+    def _allocate(self, width):
+        # one row per member; the columns past a member's population are never valid
+        shape = (len(self.members), width)
+        self._valid = np.zeros(shape, dtype=bool)
+        self._care = np.zeros(shape, dtype=np.int64)
+        self._value = np.zeros(shape, dtype=np.int64)
+        self._strategy = np.zeros(shape)
+        self._accuracy = np.zeros(shape)
+        self._theta = np.zeros(shape)
+        self._current = np.zeros(shape, dtype=bool)
+
+    def reload(self, i):
+        '''Restack member i's predictors, e.g. after its new_genes()'''
+        chroms = self._chroms[i] = list(self.members[i].predictors)
+        n = len(chroms)
+        if n > self._care.shape[1]:
+            self._allocate(n)
+            for j in range(len(self.members)):
+                if j != i and self._chroms[j] is not None:
+                    self.reload(j)
+        self._valid[i] = False
+        self._valid[i, :n] = True
+        self._care[i, :n], self._value[i, :n] = zip(*[_masks(c.condition) for c in chroms])
+        self._strategy[i, :n] = [c.strategy for c in chroms]
+        self._accuracy[i, :n] = [c.accuracy for c in chroms]
+        self._theta[i, :n] = [c.theta for c in chroms]
+        self._current[i] = False
+
+    def get_forecast(self, state):
+        '''Match state for every member, set their current chromosomes, return their forecasts'''
+        match = self._valid & (((self._value ^ int(state, 2)) & self._care) == 0)
+        min_acc = np.where(match, self._accuracy, np.inf).min(axis=1, keepdims=True)
+        current = self._current = match & (self._accuracy == min_acc)
+        for m, chroms, row in zip(self.members, self._chroms, current):
+            m.current = [chroms[j] for j in np.flatnonzero(row)]
+        with np.errstate(invalid='ignore'):
+            return (self._strategy * current).sum(axis=1) / current.sum(axis=1)
+
+    def update_accuracies(self, actual):
+        '''Update the accuracy of every member's current chromosomes'''
+        current = self._current
+        theta = self._theta[current]
+        accuracy = (1 - theta) * self._accuracy[current] + theta * (actual - self._strategy[current]) ** 2
+        self._accuracy[current] = accuracy
+        for (i, j), a in zip(np.argwhere(current), accuracy.tolist()):
+            c = self._chroms[i][j]
+            c.used = 1
+            c.accuracy = a
+
+
+class MarketMakerCohort:
+    '''A group of MarketMakerL acting as one trader'''
+
+    trader_type = TType.MarketMaker
+
+    def __init__(self, members, genetics=None):
+        self.members = list(members)
+        self.genetics = genetics
+        self._oi = PredictorCohort([m._oi for m in self.members])
+        self._of = PredictorCohort([m._of for m in self.members])
+        self.cancel_collector = []
+        self.quote_collector = []
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1})'.format(class_name, [m.trader_id for m in self.members])
+
+    @property
+    def arrInt(self):
+        return self.members[0].arrInt
+
+    def process_signal1(self, step, signal):
+        '''MarketMakerL.process_signal1 for every member, with the Predictors evaluated together'''
+        self._oi.update_accuracies(signal[2])
+        self._of.update_accuracies(signal[4])
+        for m in self.members:
+            m._collect_signal(step, signal)
+        due = [i for i, m in enumerate(self.members) if not step % m._genetic_int]
+        if due:
+            self._new_genes(due)
+        self._oi.get_forecast(signal[3])
+        self._of.get_forecast(signal[5])
+        self.cancel_collector.clear()
+        for m in self.members:
+            m._update_quotes(step, signal)
+            self.cancel_collector.extend(m.cancel_collector)
+
+    def _new_genes(self, due):
+        predictors = [p for i in due for p in (self.members[i]._oi, self.members[i]._of)]
+        if self.genetics is None:
+            for p in predictors:
+                p.new_genes()
+        else:
+            self.genetics.new_genes(predictors)
+        for i in due:
+            self._oi.reload(i)
+            self._of.reload(i)
+
+    def process_signal2(self, step, tob_bid, tob_ask):
+        '''MarketMakerL.process_signal2 for every member, each seeing the quotes of those before it'''
+        self.cancel_collector.clear()
+        self.quote_collector.clear()
+        for m in self.members:
+            m.process_signal2(step, tob_bid, tob_ask)
+            for q in m.quote_collector:
+                if q['side'] == Side.BID:
+                    tob_bid = max(tob_bid, q['price'])
+                else:
+                    tob_ask = min(tob_ask, q['price'])
+            self.quote_collector.extend(m.quote_collector)
+            self.cancel_collector.extend(m.cancel_collector)
@@ -0,0 +1,179 @@
+import dataclasses
+
+from dataclasses import dataclass
+
+import mmabm.settings as settings
+
+
+# Trader kinds, as used by Config.routed
+TRADER_KINDS = ('provider', 'taker', 'informed', 'pennyjumper', 'marketmaker')
+
+
+@dataclass(frozen=True)
+class Config:
+    '''
+    Config is an immutable set of simulation parameters.
+
+    Field names are the lower case names in settings.py and the defaults are the
+    values in settings.py. Config is validated on creation and is hashable, so it can
+    be shipped to worker processes and used as a cache key.
+    Use replace() to make a modified copy.
+    '''
+    # Runner
+    mpi: int = settings.MPI
+    prime1: int = settings.PRIME1
+    run_steps: int = settings.RUN_STEPS
+    write_interval: int = settings.WRITE_INTERVAL
+    seed: int = settings.SEED
+    checkpoint_interval: int = settings.CHECKPOINT_INTERVAL
+    instrument: bool = settings.INSTRUMENT
+    latency: bool = settings.LATENCY
+    stats_window: int = settings.STATS_WINDOW
+    raw_output: bool = settings.RAW_OUTPUT
+    memory_budget: float = settings.MEMORY_BUDGET
+    fills: bool = settings.FILLS
+
+    # Venues
+    venues: tuple = tuple(settings.VENUES)
+    routed: tuple = tuple(settings.ROUTED)
+
+    # Provider
+    provider: bool = settings.PROVIDER
+    num_providers: int = settings.NUM_PROVIDERS
+    provider_maxq: int = settings.PROVIDER_MAXQ
+    provider_alpha: float = settings.PROVIDER_ALPHA
+    provider_delta: float = settings.PROVIDER_DELTA
+    q_provide: float = settings.Q_PROVIDE
+    skip_cancel: bool = settings.SKIP_CANCEL
+
+    # Taker
+    taker: bool = settings.TAKER
+    num_takers: int = settings.NUM_TAKERS
+    taker_maxq: int = settings.TAKER_MAXQ
+    taker_mu: float = settings.TAKER_MU
+    exogenous: bool = settings.EXOGENOUS
+    exogenous_cache: str = settings.EXOGENOUS_CACHE
+
+    # Informed
+    informed: bool = settings.INFORMED
+    informed_maxq: int = settings.INFORMED_MAXQ
+    informed_run_length: int = settings.INFORMED_RUN_LENGTH
+    informed_mu: float = settings.INFORMED_MU
+    informed_schedule: bool = settings.INFORMED_SCHEDULE
+
+    # Penny Jumper
+    pennyjumper: bool = settings.PENNYJUMPER
+    pj_alpha: float = settings.PJ_ALPHA
+    pj_batch: bool = settings.PJ_BATCH
+
+    # Market Maker
+    marketmaker: bool = settings.MARKETMAKER
+    num_mms: int = settings.NUM_MMS
+    cohort: bool = settings.COHORT
+    predictor_index: bool = settings.PREDICTOR_INDEX
+    ga_processes: int = settings.GA_PROCESSES
+    arr_int: int = settings.ARR_INT
+    mm_maxq: int = settings.MM_MAXQ
+    genetic_int: int = settings.GENETIC_INT
+
+    # Q-Take
+    q_take: bool = settings.Q_TAKE
+    whitenoise: float = settings.WHITENOISE
+    c_lambda: float = settings.C_LAMBDA
+    lambda0: float = settings.LAMBDA0
+
+    # Order Imbalance
+    oi_signal: tuple = tuple(settings.OI_SIGNAL)
+    oi_hist_len: int = settings.OI_HIST_LEN
+    oi_num_chroms: int = settings.OI_NUM_CHROMS
+    oi_action_len: int = settings.OI_ACTION_LEN
+    oi_cond_probs: tuple = tuple(settings.OI_COND_PROBS)
+    oi_action_mutate_p: float = settings.OI_ACTION_MUTATE_P
+    oi_cond_cross_p: float = settings.OI_COND_CROSS_P
+    oi_cond_mutate_p: float = settings.OI_COND_MUTATE_P
+    oi_theta: float = settings.OI_THETA
+    oi_keep_pct: float = settings.OI_KEEP_PCT
+    oi_symm: bool = settings.OI_SYMM
+    oi_weights: bool = settings.OI_WEIGHTS
+
+    # Order Flow
+    of_signal: tuple = tuple(settings.OF_SIGNAL)
+    of_hist_len: int = settings.OF_HIST_LEN
+    of_num_chroms: int = settings.OF_NUM_CHROMS
+    of_action_len: int = settings.OF_ACTION_LEN
+    of_cond_probs: tuple = tuple(settings.OF_COND_PROBS)
+    of_action_mutate_p: float = settings.OF_ACTION_MUTATE_P
+    of_cond_cross_p: float = settings.OF_COND_CROSS_P
+    of_cond_mutate_p: float = settings.OF_COND_MUTATE_P
+    of_theta: float = settings.OF_THETA
+    of_keep_pct: float = settings.OF_KEEP_PCT
+    of_symm: bool = settings.OF_SYMM
+    of_weights: bool = settings.OF_WEIGHTS
+
+    def __post_init__(self):
+        for name in ('venues', 'routed', 'oi_signal', 'oi_cond_probs', 'of_signal', 'of_cond_probs'):
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+        self._validate()
+
+    @property
+    def oi_cond_len(self):
+        return len(self.oi_signal)
+
+    @property
+    def of_cond_len(self):
+        return len(self.of_signal)
+
+    def replace(self, **changes):
+        '''Return a new (validated) Config with changes applied'''
+        return dataclasses.replace(self, **changes)
+
+    def to_dict(self):
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, d):
+        '''Make a Config from a dict of field values; unknown keys raise ValueError'''
+        unknown = set(d) - {f.name for f in dataclasses.fields(cls)}
+        if unknown:
+            raise ValueError('Unknown config fields: {0}'.format(sorted(unknown)))
+        return cls(**d)
+
+    def _validate(self):
+        for name in ('mpi', 'run_steps', 'write_interval', 'arr_int', 'genetic_int',
+                     'provider_maxq', 'taker_maxq', 'informed_maxq', 'informed_run_length', 'mm_maxq',
+                     'oi_hist_len', 'oi_action_len', 'of_hist_len', 'of_action_len'):
+            _check(getattr(self, name) >= 1, name, 'must be >= 1')
+        for name in ('prime1', 'checkpoint_interval', 'stats_window', 'memory_budget', 'ga_processes', 'num_providers', 'num_takers', 'num_mms'):
+            _check(getattr(self, name) >= 0, name, 'must be >= 0')
+        _check(self.prime1 < self.run_steps, 'prime1', 'must be less than run_steps')
+        for name in ('provider_delta', 'q_provide', 'pj_alpha', 'oi_action_mutate_p', 'oi_cond_cross_p',
+                     'oi_cond_mutate_p', 'oi_theta', 'of_action_mutate_p', 'of_cond_cross_p',
+                     'of_cond_mutate_p', 'of_theta'):
+            _check(0 <= getattr(self, name) <= 1, name, 'must be in [0, 1]')
+        for name in ('provider_alpha', 'taker_mu', 'informed_mu'):
+            _check(getattr(self, name) > 0, name, 'must be > 0')
+        for name in ('oi_keep_pct', 'of_keep_pct'):
+            _check(0 < getattr(self, name) <= 1, name, 'must be in (0, 1]')
+        for name in ('oi_num_chroms', 'of_num_chroms'):
+            _check(getattr(self, name) >= 2, name, 'must be >= 2')
+        for name in ('oi_cond_probs', 'of_cond_probs'):
+            probs = getattr(self, name)
+            _check(len(probs) == 3 and abs(sum(probs) - 1) < 1e-9, name, 'must be 3 probabilities summing to 1')
+        _check(self.oi_cond_len == 24, 'oi_signal', 'must have 24 thresholds')
+        _check(self.of_cond_len == 16, 'of_signal', 'must have 16 thresholds')
+        _check(not self.informed or self.informed_mu < 1, 'informed_mu', 'must be < 1')
+        _check(self.seed is None or self.seed >= 0, 'seed', 'must be None or >= 0')
+        _check(len(self.venues) >= 1 and len(set(self.venues)) == len(self.venues), 'venues', 'must be distinct names')
+        _check(set(self.routed) <= set(TRADER_KINDS), 'routed', 'must be trader kinds from {0}'.format(TRADER_KINDS))
+        _check(self.raw_output or self.stats_window, 'raw_output', 'can only be False with stats_window > 0')
+        _check(self.raw_output or not self.memory_budget, 'memory_budget', 'needs raw_output')
+        _check(not (self.exogenous and self.pennyjumper), 'exogenous', 'cannot be used with the pennyjumper')
+        _check(not self.ga_processes or (self.cohort and self.seed is not None), 'ga_processes',
+               'needs cohort=True and a seed')
+        _check(not (self.predictor_index and self.cohort), 'predictor_index',
+               'cannot be used with cohort (the cohort does its own matching)')
+
+
+def _check(ok, name, msg):
+    if not ok:
+        raise ValueError('{0} {1}'.format(name, msg))
@@ -0,0 +1,182 @@
+'''
+Several Orderbooks (venues) behind the Orderbook interface, with a consolidated quote.
+
+Exchange(venues) holds one Orderbook per venue; each book matches its own orders and keeps
+its own history, lookup and top-of-book reports. An order goes to its trader's home venue
+if the trader has one (Exchange.home) and is routed otherwise:
+
+marketable add   to the venue with the best price on the other side (the NBBO venue); the
+                 order matches in that book only - it is not split across venues
+resting add      to the venue with the worst price on the order's side, where the order is
+                 most likely to be alone at the top
+cancel / modify  to the venue whose book holds the order
+
+report_top_of_book() returns the consolidated top of book - the best bid and ask across
+venues, the total size at those prices and the venue of each - with the same keys as
+Orderbook.report_top_of_book plus bid_venue and ask_venue, so the Runner and its traders
+can use an Exchange in place of an Orderbook. The consolidated quote is kept incrementally:
+only the books that took an order since the last report are read, and the venues are only
+scanned when the venue at the best price moves away from it.
+
+Exchange(venues, fills=True) gives each venue an Orderbook(fills=True): trade_book and
+confirm_trade_collector hold Fills.
+
+Output: trades (all venues, with a venue column), tob (the consolidated quote) and
+orders_<venue> and tob_<venue> for each book.
+'''
+import operator
+
+from mmabm.orderbook import Orderbook, trade_rows
+from mmabm.shared import Side, OType
+
+
+class _Best:
+    '''Best price on one side across venues, the total size at it and the first venue with it'''
+
+    def __init__(self, venues, better):
+        self._venues = venues
+        self._better = better
+        self.prices = dict.fromkeys(venues)
+        self.sizes = dict.fromkeys(venues, 0)
+        self.price = None
+        self.size = 0
+        self.venue = None
+
+    def update(self, venue, price, size):
+        old_price, old_size = self.prices[venue], self.sizes[venue]
+        self.prices[venue] = price
+        self.sizes[venue] = size
+        best = self.price
+        if best is None or self._better(price, best):
+            self.price, self.size, self.venue = price, size, venue
+        elif price == best:
+            self.size += size - (old_size if old_price == best else 0)
+        elif old_price == best:
+            # venue left the best price: find the new best
+            self._scan()
+
+    def _scan(self):
+        self.price, self.size, self.venue = None, 0, None
+        for venue in self._venues:
+            price = self.prices[venue]
+            if price is None:
+                continue
+            if self.price is None or self._better(price, self.price):
+                self.price, self.size, self.venue = price, self.sizes[venue], venue
+            elif price == self.price:
+                self.size += self.sizes[venue]
+
+
+class ConsolidatedQuote:
+    '''Best bid and ask across venues, updated one venue's top of book at a time'''
+
+    def __init__(self, venues):
+        self.venues = tuple(venues)
+        self.bid = _Best(self.venues, operator.gt)
+        self.ask = _Best(self.venues, operator.lt)
+
+    def update(self, venue, tob):
+        '''Take venue's top of book (a dict from Orderbook.report_top_of_book)'''
+        self.bid.update(venue, tob['best_bid'], tob['bid_size'])
+        self.ask.update(venue, tob['best_ask'], tob['ask_size'])
+
+    def report(self, now_time):
+        bid, ask = self.bid, self.ask
+        return {'timestamp': now_time, 'best_bid': bid.price, 'best_ask': ask.price, 'bid_size': bid.size,
+                'ask_size': ask.size, 'bid_venue': bid.venue, 'ask_venue': ask.venue}
+
+
+class Exchange:
+
+    book_class = Orderbook
+
+    def __init__(self, venues=('A', 'B'), fills=False):
+        self.venues = tuple(venues)
+        self.fills = fills
+        self.books = {venue: self.book_class(fills=True) if fills else self.book_class() for venue in self.venues}
+        self.home = {}
+        self.quote = ConsolidatedQuote(self.venues)
+        self.confirm_trade_collector = []
+        self._sip_collector = []
+        self.trade_book = []
+        self.traded = False
+        self._stale = dict.fromkeys(self.venues)
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1})'.format(class_name, self.venues)
+
+    def route(self, order):
+        '''Return the venue for order'''
+        trader_id = order['trader_id']
+        venue = self.home.get(trader_id)
+        if venue is not None:
+            return venue
+        if order['type'] != OType.ADD:
+            for venue, book in self.books.items():
+                if order['order_id'] in book._lookup.get(trader_id, ()):
+                    return venue
+            raise KeyError('order {0} of trader {1} is not on any book'.format(order['order_id'], trader_id))
+        self._refresh(order['timestamp'])
+        bid, ask = self.quote.bid, self.quote.ask
+        if order['side'] == Side.BID:
+            if order['price'] >= ask.price:
+                return ask.venue
+            return min(self.venues, key=lambda v: (bid.prices[v] is not None, bid.prices[v] or 0))
+        if order['price'] <= bid.price:
+            return bid.venue
+        return max(self.venues, key=lambda v: (ask.prices[v] is None, ask.prices[v] or 0))
+
+    def process_order(self, order):
+        '''Route order and process it in its venue's book'''
+        venue = self.route(order)
+        book = self.books[venue]
+        book.process_order(order)
+        self._stale[venue] = None
+        self.traded = book.traded
+        if book.traded:
+            self.confirm_trade_collector = book.confirm_trade_collector
+            for t in book.trade_book:
+                t['venue'] = venue
+            self.trade_book.extend(book.trade_book)
+            book.trade_book.clear()
+
+    def _refresh(self, now_time):
+        # read the top of the books that changed since the last report
+        for venue in self._stale:
+            self.quote.update(venue, self.books[venue].report_top_of_book(now_time))
+        self._stale.clear()
+
+    def report_top_of_book(self, now_time):
+        '''Update and return the consolidated top of book'''
+        self._refresh(now_time)
+        tob = self.quote.report(now_time)
+        self._sip_collector.append(tob)
+        return tob
+
+    def clear_history(self):
+        '''Drop the order histories and top-of-book reports without writing them'''
+        for book in self.books.values():
+            book.clear_history()
+        self._sip_collector.clear()
+
+    def order_history_to_h5(self, filename):
+        '''Append each book's order history to orders_<venue> in an h5 file, clear them'''
+        for venue, book in self.books.items():
+            book.order_history_to_h5(filename, 'orders_%s' % venue)
+
+    def trade_book_to_h5(self, filename):
+        '''Append trade_book to an h5 file, clear the trade_book'''
+        import pandas as pd
+        temp_df = pd.DataFrame(trade_rows(self.trade_book) if self.fills else self.trade_book)
+        temp_df.to_hdf(filename, 'trades', append=True, format='table', data_columns=['timestamp'], complevel=5, complib='blosc')
+        self.trade_book.clear()
+
+    def sip_to_h5(self, filename):
+        '''Append the consolidated top of book to tob and each book's to tob_<venue>, clear them'''
+        import pandas as pd
+        temp_df = pd.DataFrame(self._sip_collector)
+        temp_df.to_hdf(filename, 'tob', append=True, format='table', data_columns=['timestamp'], complevel=5, complib='blosc')
+        self._sip_collector.clear()
+        for venue, book in self.books.items():
+            book.sip_to_h5(filename, 'tob_%s' % venue)
@@ -0,0 +1,154 @@
+'''
+The Takers' and the InformedTrader's orders for a whole run, drawn up front.
+
+Neither depends on the book: a Taker sends an order every delta_t steps, a buy with
+probability q_take[step]; the InformedTrader sends its one-sided orders at its delta_t
+steps. build(runner) draws all of them in one vectorized pass as arrays sorted by step -
+step, trader_id, side and quantity - from the run's EXOGENOUS stream (np.random without a
+seed). The draws differ from the Takers' own, so a run is the same in distribution, not
+draw for draw.
+
+Config(exogenous=True) leaves the Takers and the InformedTrader out of the Runner's trader
+list and puts each step's orders from the flow in their place: every step the Runner
+shuffles the other traders together with that step's orders instead of checking every
+Taker. A flow for a seeded run can be cached (Config.exogenous_cache, a directory) and is
+reused by runs with the same seed and exogenous parameters; an instrumented runner counts
+the cache's exogenous.hits and exogenous.misses.
+'''
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from mmabm.rng import EXOGENOUS
+from mmabm.shared import Side, TType
+
+
+# Config fields the flow depends on (with the seed)
+KEY_FIELDS = ('run_steps', 'prime1', 'taker', 'num_takers', 'taker_maxq', 'taker_mu', 'informed', 'informed_maxq',
+              'informed_run_length', 'informed_mu', 'informed_schedule', 'q_take', 'whitenoise', 'c_lambda', 'lambda0')
+
+_PRICE = {Side.BID: 2000000, Side.ASK: 0}
+
+
+class Order:
+    '''One order of the flow in the Runner's trader list: acts like a Taker whose turn it is'''
+
+    __slots__ = ('trader', 'side')
+
+    trader_type = TType.Taker
+    delta_t = 1 # every step is its step
+
+    def __init__(self, trader, side):
+        self.trader = trader
+        self.side = side
+
+    def process_signal(self, time, q_taker):
+        return self.trader._make_add_quote(time, self.side, _PRICE[self.side])
+
+
+class ExogenousFlow:
+
+    def __init__(self, step, trader_id, side, quantity):
+        order = np.lexsort((trader_id, step))
+        self.step = np.asarray(step, dtype=np.int64)[order]
+        self.trader_id = np.asarray(trader_id, dtype=np.int64)[order]
+        self.side = np.asarray(side, dtype=np.int8)[order]
+        self.quantity = np.asarray(quantity, dtype=np.int64)[order]
+        self._traders = {}
+        self._steps = self._sides = self._ids = []
+        self._cursor = 0
+
+    def __len__(self):
+        return len(self.step)
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1} orders)'.format(class_name, len(self))
+
+    def bind(self, traders, start):
+        '''Attach the traders (by trader_id) that send the orders; the next step is start'''
+        self._traders = {t.trader_id: t for t in traders}
+        self._cursor = int(np.searchsorted(self.step, start))
+        self._steps = self.step.tolist()
+        self._sides = [Side(s) for s in self.side.tolist()]
+        self._ids = self.trader_id.tolist()
+        return self
+
+    def orders(self, step):
+        '''The Orders for step; steps are taken in increasing order'''
+        steps = self._steps
+        i = self._cursor
+        while i < len(steps) and steps[i] < step:
+            i += 1
+        orders = []
+        while i < len(steps) and steps[i] == step:
+            orders.append(Order(self._traders[self._ids[i]], self._sides[i]))
+            i += 1
+        self._cursor = i
+        return orders
+
+    def save(self, filename):
+        part = filename + '.part'
+        with open(part, 'wb') as f:
+            np.savez(f, step=self.step, trader_id=self.trader_id, side=self.side, quantity=self.quantity)
+        os.replace(part, filename)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as f:
+            return cls(f['step'], f['trader_id'], f['side'], f['quantity'])
+
+
+def build(runner, start=None):
+    '''Draw the flow of runner's Takers and InformedTrader for steps start (default prime1) to the end'''
+    start = runner.prime1 if start is None else start
+    stop = runner.run_steps
+    steps, ids, sides, quantities = [], [], [], []
+    takers = runner.takers if runner.config.taker else []
+    for t in takers:
+        s = np.arange(-(-start // t.delta_t) * t.delta_t, stop, t.delta_t)
+        steps.append(s)
+        ids.append(np.full(len(s), t.trader_id))
+        quantities.append(np.full(len(s), t.quantity))
+    step = np.concatenate(steps) if steps else np.zeros(0, dtype=np.int64)
+    rng = np.random if runner._streams is None else runner._stream(EXOGENOUS)
+    buy = rng.random(len(step)) < np.asarray(runner.q_take)[step]
+    sides.append(np.where(buy, Side.BID.value, Side.ASK.value))
+    if runner.config.informed:
+        t = runner.informed_trader
+        s = np.array(sorted(x for x in t.delta_t if start <= x < stop), dtype=np.int64)
+        steps.append(s)
+        ids.append(np.full(len(s), t.trader_id))
+        sides.append(np.full(len(s), t._side.value))
+        quantities.append(np.full(len(s), t.quantity))
+    if not steps:
+        empty = np.zeros(0, dtype=np.int64)
+        return ExogenousFlow(empty, empty, empty, empty)
+    return ExogenousFlow(np.concatenate(steps), np.concatenate(ids), np.concatenate(sides), np.concatenate(quantities))
+
+def cache_key(config):
+    '''Key of the flow of a seeded config'''
+    fields = {name: getattr(config, name) for name in KEY_FIELDS}
+    fields['seed'] = config.seed
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:16]
+
+def _count(runner, name):
+    if runner.instrument is not None:
+        runner.instrument.counters[name] += 1
+
+def flow(runner):
+    '''The flow for runner: from config.exogenous_cache if there, else built (and cached if seeded)'''
+    config = runner.config
+    if config.exogenous_cache is None or config.seed is None:
+        return build(runner)
+    filename = os.path.join(config.exogenous_cache, 'exogenous_%s.npz' % cache_key(config))
+    if os.path.exists(filename):
+        _count(runner, 'exogenous.hits')
+        return ExogenousFlow.load(filename)
+    _count(runner, 'exogenous.misses')
+    f = build(runner)
+    os.makedirs(config.exogenous_cache, exist_ok=True)
+    f.save(filename)
+    return f
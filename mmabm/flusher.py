@@ -0,0 +1,130 @@
+'''
+A memory budget for long runs: the Runner's output collectors are written as they fill.
+
+Without it the trade book and the MarketMakers' cash flow and signal collectors grow until
+finalize() and the orders and top of book until each write_interval, so memory grows with
+the run length (or the write interval). Flusher(budget).attach(runner) registers each of the
+runner's collectors - orders, tob, trades, stats and each MarketMaker's mmp and signals -
+with its writer. Each collector gets an equal share of budget (MB). check(), called by the
+Runner after every step, writes a collector to the h5 file and clears it once its rows take
+more than its share: a collector's row size is estimated from its first row. The tables
+hold the same rows as without a budget, written in more, smaller appends, with two
+differences. With a budget, mmp rows from different MarketMakers can interleave. Orders and
+tob rows after the last write_interval can be written, which finalize() does not do without
+a budget. A small budget means many small appends, and h5 appends are slow: a budget should
+hold at least a few thousand rows per collector.
+
+report(step), at every write_interval and at the end, is the watchdog: it appends the
+rows held by each collector, the writes so far and the peak RSS of the process, as a line
+of JSON, to <h5filename>.flusher.jsonl.
+
+Runner(memory_budget=64) runs with a 64 MB budget (it needs raw_output).
+'''
+import json
+import sys
+
+try:
+    import resource
+except ImportError: # not on Windows
+    resource = None
+
+
+class _Collector:
+
+    __slots__ = ('name', 'owner', 'method', 'buffers', 'limit', 'writes')
+
+    def __init__(self, name, owner, method, buffers):
+        self.name = name
+        self.owner = owner
+        self.method = method
+        self.buffers = buffers
+        self.limit = None # rows, once the row size is known
+        self.writes = 0
+
+    def rows(self):
+        return sum(len(b) for b in self.buffers)
+
+
+def row_bytes(row):
+    '''Estimated size of a row (dict or slotted object) and its values'''
+    if isinstance(row, dict):
+        values = row.values()
+    else:
+        values = [getattr(row, name) for name in row.__slots__]
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in values)
+
+def peak_rss():
+    '''Peak resident set size of the process in MB (None if unknown)'''
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10 # bytes on macOS, KB elsewhere
+
+
+class Flusher:
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.collectors = []
+        self.runner = None
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1})'.format(class_name, self.budget)
+
+    def attach(self, runner):
+        '''Register runner's collectors; return self'''
+        self.runner = runner
+        exchange = runner.exchange
+        books = list(exchange.books.values()) if hasattr(exchange, 'books') else [exchange]
+        tob = [exchange._sip_collector] + [b._sip_collector for b in books if b is not exchange]
+        self.register('orders', exchange, 'order_history_to_h5', *[b.order_history for b in books])
+        self.register('tob', exchange, 'sip_to_h5', *tob)
+        self.register('trades', runner, '_trades_to_h5', exchange.trade_book)
+        if runner.stats is not None:
+            self.register('stats', runner.stats, 'windows_to_h5', runner.stats.windows)
+        for m in runner.marketmakers:
+            self.register('mmp_%d' % m.trader_id, m, 'mmProfitabilityToh5', m.cash_flow_collector)
+            self.register('signal_%d' % m.trader_id, m, 'signal_collector_to_h5', m.oi_signal_collector, m.of_signal_collector)
+        return self
+
+    def register(self, name, owner, method, *buffers):
+        '''Register the lists buffers, written by owner.<method>(h5filename) and cleared when they outgrow their share'''
+        self.collectors.append(_Collector(name, owner, method, buffers))
+        for c in self.collectors:
+            c.limit = None # the shares changed
+
+    def _limit(self, c):
+        for b in c.buffers:
+            if b:
+                share = self.budget * 2**20 / len(self.collectors)
+                c.limit = max(1, int(share // row_bytes(b[0])))
+                return c.limit
+        return None
+
+    def check(self):
+        '''Write and clear each collector holding more rows than its share of the budget'''
+        for c in self.collectors:
+            rows = c.rows()
+            if rows:
+                limit = c.limit or self._limit(c)
+                if rows > limit:
+                    self.write(c)
+
+    def write(self, c):
+        getattr(c.owner, c.method)(self.runner.h5filename)
+        for b in c.buffers:
+            b.clear()
+        c.writes += 1
+
+    def sizes(self):
+        '''{collector: rows held}'''
+        return {c.name: c.rows() for c in self.collectors}
+
+    def report(self, step):
+        '''Append the collector sizes, writes and peak RSS to <h5filename>.flusher.jsonl; return them'''
+        snap = {'step': step, 'rows': self.sizes(), 'writes': {c.name: c.writes for c in self.collectors},
+                'peak_rss_mb': peak_rss()}
+        with open(self.runner.h5filename + '.flusher.jsonl', 'a') as f:
+            f.write(json.dumps(snap) + '\n')
+        return snap
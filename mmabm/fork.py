@@ -0,0 +1,169 @@
+'''
+Run scenario branches from one burned-in market.
+
+The market is built, primed and run for a burn-in period once; each branch then continues
+a copy of it with its own Config changes (Runner.reconfigure) and its own output file. On
+platforms with fork() the branch workers are forked from the parent, so the burned-in
+market is shared copy-on-write and never serialized; elsewhere each worker loads a
+checkpoint snapshot (mmabm.checkpoint) of it. Every branch starts from the same state,
+including the random number generators, so a branch without changes reproduces the
+uninterrupted run.
+
+Each branch runs in its own process. A branch whose process dies (e.g. killed for memory)
+or runs past timeout seconds is recorded as failed; the other branches carry on.
+
+Example:
+    market = fork.burn_in(Config(run_steps=100000), 'trial/burnin.h5', 20000, seed=51)
+    fork.Fork(market, [{'arr_int': 1}, {'arr_int': 5}, {'taker_mu': 0.002}], 'trial').run()
+'''
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import shutil
+import time
+import traceback
+
+import numpy as np
+
+import mmabm.checkpoint as checkpoint
+import mmabm.runner2 as runner
+import mmabm.sweep as sweep
+
+
+_parent = None # the burned-in market, inherited by forked workers
+
+
+def burn_in(config, h5filename, steps, seed=None):
+    '''Build and prime a market and run it to step steps; seed reseeds random and np.random first'''
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    market = runner.Runner(h5filename=h5filename, config=config)
+    market.prime()
+    market.run_until(steps)
+    return market
+
+def run_branch(market, changes, h5filename):
+    '''Continue market (a copy owned by the caller) to the end with changes, writing to h5filename'''
+    part = h5filename + '.part'
+    if os.path.exists(market.h5filename):
+        shutil.copyfile(market.h5filename, part)
+    elif os.path.exists(part):
+        os.remove(part)
+    start = time.time()
+    market.h5filename = part
+    if market.instrument is not None:
+        market.instrument.filename = part + '.instrument.json'
+    market.reconfigure(**changes)
+    market.finish()
+    sweep.finish_part(part, h5filename)
+    return time.time() - start
+
+def _run_task(changes, h5filename, data, random_state):
+    try:
+        if data is None:
+            # the random module reseeds itself in a forked child
+            random.setstate(random_state)
+            market = _parent
+        else:
+            market = checkpoint.loads(data, truncate=False)
+        return run_branch(market, changes, h5filename), None
+    except Exception:
+        return None, traceback.format_exc()
+
+def _worker(conn, *args):
+    conn.send(_run_task(*args))
+    conn.close()
+
+
+class Fork:
+    '''
+    Fork runs branches (a list of dicts of Config changes) from market across a process pool.
+
+    Branch i writes <prefix>_<i>.h5 in out_dir. Each worker runs one branch and exits; a
+    branch still running after timeout seconds (None: no limit) is terminated.
+    '''
+
+    def __init__(self, market, branches, out_dir, prefix='branch', processes=None, timeout=None, log=print):
+        self.market = market
+        self.branches = [dict(b) for b in branches]
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.processes = processes or os.cpu_count()
+        self.timeout = timeout
+        self.log = log
+        self.results = []
+        # validate every branch before starting any work
+        for changes in self.branches:
+            market.config.replace(**changes)
+            bad = sorted(set(changes) - market.RECONFIGURABLE)
+            if bad:
+                raise ValueError('Cannot change {0} in a branch'.format(bad))
+
+    def filename(self, branch):
+        return os.path.join(self.out_dir, '%s_%03d.h5' % (self.prefix, branch))
+
+    def run(self):
+        global _parent
+        os.makedirs(self.out_dir, exist_ok=True)
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context, data = multiprocessing.get_context('fork'), None
+            _parent = self.market
+        else:
+            context, data = multiprocessing.get_context('spawn'), checkpoint.dumps(self.market)
+        self.log('Fork: %d branches from step %d, %d workers' % (len(self.branches), self.market.current_time, self.processes))
+        start = time.time()
+        random_state = random.getstate()
+        waiting = list(enumerate(self.branches))
+        running = {} # connection -> (branch, changes, process, start); the worker sends its result or dies
+        try:
+            while waiting or running:
+                while waiting and len(running) < self.processes:
+                    i, changes = waiting.pop(0)
+                    recv, send = context.Pipe(duplex=False)
+                    process = context.Process(target=_worker, args=(send, changes, self.filename(i), data, random_state))
+                    process.start()
+                    send.close()
+                    running[recv] = (i, changes, process, time.time())
+                for recv in multiprocessing.connection.wait(list(running), self._wait(running)):
+                    i, changes, process, started = running.pop(recv)
+                    try:
+                        seconds, error = recv.recv()
+                    except EOFError:
+                        process.join()
+                        seconds, error = None, 'worker exited with code %s' % process.exitcode
+                    self._finish(i, changes, process, recv, seconds, error)
+                if self.timeout is not None:
+                    now = time.time()
+                    for recv, (i, changes, process, started) in list(running.items()):
+                        if now - started > self.timeout:
+                            process.terminate()
+                            del running[recv]
+                            self._finish(i, changes, process, recv, None, 'timed out after %.1f seconds' % self.timeout)
+        finally:
+            for recv, (i, changes, process, started) in running.items():
+                process.terminate()
+                process.join()
+                recv.close()
+            _parent = None
+        self.results.sort(key=lambda r: r['branch'])
+        self.log('Fork finished in %.1f seconds' % (time.time() - start))
+        return self.results
+
+    def _wait(self, running):
+        if self.timeout is None:
+            return None
+        return max(0, min(started for i, changes, process, started in running.values()) + self.timeout - time.time())
+
+    def _finish(self, i, changes, process, recv, seconds, error):
+        '''Record branch i and reap its process'''
+        process.join()
+        recv.close()
+        status = 'done' if error is None else 'failed'
+        self.results.append({'branch': i, 'changes': changes, 'h5filename': self.filename(i),
+                             'seconds': seconds, 'status': status, 'error': error})
+        if error is None:
+            self.log('[%d/%d] branch %d %s: %.1f seconds' % (len(self.results), len(self.branches), i, changes, seconds))
+        else:
+            self.log('[%d/%d] branch %d %s failed\n%s' % (len(self.results), len(self.branches), i, changes, error))
@@ -0,0 +1,58 @@
+'''
+GA generations of many Predictors at once, in a process pool.
+
+GeneticsPool(processes).new_genes(predictors) runs new_genes() for each of the Predictors
+in worker processes and puts the results back in place: each Predictors gets its new
+population and the advanced state of its random stream. A Predictors draws only from its
+own stream, so the results are the same as calling new_genes() one after another - given
+seeded streams (Config.seed); the global random module is not shared with the workers.
+
+A cohort (mmabm.cohort) runs the generations of all its members and both their predictor
+sets in one call: Config(cohort=True, ga_processes=4, seed=...).
+
+The pool only pays off with a core free for each worker and generations that take much
+longer than sending the populations to the workers and back. A generation of a few hundred
+or thousand chromosomes takes milliseconds, and the pickling costs several times that, so
+with the default populations, or on fewer cores than processes, ga_processes=0 (serial) is
+faster. Measure first: python -m benchmarks --full --filter gapool times one generation of
+8 Predictors, serial (processes=1) and in pools of 2, 4 and 8, at 100 and 1000 chromosomes.
+'''
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _new_genes(p):
+    p.new_genes()
+    return p.predictors, p._rng, p._np_rng
+
+
+class GeneticsPool:
+
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count()
+        self._pool = None
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1})'.format(class_name, self.processes)
+
+    def __getstate__(self):
+        # the worker processes are not part of a checkpoint; they restart on first use
+        return {'processes': self.processes, '_pool': None}
+
+    def new_genes(self, predictors):
+        '''Run new_genes() for each of predictors (a list of Predictors)'''
+        if len(predictors) < 2 or self.processes == 1:
+            for p in predictors:
+                p.new_genes()
+            return
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        for p, (population, rng, np_rng) in zip(predictors, self._pool.map(_new_genes, predictors)):
+            p.predictors, p._rng, p._np_rng = population, rng, np_rng
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
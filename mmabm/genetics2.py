@@ -55,7 +55,9 @@ class Predictors:
     
     def __init__(self, num_chroms, condition_len, action_len, condition_probs, 
                  action_mutate_p, condition_cross_p, condition_mutate_p, 
-                 theta, keep_pct, symm, weights):
+                 theta, keep_pct, symm, weights, rng=None):
+        self._rng = random if rng is None else rng
+        self._np_rng = np.random if rng is None else rng
         self._num_chroms = num_chroms
         self._condition_len = condition_len
         self._action_len = action_len
@@ -72,10 +74,19 @@ class Predictors:
             self.new_genes = self._new_genes_wf
         self.current = []
 
+    def reconfigure(self, action_mutate_p, condition_cross_p, condition_mutate_p, keep_pct):
+        '''Change the GA parameters of an existing population'''
+        self._action_mutate_p = action_mutate_p
+        self._condition_cross_p = condition_cross_p
+        self._condition_mutate_p = condition_mutate_p
+        self._keep = int(keep_pct * self._num_chroms)
+        if self.new_genes == self._new_genes_wf:
+            self._weights = self._make_weights()
+
     def _make_predictors(self, condition_probs, theta, symm):
         while len(self.predictors) < self._num_chroms:
-            c = Chromosome(''.join(str(x) for x in np.random.choice(np.arange(0, 3), self._condition_len, p=condition_probs)),
-                           ''.join(str(x) for x in np.random.choice(np.arange(0, 2), self._action_len)), theta, symm)
+            c = Chromosome(''.join(str(x) for x in self._np_rng.choice(np.arange(0, 3), self._condition_len, p=condition_probs)),
+                           ''.join(str(x) for x in self._np_rng.choice(np.arange(0, 2), self._action_len)), theta, symm)
             if c not in self.predictors:
                 self.predictors.append(c)
 
@@ -110,14 +121,14 @@ class Predictors:
         pred_var = np.mean([p.accuracy for p in self.predictors]) # if p.used?
         while len(self.predictors) < self._num_chroms:
             # Choose two parents - uniform selection
-            p1, p2 = tuple(random.sample(self.predictors, 2))
+            p1, p2 = tuple(self._rng.sample(self.predictors, 2))
             parent_var = (p1.accuracy + p2.accuracy) / 2
             # Random uniform crossover for action
             c1_action, c2_action = self._cross(p1.action, p2.action, self._action_len)
             # Random mutation with p = a_mutate for each gene (bit) in action
             c1_action, c2_action = self._mutate(c1_action, c2_action, self._action_len, self._action_mutate_p, 2)
             # Random uniform crossover for condition with p = c_cross
-            if random.random() < self._condition_cross_p:
+            if self._rng.random() < self._condition_cross_p:
                 c1_condition, c2_condition = self._cross(p1.condition, p2.condition, self._condition_len)
             else:
                 c1_condition = p1.condition
@@ -133,14 +144,14 @@ class Predictors:
         pred_var = np.mean([p.accuracy for p in self.predictors]) # if p.used?
         while len(self.predictors) < self._num_chroms:
             # Choose two parents - weighted selection
-            p1, p2 = tuple(random.choices(self.predictors, cum_weights=self._weights, k=2))
+            p1, p2 = tuple(self._rng.choices(self.predictors, cum_weights=self._weights, k=2))
             parent_var = (p1.accuracy + p2.accuracy) / 2
             # Random uniform crossover for action
             c1_action, c2_action = self._cross(p1.action, p2.action, self._action_len)
             # Random mutation with p = a_mutate for each gene (bit) in action
             c1_action, c2_action = self._mutate(c1_action, c2_action, self._action_len, self._action_mutate_p, 2)
             # Random uniform crossover for condition with p = c_cross
-            if random.random() < self._condition_cross_p:
+            if self._rng.random() < self._condition_cross_p:
                 c1_condition, c2_condition = self._cross(p1.condition, p2.condition, self._condition_len)
             else:
                 c1_condition = p1.condition
@@ -167,16 +178,16 @@ class Predictors:
             self.predictors = sorted(used, key=attrgetter('accuracy'))[: self._keep]
     
     def _mutate(self, str1, str2, str_len, mutate_prob, str_rng):
-        m = np.random.random_sample((2, str_len))
+        m = self._np_rng.random_sample((2, str_len))
         for j in range(str_len):
             if m[0, j] < mutate_prob:
-                str1 = str1[:j] + str(random.randrange(str_rng)) + str1[j+1:]
+                str1 = str1[:j] + str(self._rng.randrange(str_rng)) + str1[j+1:]
             if m[1, j] < mutate_prob:
-                str2 = str2[:j] + str(random.randrange(str_rng)) + str2[j+1:]
+                str2 = str2[:j] + str(self._rng.randrange(str_rng)) + str2[j+1:]
         return str1, str2
 
     def _cross(self, str1, str2, str_len):
-        x = random.randrange(str_len)
+        x = self._rng.randrange(str_len)
         child1 = str1[:x] + str2[x:]
         child2 = str2[:x] + str1[x:]
         return child1, child2
@@ -0,0 +1,201 @@
+'''
+Golden-output comparison of a candidate implementation against the reference.
+
+Each comparison runs the reference and the candidate side by side on the same seeded input
+and returns the first Divergence (or None if they agree):
+
+compare_runners     two runner2.Runner classes, one step at a time: the step's trades, the
+                    top of book, each MarketMaker's quotes, cash flow and inventory and the
+                    chromosomes it chose
+compare_orderbooks  two Orderbook classes, one order at a time from a recorded order log:
+                    traded, trades, trade confirmations and top of book
+compare_predictors  two Predictors classes on a seeded series of states: forecasts, chosen
+                    chromosomes and the population after each GA generation
+
+Each side keeps its own copy of the global random and np.random state, swapped in around
+every call, so the two sides draw the same numbers however their calls interleave.
+runner_class() makes a Runner subclass with an alternative Orderbook or Predictors:
+
+    python -m mmabm.golden runner --exchange fastbook:FastOrderbook --steps 5000
+    python -m mmabm.golden predictors --candidate fastpred:BitPredictors
+    python -m mmabm.golden orderbook --candidate fastbook:FastOrderbook --orders abm.h5
+'''
+import argparse
+import random
+import sys
+
+import numpy as np
+
+import mmabm.replay as replay
+import mmabm.runner2 as runner2
+
+from mmabm.config import Config
+from mmabm.genetics2 import Predictors
+from mmabm.orderbook import Orderbook
+
+
+class Divergence:
+
+    def __init__(self, step, field, reference, candidate):
+        self.step = step
+        self.field = field
+        self.reference = reference
+        self.candidate = candidate
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1}, {2})'.format(class_name, self.step, self.field)
+
+    def __str__(self):
+        return 'first divergence at {0} in {1}:\n  reference: {2}\n  candidate: {3}'.format(
+            self.step, self.field, self.reference, self.candidate)
+
+
+class _Side:
+    '''One side's global random and np.random state'''
+
+    def __init__(self, seed):
+        outer = random.getstate(), np.random.get_state()
+        random.seed(seed)
+        np.random.seed(seed)
+        self._state = random.getstate(), np.random.get_state()
+        random.setstate(outer[0])
+        np.random.set_state(outer[1])
+
+    def run(self, fn, *args):
+        '''Call fn(*args) with this side's random state'''
+        outer = random.getstate(), np.random.get_state()
+        random.setstate(self._state[0])
+        np.random.set_state(self._state[1])
+        try:
+            return fn(*args)
+        finally:
+            self._state = random.getstate(), np.random.get_state()
+            random.setstate(outer[0])
+            np.random.set_state(outer[1])
+
+
+def _first(step, pairs):
+    for field, r, c in pairs:
+        if r != c:
+            return Divergence(step, field, r, c)
+    return None
+
+def _chromosomes(predictors):
+    return [(c.condition, c.action, c.accuracy) for c in predictors]
+
+
+def runner_class(exchange_class=None, predictors_class=None, base=runner2.Runner):
+    '''Return a subclass of base that uses exchange_class and/or predictors_class'''
+    attrs = {}
+    if exchange_class is not None:
+        attrs['exchange_class'] = exchange_class
+    if predictors_class is not None:
+        attrs['marketmaker_class'] = type('Candidate' + base.marketmaker_class.__name__, (base.marketmaker_class,),
+                                          {'predictors_class': predictors_class})
+    return type('Candidate' + base.__name__, (base,), attrs)
+
+def compare_runners(candidate, reference=runner2.Runner, config=None, steps=2000, seed=51):
+    '''Run reference and candidate (Runner classes) for steps steps; return the first Divergence or None'''
+    config = (config if config is not None else Config()).replace(run_steps=steps)
+    # no h5 output: write_interval is past the end of the run
+    config = config.replace(write_interval=config.run_steps + 1, checkpoint_interval=0)
+    sides = _Side(seed), _Side(seed)
+    runners = [side.run(cls, 'golden.h5', config) for side, cls in zip(sides, (reference, candidate))]
+    for side, r in zip(sides, runners):
+        side.run(r.prime)
+    d = _first('prime', [('top_of_book', runners[0].top_of_book, runners[1].top_of_book)])
+    if d:
+        return d
+    events = [r.events() for r in runners]
+    while True:
+        e1, e2 = [side.run(next, gen, None) for side, gen in zip(sides, events)]
+        if e1 is None or e2 is None:
+            return None if e1 is e2 else Divergence('end', 'steps', e1 and e1['step'], e2 and e2['step'])
+        pairs = [('trades', e1['trades'], e2['trades']), ('top_of_book', e1['tob'], e2['tob'])]
+        for m1, m2, s1, s2 in zip(runners[0].marketmakers, runners[1].marketmakers, e1['mm'], e2['mm']):
+            pairs.extend([('mm %d state' % s1['mmid'], s1, s2),
+                          ('mm %d oi chromosomes' % s1['mmid'], _chromosomes(m1._oi.current), _chromosomes(m2._oi.current)),
+                          ('mm %d of chromosomes' % s1['mmid'], _chromosomes(m1._of.current), _chromosomes(m2._of.current))])
+        d = _first(e1['step'], pairs)
+        if d:
+            return d
+
+def compare_orderbooks(candidate, orders, reference=Orderbook):
+    '''Process orders (dicts, e.g. from replay.read_orders) through both engines; return the first Divergence or None'''
+    books = replay.check_engine(reference)(), replay.check_engine(candidate)()
+    for i, order in enumerate(orders):
+        trades = [len(b.trade_book) for b in books]
+        for b in books:
+            replay.submit(b, dict(order))
+        r, c = books
+        pairs = [('traded', r.traded, c.traded), ('trades', r.trade_book[trades[0]:], c.trade_book[trades[1]:])]
+        if r.traded:
+            pairs.append(('confirm_trade_collector', r.confirm_trade_collector, c.confirm_trade_collector))
+        if r.best_bid() is not None and r.best_ask() is not None:
+            pairs.append(('top_of_book', r.report_top_of_book(order['timestamp']), c.report_top_of_book(order['timestamp'])))
+        d = _first('order %d (%s)' % (i, order), pairs)
+        if d:
+            return d
+    return None
+
+def compare_predictors(candidate, reference=Predictors, config=None, steps=2000, seed=51, genetic_int=None):
+    '''
+    Drive reference and candidate Predictors (built from config's oi parameters) with the same
+    seeded states and outcomes, running new_genes every genetic_int steps; return the first Divergence or None
+    '''
+    config = config if config is not None else Config()
+    genetic_int = genetic_int or config.genetic_int
+    args = (config.oi_num_chroms, config.oi_cond_len, config.oi_action_len, config.oi_cond_probs,
+            config.oi_action_mutate_p, config.oi_cond_cross_p, config.oi_cond_mutate_p,
+            config.oi_theta, config.oi_keep_pct, config.oi_symm, config.oi_weights)
+    sides = _Side(seed), _Side(seed)
+    preds = [side.run(cls, *args) for side, cls in zip(sides, (reference, candidate))]
+    d = _first('build', [('predictors', _chromosomes(preds[0].predictors), _chromosomes(preds[1].predictors))])
+    if d:
+        return d
+    inputs = random.Random(seed)
+    for step in range(1, steps + 1):
+        state = ''.join(inputs.choice('01') for _ in range(config.oi_cond_len))
+        actual = inputs.randint(-3, 3)
+        pairs = []
+        if not step % genetic_int:
+            for side, p in zip(sides, preds):
+                side.run(p.new_genes)
+            pairs.append(('predictors', _chromosomes(preds[0].predictors), _chromosomes(preds[1].predictors)))
+        forecasts = [side.run(p.get_forecast, state) for side, p in zip(sides, preds)]
+        pairs.extend([('forecast', forecasts[0], forecasts[1]),
+                      ('chromosomes', _chromosomes(preds[0].current), _chromosomes(preds[1].current))])
+        d = _first(step, pairs)
+        if d:
+            return d
+        for p in preds:
+            p.update_accuracies(actual)
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mmabm.golden', description='Compare a candidate implementation with the reference.')
+    parser.add_argument('what', choices=['runner', 'orderbook', 'predictors'])
+    parser.add_argument('--candidate', help='candidate class as module:Class (a Runner, Orderbook or Predictors)')
+    parser.add_argument('--exchange', help='runner: Orderbook class as module:Class')
+    parser.add_argument('--predictors', help='runner: Predictors class as module:Class')
+    parser.add_argument('--orders', help='orderbook: h5 file with the order log')
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=51)
+    args = parser.parse_args(argv)
+    load = lambda path: replay.load_engine(path) if path else None
+    if args.what == 'runner':
+        candidate = load(args.candidate) or runner_class(load(args.exchange), load(args.predictors))
+        d = compare_runners(candidate, steps=args.steps, seed=args.seed)
+    elif args.what == 'orderbook':
+        d = compare_orderbooks(load(args.candidate),
+                               (order for chunk in replay.read_orders(args.orders) for order in chunk))
+    else:
+        d = compare_predictors(load(args.candidate), steps=args.steps, seed=args.seed)
+    print(d if d else 'no divergence')
+    return 1 if d else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
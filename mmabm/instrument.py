@@ -0,0 +1,154 @@
+'''
+Counters and cumulative timers for the Runner's hot paths.
+
+Instrument.attach(runner) replaces methods on the runner's instances (the exchange, the
+market makers and their Predictors, the runner itself) with timing wrappers, so nothing is
+added to the code paths when instrumentation is off. Timers are inclusive: a timed method
+that calls another timed method counts that time too.
+
+Counters: orders.<type>.<side> for every order processed, fills (trades), levels_touched
+(price levels traded through per order, summed) and ga_generations (new_genes calls,
+including those run in a gapool.GeneticsPool's workers, which the new_genes timer misses)
+and exogenous.hits and exogenous.misses (mmabm.exogenous flows read from or added to the
+cache).
+Timers: step (mcsStep), process_order, process_signal1, process_signal2, new_genes,
+ga_pool (the GA generations of a cohort run in a gapool.GeneticsPool), confirmTrades,
+doCancels and each *_to_h5 flush.
+
+Runner(instrument=True) reports at every write_interval and at the end: a table to the log
+and all the snapshots so far, as JSON, to <h5filename>.instrument.json.
+'''
+import json
+import time
+
+from collections import Counter
+
+from mmabm.shared import Side, OType
+
+
+_ORDER_KEYS = {(t, s): 'orders.%s.%s' % (t.name.lower(), s.name.lower()) for t in OType for s in Side}
+
+
+class _Timed:
+    '''Callable that times calls to fn into timer ([calls, seconds])'''
+
+    def __init__(self, timer, fn):
+        self.timer = timer
+        self.fn = fn
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            timer = self.timer
+            timer[0] += 1
+            timer[1] += time.perf_counter() - start
+
+
+class _TimedProcessOrder(_Timed):
+    '''Times Orderbook.process_order and counts orders, fills and levels touched'''
+
+    def __init__(self, timer, fn, exchange, counters):
+        super().__init__(timer, fn)
+        self.exchange = exchange
+        self.counters = counters
+
+    def __call__(self, order):
+        trade_book = self.exchange.trade_book
+        trades = len(trade_book)
+        start = time.perf_counter()
+        self.fn(order)
+        timer = self.timer
+        timer[0] += 1
+        timer[1] += time.perf_counter() - start
+        counters = self.counters
+        counters[_ORDER_KEYS[order['type'], order['side']]] += 1
+        fills = len(trade_book) - trades
+        if fills:
+            counters['fills'] += fills
+            counters['levels_touched'] += len({t['price'] for t in trade_book[trades:]})
+
+
+class _TimedPool(_Timed):
+    '''Times GeneticsPool.new_genes and counts the generations its workers ran'''
+
+    def __init__(self, timer, fn, new_genes, instrument):
+        super().__init__(timer, fn)
+        self.new_genes = new_genes
+        self.instrument = instrument
+
+    def __call__(self, predictors):
+        counted = self.new_genes[0]
+        super().__call__(predictors)
+        # a serial generation calls the timed new_genes of each Predictors in this process
+        self.instrument.pooled_generations += len(predictors) - (self.new_genes[0] - counted)
+
+
+class Instrument:
+
+    def __init__(self, filename=None, log=print):
+        self.filename = filename
+        self.log = log
+        self.counters = Counter()
+        self.timers = {}
+        self.snapshots = []
+        self.pooled_generations = 0
+        self._start = time.perf_counter()
+
+    def timer(self, name):
+        '''Return the [calls, seconds] timer called name'''
+        return self.timers.setdefault(name, [0, 0.0])
+
+    def wrap(self, obj, method, name=None):
+        '''Time obj.method (as timer name, default method) by setting a wrapper on the instance'''
+        setattr(obj, method, _Timed(self.timer(name or method), getattr(obj, method)))
+
+    def attach(self, runner):
+        '''Instrument runner (a runner2.Runner) and its exchange and market makers; return self'''
+        exchange = runner.exchange
+        exchange.process_order = _TimedProcessOrder(self.timer('process_order'), exchange.process_order, exchange, self.counters)
+        for method in ('order_history_to_h5', 'sip_to_h5', 'trade_book_to_h5'):
+            self.wrap(exchange, method)
+        runner._mcs_step = _Timed(self.timer('step'), runner._mcs_step)
+        for method in ('confirmTrades', 'doCancels', 'qTakeToh5'):
+            self.wrap(runner, method)
+        for m in runner.marketmakers:
+            for method in ('process_signal1', 'process_signal2', 'signal_collector_to_h5', 'mmProfitabilityToh5'):
+                self.wrap(m, method)
+            self.wrap(m._oi, 'new_genes')
+            self.wrap(m._of, 'new_genes')
+        if runner.genetics is not None:
+            runner.genetics.new_genes = _TimedPool(self.timer('ga_pool'), runner.genetics.new_genes,
+                                                   self.timer('new_genes'), self)
+        return self
+
+    def snapshot(self, step):
+        counters = dict(self.counters)
+        counters['ga_generations'] = self.timers.get('new_genes', [0])[0] + self.pooled_generations
+        return {'step': step, 'elapsed': time.perf_counter() - self._start, 'counters': counters,
+                'timers': {k: {'calls': c, 'seconds': s} for k, (c, s) in self.timers.items()}}
+
+    def report(self, step):
+        '''Log a table and write all snapshots as JSON (if filename)'''
+        snap = self.snapshot(step)
+        self.snapshots.append(snap)
+        self.log(format_table(snap))
+        if self.filename:
+            with open(self.filename, 'w') as f:
+                json.dump(self.snapshots, f, indent=1)
+        return snap
+
+
+def format_table(snap):
+    elapsed = snap['elapsed']
+    lines = ['step {0}: {1:.2f} seconds'.format(snap['step'], elapsed),
+             '%-22s %10s %11s %10s %7s' % ('timer', 'calls', 'seconds', 'us/call', '%')]
+    for name, t in sorted(snap['timers'].items(), key=lambda kv: -kv[1]['seconds']):
+        per_call = 1e6 * t['seconds'] / t['calls'] if t['calls'] else 0
+        lines.append('%-22s %10d %11.3f %10.1f %7.1f' % (name, t['calls'], t['seconds'], per_call,
+                                                          100 * t['seconds'] / elapsed if elapsed else 0))
+    lines.append('%-22s %10s' % ('counter', 'value'))
+    for name, value in sorted(snap['counters'].items()):
+        lines.append('%-22s %10d' % (name, value))
+    return '\n'.join(lines)
@@ -0,0 +1,210 @@
+'''
+Latency histograms for Orderbook.process_order.
+
+LatencyRecorder().attach(exchange) times every process_order call with perf_counter_ns
+into log-bucketed histograms (8 buckets per power of two, so each bucket is within 12.5%)
+for each kind of order - add_resting, add_crossing, cancel, modify - overall and by the
+depth (price levels, in powers of two) of the book side the order works on: the other side
+for a crossing add, the order's own side otherwise. Only the non-empty buckets are stored,
+so histograms are small, can be dumped as JSON per run and merged across runs:
+
+    python -m mmabm.latency sweeps/trial1/*.latency.json
+
+Runner(latency=True) records the run's exchange and writes <h5filename>.latency.json at
+the end; Sweep merges the per-run files into <prefix>_latency.json.
+'''
+import json
+import sys
+import time
+
+from mmabm.shared import Side, OType
+
+
+KINDS = ('add_resting', 'add_crossing', 'cancel', 'modify')
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket(v):
+    '''Histogram bucket of v (ns): exact below 16, else the top 4 bits'''
+    if v < 16:
+        return v
+    e = v.bit_length() - 4
+    return (e << 3) + (v >> e)
+
+def bucket_range(b):
+    '''[low, high) of bucket b'''
+    if b < 16:
+        return b, b + 1
+    e = (b >> 3) - 1
+    m = b - (e << 3)
+    return m << e, (m + 1) << e
+
+
+class LogHistogram:
+
+    def __init__(self):
+        self.counts = {}
+        self.n = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}(n={1}, mean={2:.0f})'.format(class_name, self.n, self.mean)
+
+    def record(self, v):
+        b = bucket(v)
+        self.counts[b] = self.counts.get(b, 0) + 1
+        self.n += 1
+        self.total += v
+        if self.min is None or v < self.min:
+            self.min = v
+        if self.max is None or v > self.max:
+            self.max = v
+
+    def merge(self, other):
+        '''Add other's counts to this histogram; return self'''
+        for b, c in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + c
+        self.n += other.n
+        self.total += other.total
+        if other.n:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else 0.0
+
+    def percentile(self, p):
+        '''Value at percentile p (0-100): the midpoint of its bucket, clamped to [min, max]'''
+        if not self.n:
+            return None
+        if p >= 100:
+            return self.max
+        rank = p / 100 * self.n
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= rank:
+                low, high = bucket_range(b)
+                return min(max((low + high - 1) / 2, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {'counts': {str(b): c for b, c in sorted(self.counts.items())}, 'n': self.n, 'total': self.total,
+                'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, d):
+        h = cls()
+        h.counts = {int(b): c for b, c in d['counts'].items()}
+        h.n = d['n']
+        h.total = d['total']
+        h.min = d['min']
+        h.max = d['max']
+        return h
+
+
+class _TimedProcessOrder:
+    '''Replaces Orderbook.process_order on the instance; records each call in the recorder'''
+
+    def __init__(self, recorder, exchange, fn):
+        self.recorder = recorder
+        self.exchange = exchange
+        self.fn = fn
+
+    def __call__(self, order):
+        exchange = self.exchange
+        if order['side'] == Side.BID:
+            same, other = len(exchange._bid_book_prices), len(exchange._ask_book_prices)
+        else:
+            same, other = len(exchange._ask_book_prices), len(exchange._bid_book_prices)
+        start = time.perf_counter_ns()
+        self.fn(order)
+        elapsed = time.perf_counter_ns() - start
+        otype = order['type']
+        if otype == OType.ADD:
+            # a crossing add walks the other side; a resting add is inserted into its own
+            if exchange.traded:
+                self.recorder.record('add_crossing', other, elapsed)
+            else:
+                self.recorder.record('add_resting', same, elapsed)
+        else:
+            self.recorder.record('cancel' if otype == OType.CANCEL else 'modify', same, elapsed)
+
+
+class LatencyRecorder:
+    '''Histograms keyed by order kind and by (kind, depth class)'''
+
+    def __init__(self):
+        self.histograms = {}
+
+    def attach(self, exchange):
+        '''Record exchange.process_order (each book's, for an exchange.Exchange); return self'''
+        books = exchange.books.values() if hasattr(exchange, 'books') else [exchange]
+        for book in books:
+            book.process_order = _TimedProcessOrder(self, book, book.process_order)
+        return self
+
+    def _histogram(self, key):
+        h = self.histograms.get(key)
+        if h is None:
+            h = self.histograms[key] = LogHistogram()
+        return h
+
+    def record(self, kind, depth, ns):
+        self._histogram(kind).record(ns)
+        self._histogram('%s@depth<=%d' % (kind, 1 << max(depth - 1, 0).bit_length())).record(ns)
+
+    def merge(self, other):
+        for key, h in other.histograms.items():
+            self._histogram(key).merge(h)
+        return self
+
+    def to_dict(self):
+        return {key: h.to_dict() for key, h in self.histograms.items()}
+
+    @classmethod
+    def from_dict(cls, d):
+        recorder = cls()
+        recorder.histograms = {key: LogHistogram.from_dict(h) for key, h in d.items()}
+        return recorder
+
+    def dump(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f:
+            return cls.from_dict(json.load(f))
+
+    def summary(self):
+        '''Table of count, mean, percentiles and max (microseconds) per histogram'''
+        header = ['%-28s %10s %9s' % ('histogram', 'count', 'mean')] + ['%9s' % ('p%g' % p) for p in PERCENTILES] + ['%9s' % 'max']
+        lines = [' '.join(header) + '  (us)']
+        for key in sorted(self.histograms, key=_sort_key):
+            h = self.histograms[key]
+            row = ['%-28s %10d %9.2f' % (key, h.n, h.mean / 1000)] + ['%9.2f' % (h.percentile(p) / 1000) for p in PERCENTILES]
+            lines.append(' '.join(row + ['%9.2f' % (h.max / 1000)]))
+        return '\n'.join(lines)
+
+
+def _sort_key(key):
+    kind, _, depth = key.partition('@depth<=')
+    return KINDS.index(kind) if kind in KINDS else len(KINDS), int(depth) if depth else 0
+
+def merge_files(filenames):
+    '''Return a LatencyRecorder with the histograms in filenames merged'''
+    recorder = LatencyRecorder()
+    for filename in filenames:
+        recorder.merge(LatencyRecorder.load(filename))
+    return recorder
+
+
+if __name__ == '__main__':
+
+    print(merge_files(sys.argv[1:]).summary())
@@ -1,8 +1,6 @@
 import bisect
 import random
 
-import pandas as pd
-
 from mmabm.localbook import Localbook
 from mmabm.genetics import find_winners, make_strat, make_weights, match_strat_all, match_strat_random
 from mmabm.genetics import new_genes_uf, new_genes_wf
@@ -133,6 +131,10 @@ class MarketMakerL:
         self.cash_flow_collector.append({'mmid': self.trader_id, 'timestamp': step, 'cash_flow': self._cash_flow,
                                          'delta_inv': self._delta_inv})
     
+    def report_state(self):
+        return {'mmid': self.trader_id, 'bid': self._bid, 'ask': self._ask, 'mid': self._mid,
+                'cash_flow': self._cash_flow, 'delta_inv': self._delta_inv}
+    
     ''' Make Orders '''                
     def _make_add_quote(self, time, side, price, quantity):
         '''Make one add quote (dict)'''
@@ -338,6 +340,7 @@ class MarketMakerL:
         
     def signal_collector_to_h5(self, filename):
         '''Append signal to an h5 file'''
+        import pandas as pd
         temp_df = pd.DataFrame(self.signal_collector)
         temp_df.to_hdf(filename, 'signal_%d' % self.trader_id, append=True, format='table', complevel=5, complib='blosc')
 
@@ -1,22 +1,23 @@
 import random
 
-import pandas as pd
-
 from mmabm.genetics2 import Predictors
 from mmabm.localbook import Localbook
+from mmabm.trie import IndexedPredictors
 from mmabm.shared import Side, OType, TType
 
-from mmabm.settings import *
+from mmabm.config import Config
 
 
 class MarketMakerL:
     
     trader_type = TType.MarketMaker
+    predictors_class = Predictors
     
-    def __init__(self, name, maxq, arrInt, g_int):
+    def __init__(self, name, maxq, arrInt, g_int, config=None, rng=None):
         self.trader_id = name # trader id
         self._maxq = maxq
         self.arrInt = arrInt
+        self._rng = random if rng is None else rng
 
         self._localbook = Localbook()
         self._quote_sequence = 0
@@ -31,14 +32,18 @@ class MarketMakerL:
         self._cash_flow = 0
         self.cash_flow_collector = []
 
-        self._oi = Predictors(OI_NUM_CHROMS, OI_COND_LEN, OI_ACTION_LEN, OI_COND_PROBS, 
-                              OI_ACTION_MUTATE_P, OI_COND_CROSS_P, OI_COND_MUTATE_P, 
-                              OI_THETA, OI_KEEP_PCT, OI_SYMM, OI_WEIGHTS)
+        config = config if config is not None else Config()
+        predictors_class = IndexedPredictors if config.predictor_index else self.predictors_class
+        self._oi = predictors_class(config.oi_num_chroms, config.oi_cond_len, config.oi_action_len, config.oi_cond_probs,
+                                    config.oi_action_mutate_p, config.oi_cond_cross_p, config.oi_cond_mutate_p,
+                                    config.oi_theta, config.oi_keep_pct, config.oi_symm, config.oi_weights,
+                                    None if rng is None else rng.child(0))
         self.oi_signal_collector = []
 
-        self._of = Predictors(OF_NUM_CHROMS, OF_COND_LEN, OF_ACTION_LEN, OF_COND_PROBS, 
-                              OF_ACTION_MUTATE_P, OF_COND_CROSS_P, OF_COND_MUTATE_P, 
-                              OF_THETA, OF_KEEP_PCT, OF_SYMM, OF_WEIGHTS)
+        self._of = predictors_class(config.of_num_chroms, config.of_cond_len, config.of_action_len, config.of_cond_probs,
+                                    config.of_action_mutate_p, config.of_cond_cross_p, config.of_cond_mutate_p,
+                                    config.of_theta, config.of_keep_pct, config.of_symm, config.of_weights,
+                                    None if rng is None else rng.child(1))
         self.of_signal_collector = []
 
         self._genetic_int = g_int
@@ -88,24 +93,54 @@ class MarketMakerL:
             self._cash_flow += price*quantity/100000
             self._delta_inv -= quantity
         self._localbook.modify_order(side, quantity, confirm['order_id'], price)
+
+    def confirm_trades_local(self, fills):
+        '''confirm_trade_local for each of fills (mmabm.orderbook.Fill), in order'''
+        modify_order = self._localbook.modify_order
+        for f in fills:
+            price = f.price
+            quantity = f.quantity
+            if f.side == Side.BID:
+                self._cash_flow -= price*quantity/100000
+                self._delta_inv += quantity
+            else:
+                self._cash_flow += price*quantity/100000
+                self._delta_inv -= quantity
+            modify_order(f.side, quantity, f.order_id, price)
         
     def cumulate_cashflow(self, step):
         self.cash_flow_collector.append({'mmid': self.trader_id, 'timestamp': step, 'cash_flow': self._cash_flow,
                                          'delta_inv': self._delta_inv})
 
+    def reconfigure(self, config):
+        '''Take maxq, arrival interval, GA interval and GA parameters from config'''
+        self._maxq = config.mm_maxq
+        self.arrInt = config.arr_int
+        self._genetic_int = config.genetic_int
+        self._oi.reconfigure(config.oi_action_mutate_p, config.oi_cond_cross_p, config.oi_cond_mutate_p, config.oi_keep_pct)
+        self._of.reconfigure(config.of_action_mutate_p, config.of_cond_cross_p, config.of_cond_mutate_p, config.of_keep_pct)
+
+    def report_state(self):
+        return {'mmid': self.trader_id, 'bid': self._bid, 'ask': self._ask, 'mid': self._mid,
+                'cash_flow': self._cash_flow, 'delta_inv': self._delta_inv}
+
     def mmProfitabilityToh5(self, filename):
+        import pandas as pd
         temp_df = pd.DataFrame(self.cash_flow_collector)
-        temp_df.to_hdf(filename, 'mmp', append=True, format='table', complevel=5, complib='blosc')
+        # float from the first row on, so that later appends (mmabm.flusher) match the table
+        if 'cash_flow' in temp_df:
+            temp_df['cash_flow'] = temp_df['cash_flow'].astype(float)
+        temp_df.to_hdf(filename, 'mmp', append=True, format='table', data_columns=['mmid', 'timestamp'], complevel=5, complib='blosc')
 
     # Update Orderbook
     def _update_midpoint(self, bid, ask):
         self._mid = (bid + ask) / 2
 
     def _make_spread(self, bid, ask):
-        self._ask = ask + random.randint(-2, 2)
-        self._bid = bid + random.randint(-2, 2)
+        self._ask = ask + self._rng.randint(-2, 2)
+        self._bid = bid + self._rng.randint(-2, 2)
         while self._ask - self._bid <= 0:
-            if random.random() > 0.5:
+            if self._rng.random() > 0.5:
                 self._ask += 1
             else:
                 self._bid -= 1
@@ -123,10 +158,17 @@ class MarketMakerL:
 
     def signal_collector_to_h5(self, filename):
         '''Append signal to an h5 file'''
+        import pandas as pd
         oi_df = pd.DataFrame(self.oi_signal_collector)
-        oi_df.to_hdf(filename, 'oi_signal_%d' % self.trader_id, append=True, format='table', complevel=5, complib='blosc')
+        if 'OIAcc' in oi_df:
+            oi_df['OIAcc'] = oi_df['OIAcc'].astype(float)
+        oi_df.to_hdf(filename, 'oi_signal_%d' % self.trader_id, append=True, format='table', data_columns=['Step'],
+                     complevel=5, complib='blosc')
         of_df = pd.DataFrame(self.of_signal_collector)
-        of_df.to_hdf(filename, 'of_signal_%d' % self.trader_id, append=True, format='table', complevel=5, complib='blosc')
+        if 'OFAcc' in of_df:
+            of_df['OFAcc'] = of_df['OFAcc'].astype(float)
+        of_df.to_hdf(filename, 'of_signal_%d' % self.trader_id, append=True, format='table', data_columns=['Step'],
+                     complevel=5, complib='blosc')
 
     # Local book updates
     def _process_cancels(self, step):
@@ -241,6 +283,10 @@ class MarketMakerL:
         self._oi.get_forecast(signal[3]) # signal[3] is oi string
         self._of.get_forecast(signal[5]) # signal[5] is of string
 
+        self._update_quotes(step, signal)
+
+    def _update_quotes(self, step, signal):
+        '''Set the desired bid and ask and cancel the quotes outside them'''
         # Compute new midpoint
         self._update_midpoint(signal[0], signal[1]) # signal[0] is the bid; signal[1] is the ask
         
@@ -0,0 +1,131 @@
+'''
+Several venues trading one instrument with a shared trader population.
+
+MultiRunner is a runner2.Runner whose exchange is an exchange.Exchange with one Orderbook
+per config.venues, each seeded with the same one-lot bid and ask. Traders of the kinds in
+config.routed (default: Takers and MarketMakers) are routed across the venues by the
+Exchange; the others get a home venue, round robin within each kind. Every trader sees
+the consolidated top of book.
+
+Venues that no routed trader uses share nothing. With config.routed empty, run_venues()
+runs each venue as its own Runner, with its share of each kind of trader, in a process
+pool - one <root>_<venue>.h5 file per venue - and consolidate() builds the consolidated
+top of book from their tob tables:
+
+    files = run_venues(Config(routed=()), 'abm.h5', seed=51)
+    consolidate(files, ('A', 'B'), 'abm_nbbo.h5')
+'''
+import heapq
+import os
+import random
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import mmabm.runner2 as runner2
+import mmabm.sweep as sweep
+import mmabm.trader as trader
+
+from mmabm.exchange import ConsolidatedQuote, Exchange
+from mmabm.rng import BOOK, VENUES
+from mmabm.shared import Side, OType
+
+
+class MultiRunner(runner2.Runner):
+
+    def __init__(self, h5filename='test.h5', config=None, **kwargs):
+        super().__init__(h5filename, config, **kwargs)
+        routed = set(self.config.routed)
+        venues = self.config.venues
+        for kind, traders in self.traders_by_kind().items():
+            if kind not in routed:
+                for i, t in enumerate(traders):
+                    self.exchange.home[t.trader_id] = venues[i % len(venues)]
+
+    def exchange_class(self, fills=False):
+        return Exchange(self.config.venues, fills)
+
+    def traders_by_kind(self):
+        ''' {kind: traders} for the kinds in config.TRADER_KINDS
+        '''
+        config = self.config
+        return {'provider': self.providers if config.provider else [],
+                'taker': self.takers if config.taker else [],
+                'informed': [self.informed_trader] if config.informed else [],
+                'pennyjumper': [self.pennyjumper] if config.pennyjumper else [],
+                'marketmaker': self.marketmakers}
+
+    def seedOrderbook(self):
+        ''' Seed every venue with a one-lot bid and ask at the same prices
+        '''
+        rng = random if self._streams is None else self._stream(BOOK)
+        seed_provider = trader.Provider(9999, 1, 0.05, 0.025, rng)
+        self.liquidity_providers.update({9999: seed_provider})
+        ba = rng.choice(range(1000005, 1002001, 5))
+        bb = rng.choice(range(997995, 999996, 5))
+        for i, book in enumerate(self.exchange.books.values()):
+            for order_id, side, price in ((2*i + 1, Side.ASK, ba), (2*i + 2, Side.BID, bb)):
+                q = {'order_id': order_id, 'trader_id': 9999, 'timestamp': 0, 'type': OType.ADD,
+                     'quantity': 1, 'side': side, 'price': price}
+                seed_provider.local_book[order_id] = q
+                book.add_order_to_book(q)
+                book.add_order_to_history(q)
+
+
+def venue_config(config, i):
+    '''Config for venue i run on its own: its share of each kind of trader'''
+    n = len(config.venues)
+    share = lambda total: total // n + (i < total % n)
+    changes = {'num_providers': share(config.num_providers), 'num_takers': share(config.num_takers),
+               'num_mms': share(config.num_mms), 'informed': config.informed and i == 0,
+               'pennyjumper': config.pennyjumper and i == 0, 'venues': (config.venues[i],)}
+    if config.seed is not None:
+        changes['seed'] = venue_seed(config.seed, i)
+    return config.replace(**changes)
+
+def venue_seed(seed, i):
+    '''Seed for venue i, derived from the run seed'''
+    return int(np.random.SeedSequence(seed, spawn_key=(VENUES, i)).generate_state(1)[0])
+
+def venue_filename(h5filename, venue):
+    return '%s_%s.h5' % (os.path.splitext(h5filename)[0], venue)
+
+def run_venues(config, h5filename, seed=None, processes=None):
+    '''Run each venue as an independent Runner in a process pool; return the venues' h5 filenames'''
+    if config.routed:
+        raise ValueError('routed traders {0} need a MultiRunner; run_venues needs routed=()'.format(config.routed))
+    seed = seed if seed is not None else config.seed
+    if seed is None:
+        raise ValueError('run_venues needs a seed')
+    n = len(config.venues)
+    filenames = [venue_filename(h5filename, v) for v in config.venues]
+    with ProcessPoolExecutor(max_workers=processes or min(n, os.cpu_count())) as pool:
+        list(pool.map(sweep.run_one, [venue_config(config, i) for i in range(n)],
+                      [venue_seed(seed, i) for i in range(n)], filenames))
+    return filenames
+
+def _tob_rows(h5filename, venue, chunksize):
+    from mmabm.results import Run
+    for chunk in Run(h5filename).iter('tob', chunksize=chunksize):
+        for row in chunk.to_dict('records'):
+            yield row['timestamp'], venue, row
+
+def consolidate(filenames, venues, h5filename, chunksize=100000):
+    '''Write the consolidated top of book of the venues' tob tables to the tob table of h5filename'''
+    quote = ConsolidatedQuote(venues)
+    collector = []
+    rows = heapq.merge(*[_tob_rows(f, v, chunksize) for f, v in zip(filenames, venues)], key=lambda r: r[0])
+    for timestamp, venue, tob in rows:
+        quote.update(venue, tob)
+        collector.append(quote.report(timestamp))
+        if len(collector) == chunksize:
+            _tob_to_h5(collector, h5filename)
+    _tob_to_h5(collector, h5filename)
+
+def _tob_to_h5(collector, h5filename):
+    import pandas as pd
+    if collector:
+        temp_df = pd.DataFrame(collector)
+        temp_df.to_hdf(h5filename, 'tob', append=True, format='table', data_columns=['timestamp'], complevel=5, complib='blosc')
+        collector.clear()
@@ -1,8 +1,68 @@
 import bisect
-import pandas as pd
 
 from mmabm.shared import Side, OType
 
+
+# side (value) of the incoming order for the resting order's side
+_INCOMING = {Side.BID: Side.ASK.value, Side.ASK: Side.BID.value}
+
+
+class Fill:
+    '''
+    One fill: the trade_book record and the resting trader's confirmation in one object.
+
+    fill[key] reads the confirmation fields: timestamp, trader, order_id, quantity,
+    side (the resting order's Side) and price. row() is the trade_book dict.
+    '''
+
+    __slots__ = ('timestamp', 'trader', 'order_id', 'resting_timestamp', 'incoming_trader_id',
+                 'incoming_order_id', 'price', 'quantity', 'side', 'venue')
+
+    def __init__(self, timestamp, trader, order_id, resting_timestamp, incoming_trader_id, incoming_order_id,
+                 price, quantity, side):
+        self.timestamp = timestamp
+        self.trader = trader
+        self.order_id = order_id
+        self.resting_timestamp = resting_timestamp
+        self.incoming_trader_id = incoming_trader_id
+        self.incoming_order_id = incoming_order_id
+        self.price = price
+        self.quantity = quantity
+        self.side = side
+        self.venue = None
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1})'.format(class_name, self.row())
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def row(self):
+        '''The trade_book dict of the fill'''
+        row = {'resting_trader_id': self.trader, 'resting_order_id': self.order_id, 'resting_timestamp': self.resting_timestamp,
+               'incoming_trader_id': self.incoming_trader_id, 'incoming_order_id': self.incoming_order_id,
+               'timestamp': self.timestamp, 'price': self.price, 'quantity': self.quantity, 'side': _INCOMING[self.side]}
+        if self.venue is not None:
+            row['venue'] = self.venue
+        return row
+
+
+def trade_rows(trade_book):
+    '''The trade_book dicts of a trade_book of Fills'''
+    return [f.row() for f in trade_book]
+
+
 class Orderbook(object):
     '''
     Orderbook tracks, processes and matches orders.
@@ -13,13 +73,15 @@ class Orderbook(object):
     one dictionary contains trades matched with orders on the book.
     Orderbook also provides methods for storing and retrieving orders and maintaining a
     history of the book.
+    Orderbook(fills=True) records each fill once, as a Fill in both trade_book and
+    confirm_trade_collector, instead of a trade dict and a confirmation dict.
     Public attributes: order_history, confirm_modify_collector, confirm_trade_collector,
     trade_book and traded.
     Public methods: add_order_to_book(), process_order(), order_history_to_h5(), trade_book_to_h5(),
-    sip_to_h5() and report_top_of_book()
+    sip_to_h5(), clear_history(), best_bid(), best_ask(), report_top_of_book() and flush_tob()
     '''
 
-    def __init__(self):
+    def __init__(self, fills=False):
         '''
         Initialize the Orderbook with a set of empty lists and dicts and other defaults
 
@@ -45,6 +107,9 @@ class Orderbook(object):
         self._ex_index = 0
         self._lookup = {}
         self.traded = False
+        self.fills = fills
+        if fills:
+            self._fill = self._fill_record
 
     def add_order_to_history(self, order):
         '''Add an order (dict) to order_history'''
@@ -127,6 +192,21 @@ class Orderbook(object):
         self.confirm_trade_collector.append({'timestamp': timestamp, 'trader': trader_id, 'order_id': order_id,
                                              'quantity': order_quantity, 'side': order_side, 'price': order_price})
 
+    def _fill(self, order, book_order, quantity):
+        '''Confirm quantity of book_order to its trader and add the trade to the trade_book'''
+        self._confirm_trade(order['timestamp'], book_order['side'], quantity, book_order['order_id'],
+                            book_order['price'], book_order['trader_id'])
+        self._add_trade_to_book(book_order['trader_id'], book_order['order_id'], book_order['timestamp'],
+                                order['trader_id'], order['order_id'], order['timestamp'],
+                                book_order['price'], quantity, order['side'])
+
+    def _fill_record(self, order, book_order, quantity):
+        '''_fill with one Fill for the confirmation and the trade_book'''
+        fill = Fill(order['timestamp'], book_order['trader_id'], book_order['order_id'], book_order['timestamp'],
+                    order['trader_id'], order['order_id'], book_order['price'], quantity, book_order['side'])
+        self.confirm_trade_collector.append(fill)
+        self.trade_book.append(fill)
+
     def process_order(self, order):
         '''Check for a trade (match); if so call _match_trade, otherwise modify book(s).'''
         self.traded = False
@@ -164,19 +244,11 @@ class Orderbook(object):
                         ex_id = book[price]['ex_ids'][0]
                         book_order = book[price]['orders'][ex_id]
                         if remainder >= book_order['quantity']:
-                            self._confirm_trade(order['timestamp'], book_order['side'], book_order['quantity'], book_order['order_id'],
-                                                book_order['price'], book_order['trader_id'])
-                            self._add_trade_to_book(book_order['trader_id'], book_order['order_id'], book_order['timestamp'],
-                                                    order['trader_id'], order['order_id'], order['timestamp'],
-                                                    book_order['price'], book_order['quantity'], order['side'])
+                            self._fill(order, book_order, book_order['quantity'])
                             self._remove_order(book_order['side'], book_order['price'], ex_id)
                             remainder -= book_order['quantity']
                         else:
-                            self._confirm_trade(order['timestamp'], book_order['side'], remainder, book_order['order_id'],
-                                                book_order['price'], book_order['trader_id'])
-                            self._add_trade_to_book(book_order['trader_id'], book_order['order_id'], book_order['timestamp'],
-                                                    order['trader_id'], order['order_id'], order['timestamp'],
-                                                    book_order['price'], remainder, order['side'])
+                            self._fill(order, book_order, remainder)
                             self._modify_order(book_order['side'], remainder, ex_id, book_order['price'])
                             break
                     else:
@@ -197,19 +269,11 @@ class Orderbook(object):
                         ex_id = book[price]['ex_ids'][0]
                         book_order = book[price]['orders'][ex_id]
                         if remainder >= book_order['quantity']:
-                            self._confirm_trade(order['timestamp'], book_order['side'], book_order['quantity'], book_order['order_id'],
-                                                book_order['price'], book_order['trader_id'])
-                            self._add_trade_to_book(book_order['trader_id'], book_order['order_id'], book_order['timestamp'],
-                                                    order['trader_id'], order['order_id'], order['timestamp'],
-                                                    book_order['price'], book_order['quantity'], order['side'])
+                            self._fill(order, book_order, book_order['quantity'])
                             self._remove_order(book_order['side'], book_order['price'], ex_id)
                             remainder -= book_order['quantity']
                         else:
-                            self._confirm_trade(order['timestamp'], book_order['side'], remainder, book_order['order_id'],
-                                                book_order['price'], book_order['trader_id'])
-                            self._add_trade_to_book(book_order['trader_id'], book_order['order_id'], book_order['timestamp'],
-                                                    order['trader_id'], order['order_id'], order['timestamp'],
-                                                    book_order['price'], remainder, order['side'])
+                            self._fill(order, book_order, remainder)
                             self._modify_order(book_order['side'], remainder, ex_id, book_order['price'])
                             break
                     else:
@@ -220,23 +284,45 @@ class Orderbook(object):
                     print('Bid Market Collapse with order {0}'.format(order))
                     break
 
-    def order_history_to_h5(self, filename):
+    def order_history_to_h5(self, filename, key='orders'):
         '''Append order history to an h5 file, clear the order_history'''
+        import pandas as pd
         temp_df = pd.DataFrame(self.order_history)
-        temp_df.to_hdf(filename, 'orders', append=True, format='table', complevel=5, complib='blosc')
+        temp_df.to_hdf(filename, key, append=True, format='table', data_columns=['timestamp'], complevel=5, complib='blosc')
         self.order_history.clear()
 
-    def trade_book_to_h5(self, filename):
+    def trade_book_to_h5(self, filename, key='trades'):
         '''Append trade_book to an h5 file, clear the trade_book'''
-        temp_df = pd.DataFrame(self.trade_book)
-        temp_df.to_hdf(filename, 'trades', append=True, format='table', complevel=5, complib='blosc')
+        import pandas as pd
+        temp_df = pd.DataFrame(trade_rows(self.trade_book) if self.fills else self.trade_book)
+        temp_df.to_hdf(filename, key, append=True, format='table', data_columns=['timestamp'], complevel=5, complib='blosc')
         self.trade_book.clear()
 
-    def sip_to_h5(self, filename):
+    def sip_to_h5(self, filename, key='tob'):
         '''Append _sip_collector to an h5 file, clear the _sip_collector'''
+        import pandas as pd
         temp_df = pd.DataFrame(self._sip_collector)
-        temp_df.to_hdf(filename, 'tob', append=True, format='table', complevel=5, complib='blosc')
+        temp_df.to_hdf(filename, key, append=True, format='table', data_columns=['timestamp'], complevel=5, complib='blosc')
+        self._sip_collector.clear()
+
+    def clear_history(self):
+        '''Drop the order history and top-of-book reports without writing them'''
+        self.order_history.clear()
+        self._sip_collector.clear()
+
+    def best_bid(self):
+        '''Best bid price (None if there are no bids)'''
+        return self._bid_book_prices[-1] if self._bid_book_prices else None
+
+    def best_ask(self):
+        '''Best ask price (None if there are no asks)'''
+        return self._ask_book_prices[0] if self._ask_book_prices else None
+
+    def flush_tob(self):
+        '''Return the top-of-book reports since the last flush and clear them'''
+        feed = self._sip_collector[:]
         self._sip_collector.clear()
+        return feed
 
     def report_top_of_book(self, now_time):
         '''Update the top-of-book prices and sizes'''
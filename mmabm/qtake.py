@@ -0,0 +1,41 @@
+'''
+q_take: the bounded, mean-reverting random walk that sets the Taker buy probability,
+and lambda_t, the Provider price-choice parameter derived from it.
+
+q(t) = q(t-1) + wn if noise(t-1) > q(t-1); q(t-1) - wn if noise(t-1) < q(t-1)
+
+Two walks are generated from a 2 x run_steps block of uniforms: the first scales lambda_t,
+the second is q_take. The walk is a scalar recursion on Python floats, which is many times
+faster than stepping NumPy arrays one column at a time and gives the same IEEE results.
+'''
+import numpy as np
+
+
+def walk(noise, wn, q0=0.5):
+    '''Return the walk driven by noise (an iterable of floats) as a list; len(result) == len(noise) + 1'''
+    q = q0
+    qs = [q]
+    append = qs.append
+    for n in noise:
+        if n > q:
+            q = q + wn
+        elif n < q:
+            q = q - wn
+        append(q)
+    return qs
+
+def make_q_take(run_steps, q_take, lambda_0, wn, c_lambda, rng=np.random):
+    '''
+    Return (q_take, lambda_t) arrays of length run_steps.
+
+    Draws rng.random((2, run_steps)) - the same uniforms, in the same order, as the original
+    np.random.rand(2, run_steps) - so a seeded run reproduces the original series exactly.
+    '''
+    if q_take:
+        noise = rng.random((2, run_steps))
+        qt0 = np.array(walk(noise[0, :-1].tolist(), wn))
+        qt1 = np.array(walk(noise[1, :-1].tolist(), wn))
+        lambda_t = -lambda_0*(1 + (np.abs(qt1 - 0.5)/np.sqrt(np.mean(np.square(qt0 - 0.5))))*c_lambda)
+        return qt1, lambda_t
+    else:
+        return np.full(run_steps, 0.5), np.full(run_steps, -lambda_0)
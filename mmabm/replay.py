@@ -0,0 +1,217 @@
+'''
+Replay a recorded order log through a matching engine.
+
+The orders table (Orderbook.order_history) holds every order the exchange received, in
+sequence. Replay streams it back through an engine - Orderbook by default, or any class
+with the engine protocol below - with no agents in the loop, then compares the trades and
+top of book it produces with the recorded trades and tob tables.
+
+The engine protocol (ENGINE_PROTOCOL), all Replay and golden.compare_orderbooks use:
+
+add_order_to_book(order)      rest an order without matching it (the seed orders)
+add_order_to_history(order)   record an order in the order history
+process_order(order)          match or rest an order, record it and its trades
+best_bid(), best_ask()        the best prices, None for an empty side
+report_top_of_book(t)         the top of book at t, also added to the tob feed
+flush_tob()                   return the tob feed since the last flush and clear it
+clear_history()               drop the order history and the tob feed
+trade_book, traded, confirm_trade_collector   the trades, as in Orderbook
+
+This is a matching-engine throughput benchmark on realistic order flow and a correctness
+check for alternative book implementations:
+
+    python -m mmabm.replay abm.h5
+    python -m mmabm.replay abm.h5 --engine mypackage.fastbook:FastOrderbook
+'''
+import argparse
+import importlib
+import sys
+import time
+
+import pandas as pd
+
+import mmabm.orderbook as orderbook
+
+from mmabm.shared import Side, OType
+
+
+TRADE_COLUMNS = ['resting_trader_id', 'resting_order_id', 'resting_timestamp', 'incoming_trader_id',
+                 'incoming_order_id', 'timestamp', 'price', 'quantity', 'side']
+TOB_COLUMNS = ['timestamp', 'best_bid', 'best_ask', 'bid_size', 'ask_size']
+ENGINE_PROTOCOL = ('add_order_to_book', 'add_order_to_history', 'process_order', 'best_bid', 'best_ask',
+                   'report_top_of_book', 'flush_tob', 'clear_history')
+
+
+def load_engine(path):
+    '''"package.module:Class" -> Class'''
+    module, _, name = path.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+def check_engine(engine):
+    '''Raise TypeError if engine (class or instance) lacks a method of ENGINE_PROTOCOL; return engine'''
+    missing = [m for m in ENGINE_PROTOCOL if not callable(getattr(engine, m, None))]
+    if missing:
+        raise TypeError('%s does not implement %s' % (getattr(engine, '__name__', engine), ', '.join(missing)))
+    return engine
+
+def read_orders(h5filename, chunksize=100000):
+    '''Yield lists of order dicts from the orders table, chunksize rows at a time'''
+    sides = {s.value: s for s in Side}
+    types = {t.value: t for t in OType}
+    with pd.HDFStore(h5filename, 'r') as store:
+        for chunk in store.select('orders', chunksize=chunksize):
+            columns = [chunk[c].tolist() for c in ('order_id', 'trader_id', 'timestamp', 'type', 'quantity', 'side', 'price')]
+            yield [{'order_id': o, 'trader_id': tr, 'timestamp': ts, 'type': types[ty], 'quantity': q,
+                    'side': sides[s], 'price': p} for o, tr, ts, ty, q, s, p in zip(*columns)]
+
+def submit(engine, order):
+    '''Process a recorded order; seed orders (Runner.seedOrderbook) go straight to the empty book'''
+    if order['type'] == OType.ADD and (engine.best_ask() if order['side'] == Side.BID else engine.best_bid()) is None:
+        engine.add_order_to_book(order)
+        engine.add_order_to_history(order)
+    else:
+        engine.process_order(order)
+
+
+class Replay:
+    '''
+    Replay runs the orders in h5filename through engine() and diffs the results.
+
+    With check_tob, the top of book is reported after every order and each recorded tob row
+    must match, in sequence, the book before or after one of the orders at its timestamp (the
+    runners report the top of book after some orders, not all, and sometimes more than once).
+    Without it only the engine is timed.
+    After run(): trade_book (the engine's trades), num_orders, seconds (time spent replaying),
+    tob_checked (timestamps checked) and tob_mismatches (timestamps that failed).
+    '''
+
+    def __init__(self, h5filename, engine=orderbook.Orderbook, chunksize=100000, check_tob=True):
+        self.h5filename = h5filename
+        self.engine = check_engine(engine)()
+        self.chunksize = chunksize
+        self.check_tob = check_tob
+        self.num_orders = 0
+        self.seconds = 0.0
+        self.last_timestamp = None
+        self.tob_checked = 0
+        self.tob_mismatches = []
+        self._recorded_tob = {}
+        self._tob_timestamp = None
+        self._tob_seq = []
+        self._last_tob = None
+
+    @property
+    def trade_book(self):
+        return self.engine.trade_book
+
+    @property
+    def orders_per_second(self):
+        return self.num_orders / self.seconds if self.seconds else 0.0
+
+    def run(self):
+        engine = self.engine
+        check_tob = self.check_tob
+        if check_tob:
+            self._recorded_tob = _group_tob(pd.read_hdf(self.h5filename, 'tob'))
+        for orders in read_orders(self.h5filename, self.chunksize):
+            start = time.perf_counter()
+            for order in orders:
+                submit(engine, order)
+                if check_tob and engine.best_bid() is not None and engine.best_ask() is not None:
+                    engine.report_top_of_book(order['timestamp'])
+            self.seconds += time.perf_counter() - start
+            self.num_orders += len(orders)
+            self.last_timestamp = orders[-1]['timestamp']
+            # the history and top of book feed are flushed like order_history_to_h5/sip_to_h5 would
+            feed = engine.flush_tob()
+            if check_tob:
+                self._match_tob(feed)
+            engine.clear_history()
+        if check_tob:
+            self._close_timestamp()
+        return self
+
+    def _match_tob(self, feed):
+        for tob in feed:
+            if tob['timestamp'] != self._tob_timestamp:
+                self._close_timestamp()
+                self._tob_timestamp = tob['timestamp']
+                if self._last_tob is not None:
+                    # the book before the first order at this timestamp
+                    self._tob_seq.append((tob['timestamp'],) + self._last_tob[1:])
+            self._tob_seq.append(tuple(tob[c] for c in TOB_COLUMNS))
+
+    def _close_timestamp(self):
+        if self._tob_timestamp is None:
+            return
+        expected = _dedupe(self._recorded_tob.pop(self._tob_timestamp, []))
+        replayed = iter(_dedupe(self._tob_seq))
+        # expected must be a subsequence of replayed
+        if not all(any(e == r for r in replayed) for e in expected):
+            self.tob_mismatches.append(self._tob_timestamp)
+        self.tob_checked += 1
+        self._last_tob = self._tob_seq[-1]
+        self._tob_timestamp = None
+        self._tob_seq = []
+
+    def diff_trades(self):
+        '''Return the rows where replayed and recorded trades differ (through the last replayed timestamp)'''
+        recorded = pd.read_hdf(self.h5filename, 'trades').reset_index(drop=True)
+        recorded = recorded[recorded.timestamp <= self.last_timestamp][TRADE_COLUMNS].reset_index(drop=True)
+        return _diff(pd.DataFrame(self.trade_book, columns=TRADE_COLUMNS), recorded)
+
+    def diff_tob(self):
+        '''Return the recorded tob rows at the timestamps that did not match'''
+        recorded = pd.read_hdf(self.h5filename, 'tob')
+        return recorded[recorded.timestamp.isin(self.tob_mismatches)][TOB_COLUMNS].reset_index(drop=True)
+
+    def report(self):
+        trades = self.diff_trades()
+        lines = ['{0}: {1} orders in {2:.3f} seconds ({3:,.0f} orders/second)'.format(
+                     self.h5filename, self.num_orders, self.seconds, self.orders_per_second),
+                 'trades: {0} replayed, {1} differ'.format(len(self.trade_book), len(trades))]
+        if self.check_tob:
+            lines.append('tob: {0} timestamps checked, {1} differ'.format(self.tob_checked, len(self.tob_mismatches)))
+        if len(trades):
+            lines.append('first trade difference:\n{0}'.format(trades.head(2)))
+        if self.tob_mismatches:
+            lines.append('first tob difference:\n{0}'.format(self.diff_tob().head(2)))
+        return '\n'.join(lines)
+
+
+def _group_tob(df):
+    '''{timestamp: [tob tuples in order]}'''
+    grouped = {}
+    for row in zip(*(df[c].tolist() for c in TOB_COLUMNS)):
+        grouped.setdefault(row[0], []).append(row)
+    return grouped
+
+def _dedupe(seq):
+    '''Drop consecutive repeats'''
+    return [x for i, x in enumerate(seq) if not i or x != seq[i - 1]]
+
+def _diff(replayed, recorded):
+    '''Rows that differ, side by side; rows present in only one frame count as differences'''
+    n = max(len(replayed), len(recorded))
+    replayed = replayed.reindex(range(n))
+    recorded = recorded.reindex(range(n))
+    mismatch = (replayed != recorded).any(axis=1)
+    return pd.concat([replayed[mismatch], recorded[mismatch]], axis=1, keys=['replayed', 'recorded'])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mmabm.replay', description='Replay recorded orders through a matching engine.')
+    parser.add_argument('h5filename', nargs='+')
+    parser.add_argument('--engine', default='mmabm.orderbook:Orderbook', help='engine class as module:Class')
+    parser.add_argument('--no-tob', action='store_true', help='skip the top of book check (time the engine only)')
+    args = parser.parse_args(argv)
+    engine = load_engine(args.engine)
+    ok = True
+    for h5filename in args.h5filename:
+        replay = Replay(h5filename, engine, check_tob=not args.no_tob).run()
+        print(replay.report())
+        ok = ok and replay.diff_trades().empty and not replay.tob_mismatches
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
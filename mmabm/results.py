@@ -0,0 +1,166 @@
+'''
+Lazy, chunked access to the tables in one or many run files.
+
+Run(h5filename) and Results(*patterns) open nothing until a table is read. Tables are
+read a chunk at a time, with column projection and where filters handed to the HDF5
+store, so only the rows and columns asked for are loaded:
+
+    results = Results('sweeps/trial1/*.h5')
+    for run, chunk in results.iter('tob', columns=['best_bid', 'best_ask'], where='timestamp > 100000'):
+        ...
+    results.describe('trades', 'price')     # moments per run and across all runs
+    results.map(my_function, 'tob')         # my_function(h5filename, 'tob') for every run, in parallel
+
+where is a PyTables condition on the index and the data columns: timestamp in the orders,
+trades and tob tables, mmid and timestamp in mmp, Step in the signal tables and start and
+end in stats. Conditions on other columns (or on files written before these were data
+columns) are applied to each chunk in pandas instead (DataFrame.query).
+'''
+import argparse
+import ast
+import glob
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from mmabm.stats import Moments
+
+
+CHUNKSIZE = 100000
+
+
+class Run:
+    '''The tables in one h5 file'''
+
+    def __init__(self, h5filename):
+        self.h5filename = h5filename
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1!r})'.format(class_name, self.h5filename)
+
+    def _store(self):
+        return pd.HDFStore(self.h5filename, 'r')
+
+    def keys(self):
+        with self._store() as store:
+            return [key.lstrip('/') for key in store.keys()]
+
+    def nrows(self, key):
+        with self._store() as store:
+            return store.get_storer(key).nrows
+
+    def columns(self, key):
+        '''Column names of table key (read from the first row)'''
+        with self._store() as store:
+            return list(store.select(key, stop=1).columns)
+
+    def data_columns(self, key):
+        '''Columns of table key that where can refer to'''
+        with self._store() as store:
+            return list(store.get_storer(key).data_columns)
+
+    def iter(self, key, columns=None, where=None, chunksize=CHUNKSIZE):
+        '''Yield table key as DataFrames of up to chunksize rows (before the where filter)'''
+        with self._store() as store:
+            queryable = set(store.get_storer(key).data_columns) | {'index'}
+            if where is None or _names(where) <= queryable:
+                for chunk in store.select(key, where=where, columns=columns, chunksize=chunksize):
+                    yield chunk
+            else:
+                # filter in pandas: read the columns the condition needs too
+                read = None if columns is None else sorted(set(columns) | (_names(where) - {'index'}))
+                for chunk in store.select(key, columns=read, chunksize=chunksize):
+                    chunk = chunk.query(where)
+                    yield chunk if columns is None else chunk[columns]
+
+    def read(self, key, columns=None, where=None, chunksize=CHUNKSIZE):
+        '''Return table key (the rows matching where) as one DataFrame'''
+        chunks = list(self.iter(key, columns, where, chunksize))
+        if not chunks:
+            return pd.DataFrame(columns=columns if columns is not None else self.columns(key))
+        return pd.concat(chunks)
+
+    def moments(self, key, column, where=None, chunksize=CHUNKSIZE):
+        '''stats.Moments of column in table key'''
+        m = Moments()
+        for chunk in self.iter(key, [column], where, chunksize):
+            m.merge(Moments.of(chunk[column].values))
+        return m
+
+
+class Results:
+    '''The run files matching one or more glob patterns (or file names), in sorted order'''
+
+    def __init__(self, *patterns, processes=None):
+        filenames = []
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern))
+            filenames.extend(f for f in matches if f not in filenames)
+        self.runs = [Run(f) for f in filenames]
+        self.processes = processes or os.cpu_count()
+
+    def __len__(self):
+        return len(self.runs)
+
+    def __iter__(self):
+        return iter(self.runs)
+
+    def iter(self, key, columns=None, where=None, chunksize=CHUNKSIZE):
+        '''Yield (run, chunk) for table key of every run in turn'''
+        for run in self.runs:
+            for chunk in run.iter(key, columns, where, chunksize):
+                yield run, chunk
+
+    def map(self, fn, *args):
+        '''Return [fn(h5filename, *args) for each run], computed in a process pool (fn must be picklable)'''
+        filenames = [run.h5filename for run in self.runs]
+        if self.processes == 1 or len(filenames) < 2:
+            return [fn(f, *args) for f in filenames]
+        with ProcessPoolExecutor(max_workers=min(self.processes, len(filenames))) as pool:
+            return list(pool.map(fn, filenames, *[[a] * len(filenames) for a in args]))
+
+    def describe(self, key, column, where=None, chunksize=CHUNKSIZE):
+        '''DataFrame of n, mean, std, min and max of column per run and (row 'all') across all runs'''
+        moments = self.map(_moments, key, column, where, chunksize)
+        total = Moments()
+        for m in moments:
+            total.merge(m)
+        rows = [_row(m) for m in moments] + [_row(total)]
+        index = [os.path.basename(run.h5filename) for run in self.runs] + ['all']
+        return pd.DataFrame(rows, index=index)
+
+
+def _names(where):
+    '''Names referred to by a where condition'''
+    return {node.id for node in ast.walk(ast.parse(where.replace('&', ' and ').replace('|', ' or '), mode='eval'))
+            if isinstance(node, ast.Name)}
+
+def _moments(h5filename, key, column, where, chunksize):
+    return Run(h5filename).moments(key, column, where, chunksize)
+
+def _row(m):
+    return {'n': m.n, 'mean': m.mean if m.n else None, 'std': m.std, 'min': m.min, 'max': m.max}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mmabm.results', description='Describe a column across run files.')
+    parser.add_argument('patterns', nargs='+', help='h5 files or glob patterns')
+    parser.add_argument('--key', required=True, help='table, e.g. tob or trades')
+    parser.add_argument('--column', required=True)
+    parser.add_argument('--where', help="condition, e.g. 'timestamp > 100000'")
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args(argv)
+    results = Results(*args.patterns, processes=args.processes)
+    if not len(results):
+        print('no files match {0}'.format(args.patterns))
+        return 1
+    print(results.describe(args.key, args.column, args.where).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+'''
+Seeded, independent random number streams.
+
+RandomStreams(seed).stream(key...) returns a RandomStream for a component. Each stream's
+SeedSequence is derived from the run seed and a fixed spawn key, so a component's draws do
+not depend on how many other components exist, the order they are built in or which
+process they run in.
+
+RandomStream wraps a numpy Generator and pre-draws blocks of uniforms and exponentials.
+It implements the parts of the random module API (random, expovariate, randint, randrange,
+choice, choices, sample) and of the np.random API (random(size), random_sample, choice with
+size/p, binomial) that the simulation uses, so it can be passed wherever the random module
+or np.random is used by default.
+'''
+import math
+
+from bisect import bisect
+
+import numpy as np
+
+
+# Spawn keys for the simulation components
+SCHEDULER = 0
+BOOK = 1
+QTAKE = 2
+PROVIDERS = 3
+TAKERS = 4
+INFORMED = 5
+PENNYJUMPER = 6
+MARKETMAKERS = 7
+EXOGENOUS = 8
+GENETICS = 9
+VENUES = 10
+
+
+class RandomStream:
+
+    def __init__(self, seed_seq, block=4096):
+        self.seed_seq = seed_seq
+        self._gen = np.random.Generator(np.random.PCG64(seed_seq))
+        self._block = block
+        self._uniforms = iter(())
+        self._exponentials = iter(())
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1}, {2})'.format(class_name, self.seed_seq.entropy, self.seed_seq.spawn_key)
+
+    def child(self, *key):
+        '''Return a RandomStream keyed below this one'''
+        return RandomStream(np.random.SeedSequence(self.seed_seq.entropy, spawn_key=self.seed_seq.spawn_key + key),
+                            self._block)
+
+    # random module API
+    def random(self, size=None):
+        '''One buffered uniform on [0, 1) or, with size, an array from the generator'''
+        if size is not None:
+            return self._gen.random(size)
+        try:
+            return next(self._uniforms)
+        except StopIteration:
+            self._uniforms = iter(self._gen.random(self._block).tolist())
+            return next(self._uniforms)
+
+    def expovariate(self, lambd):
+        try:
+            return next(self._exponentials) / lambd
+        except StopIteration:
+            self._exponentials = iter(self._gen.standard_exponential(self._block).tolist())
+            return next(self._exponentials) / lambd
+
+    def randrange(self, start, stop=None):
+        if stop is None:
+            return int(self.random() * start)
+        return start + int(self.random() * (stop - start))
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq, size=None, replace=True, p=None):
+        '''random.choice(seq) or, with size and/or p, np.random.choice(seq, size, replace, p)'''
+        if size is None and p is None:
+            return seq[int(self.random() * len(seq))]
+        return self._gen.choice(seq, size, replace, p)
+
+    def choices(self, population, weights=None, *, cum_weights=None, k=1):
+        if cum_weights is None:
+            if weights is None:
+                return [population[int(self.random() * len(population))] for _ in range(k)]
+            cum_weights = np.cumsum(weights).tolist()
+        total = cum_weights[-1]
+        hi = len(cum_weights) - 1
+        return [population[bisect(cum_weights, self.random() * total, 0, hi)] for _ in range(k)]
+
+    def sample(self, population, k):
+        '''Partial Fisher-Yates shuffle with buffered uniforms'''
+        pool = list(population)
+        n = len(pool)
+        if not 0 <= k <= n:
+            raise ValueError('Sample larger than population or is negative')
+        for i in range(k):
+            j = i + int(self.random() * (n - i))
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+    # np.random API
+    def random_sample(self, size=None):
+        return self.random(size)
+
+    def binomial(self, n, p, size=None):
+        return self._gen.binomial(n, p, size)
+
+
+class RandomStreams:
+    '''Factory for the RandomStreams of one run'''
+
+    def __init__(self, seed, block=4096):
+        self.seed = seed
+        self._block = block
+
+    def stream(self, *key):
+        return RandomStream(np.random.SeedSequence(self.seed, spawn_key=key), self._block)
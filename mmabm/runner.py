@@ -2,7 +2,6 @@ import random
 import time
 
 import numpy as np
-import pandas as pd
 
 import mmabm.genetics as genetics
 import mmabm.learner as learner
@@ -10,6 +9,7 @@ import mmabm.orderbook as orderbook
 import mmabm.signal as signal
 import mmabm.trader as trader
 
+from mmabm.qtake import make_q_take
 from mmabm.shared import Side, OType, TType
 
 
@@ -34,7 +34,7 @@ class Runner:
         if self.informed:
             if self.taker:
                 takerTradeV = np.array([t.quantity*self.run_steps/t.delta_t for t in self.takers])
-            informedTrades = np.int(kwargs['iMu']*np.sum(takerTradeV) if self.taker else 1/kwargs['iMu'])
+            informedTrades = int(kwargs['iMu']*np.sum(takerTradeV) if self.taker else 1/kwargs['iMu'])
             self.informed_trader = self.buildInformedTrader(kwargs['informedMaxQ'], kwargs['informedRunLength'], informedTrades, prime1)
         self.pj = kwargs.pop('PennyJumper')
         if self.pj:
@@ -46,17 +46,67 @@ class Runner:
         self.traders, self.num_traders = self.makeAll()
         self.q_take, self.lambda_t = self.makeQTake(kwargs['QTake'], kwargs['Lambda0'], kwargs['WhiteNoise'], kwargs['CLambda'])
         self.seedOrderbook()
+        self.prime1 = prime1
+        self.lambda0 = kwargs['Lambda0']
+        self.write_interval = write_interval
+        self.current_time = prime1
+        self.top_of_book = None
+        self._mcs_step = self.mcsStepPJ if self.pj else self.mcsStep
+
+    def run(self):
+        ''' Prime, run all steps and write the output
+        '''
+        self.prime()
+        self.run_until(self.run_steps)
+        self.finalize()
+
+    def prime(self):
+        ''' Prime the book with Providers (if any) and seed the MarketMakers
+        '''
         if self.provider:
-            self.makeSetup(prime1, kwargs['Lambda0'])
+            self.makeSetup(self.prime1, self.lambda0)
         else:
             self.prime_MML(1, 1002000, 997995)
-        if self.pj:
-            self.runMcsPJ(prime1, write_interval)
-        else:
-            self.runMcs(prime1, write_interval)
-        self.exchange.trade_book_to_h5(h5filename)
+        self.top_of_book = self.exchange.report_top_of_book(self.prime1)
+
+    def step(self, n=1):
+        ''' Run the next n steps (or fewer if the run ends first)
+        '''
+        self.run_until(self.current_time + n)
+
+    def run_until(self, stop):
+        ''' Run steps current_time through stop - 1
+        '''
+        for current_time in range(self.current_time, min(stop, self.run_steps)):
+            self._mcs_step(current_time)
+            self._end_step(current_time)
+
+    def events(self, stop=None):
+        ''' Run steps current_time through stop - 1 one at a time, yielding a dict per step:
+        step, top of book at the end of the step, trades in the step and MM state
+        '''
+        stop = self.run_steps if stop is None else min(stop, self.run_steps)
+        for current_time in range(self.current_time, stop):
+            trade_index = len(self.exchange.trade_book)
+            self._mcs_step(current_time)
+            event = {'step': current_time, 'tob': self.top_of_book,
+                     'trades': self.exchange.trade_book[trade_index:],
+                     'mm': [m.report_state() for m in self.marketmakers]}
+            self._end_step(current_time)
+            yield event
+
+    def _end_step(self, current_time):
+        self.current_time = current_time + 1
+        if not current_time % self.write_interval:
+            self.exchange.order_history_to_h5(self.h5filename)
+            self.exchange.sip_to_h5(self.h5filename)
+
+    def finalize(self):
+        ''' Write the trade book, MM signals, q_take and MM profitability
+        '''
+        self.exchange.trade_book_to_h5(self.h5filename)
         for m in self.marketmakers:
-            m.signal_collector_to_h5(h5filename)
+            m.signal_collector_to_h5(self.h5filename)
         self.qTakeToh5()
         self.mmProfitabilityToh5()
                   
@@ -159,18 +209,7 @@ class Runner:
         return learner.MarketMakerL(tid, maxq, arrInt, a, b, c, genes, keeper, mutate_pct, genetic_int)
     
     def makeQTake(self, q_take, lambda_0, wn, c_lambda):
-        if q_take:
-            noise = np.random.rand(2, self.run_steps)
-            qt_take = np.empty_like(noise)
-            qt_take[:,0] = 0.5
-            for i in range(1, self.run_steps):
-                qt_take[:,i] = qt_take[:,i-1] + (noise[:,i-1]>qt_take[:,i-1])*wn - (noise[:,i-1]<qt_take[:,i-1])*wn
-            lambda_t = -lambda_0*(1 + (np.abs(qt_take[1] - 0.5)/np.sqrt(np.mean(np.square(qt_take[0] - 0.5))))*c_lambda)
-            return qt_take[1], lambda_t
-        else:
-            qt_take = np.array([0.5]*self.run_steps)
-            lambda_t = np.array([-lambda_0]*self.run_steps)
-            return qt_take, lambda_t
+        return make_q_take(self.run_steps, q_take, lambda_0, wn, c_lambda)
     
     def makeAll(self):
         trader_list = []
@@ -234,101 +273,99 @@ class Runner:
             # side of the resting order: ASK -> taker buy
             self.signal.oibv += c['quantity'] * (1 if c['side'] == Side.ASK else -1)
     
-    def runMcs(self, prime1, write_interval):
-        top_of_book = self.exchange.report_top_of_book(prime1)
-        for current_time in range(prime1, self.run_steps):
-            traders = random.sample(self.traders, self.num_traders)
-            for t in traders:
-                if t.trader_type == TType.Provider:
-                    if not current_time % t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time, top_of_book, self.q_provide, self.lambda_t[current_time]))
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                    t.bulk_cancel(current_time)
-                    if t.cancel_collector:
+    def mcsStep(self, current_time):
+        '''Run one step: each trader in random order'''
+        top_of_book = self.top_of_book
+        traders = random.sample(self.traders, self.num_traders)
+        for t in traders:
+            if t.trader_type == TType.Provider:
+                if not current_time % t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time, top_of_book, self.q_provide, self.lambda_t[current_time]))
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                t.bulk_cancel(current_time)
+                if t.cancel_collector:
+                    self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+            elif t.trader_type == TType.MarketMaker:
+                if not current_time % t.arrInt:
+                    t.process_signal1(current_time, self.signal.make_signal(current_time, top_of_book['best_bid'], top_of_book['best_ask']))
+                    if t.cancel_collector: # need to check?
                         self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                    t.process_signal2(current_time, top_of_book['best_bid'], top_of_book['best_ask'])
+                    for q in t.quote_collector:
+                        self.exchange.process_order(q)
+                    if t.cancel_collector: # need to check?
+                        self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                    self.signal.reset_current()
+            elif t.trader_type == TType.Taker:
+                if not current_time % t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time, self.q_take[current_time]))
+                    if self.exchange.traded:
+                        self.confirmTrades()
                         top_of_book = self.exchange.report_top_of_book(current_time)
-                elif t.trader_type == TType.MarketMaker:
-                    if not current_time % t.arrInt:
-                        t.process_signal1(current_time, self.signal.make_signal(current_time, top_of_book['best_bid'], top_of_book['best_ask']))
-                        if t.cancel_collector: # need to check?
-                            self.doCancels(t)
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                        t.process_signal2(current_time, top_of_book['best_bid'], top_of_book['best_ask'])
-                        for q in t.quote_collector:
-                            self.exchange.process_order(q)
-                        if t.cancel_collector: # need to check?
-                            self.doCancels(t)
+            else:
+                if current_time in t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time))
+                    if self.exchange.traded:
+                        self.confirmTrades()
                         top_of_book = self.exchange.report_top_of_book(current_time)
-                        self.signal.reset_current()
-                elif t.trader_type == TType.Taker:
-                    if not current_time % t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time, self.q_take[current_time]))
-                        if self.exchange.traded:
-                            self.confirmTrades()
-                            top_of_book = self.exchange.report_top_of_book(current_time)
-                else:
-                    if current_time in t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time))
-                        if self.exchange.traded:
-                            self.confirmTrades()
-                            top_of_book = self.exchange.report_top_of_book(current_time)
-            if not current_time % write_interval:
-                self.exchange.order_history_to_h5(self.h5filename)
-                self.exchange.sip_to_h5(self.h5filename)
+        self.top_of_book = top_of_book
                 
-    def runMcsPJ(self, prime1, write_interval):
-        top_of_book = self.exchange.report_top_of_book(prime1)
-        for current_time in range(prime1, self.run_steps):
-            traders = random.sample(self.traders, self.num_traders)
-            for t in traders:
-                if t.trader_type == TType.Provider:
-                    if not current_time % t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time, top_of_book, self.q_provide, self.lambda_t[current_time]))
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                    t.bulk_cancel(current_time)
-                    if t.cancel_collector:
-                        self.doCancels(t)
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                elif t.trader_type == TType.MarketMaker:
-                    if not current_time % t.arrInt:
-                        t.process_signal(current_time, top_of_book, self.q_provide)
-                        for q in t.quote_collector:
-                            self.exchange.process_order(q)
+    def mcsStepPJ(self, current_time):
+        '''Run one step: each trader in random order with PennyJumper turns'''
+        top_of_book = self.top_of_book
+        traders = random.sample(self.traders, self.num_traders)
+        for t in traders:
+            if t.trader_type == TType.Provider:
+                if not current_time % t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time, top_of_book, self.q_provide, self.lambda_t[current_time]))
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                t.bulk_cancel(current_time)
+                if t.cancel_collector:
+                    self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+            elif t.trader_type == TType.MarketMaker:
+                if not current_time % t.arrInt:
+                    t.process_signal(current_time, top_of_book, self.q_provide)
+                    for q in t.quote_collector:
+                        self.exchange.process_order(q)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                t.bulk_cancel(current_time)
+                if t.cancel_collector:
+                    self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+            elif t.trader_type == TType.Taker:
+                if not current_time % t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time, self.q_take[current_time]))
+                    if self.exchange.traded:
+                        self.confirmTrades()
                         top_of_book = self.exchange.report_top_of_book(current_time)
-                    t.bulk_cancel(current_time)
-                    if t.cancel_collector:
-                        self.doCancels(t)
+            else:
+                if current_time in t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time))
+                    if self.exchange.traded:
+                        self.confirmTrades()
                         top_of_book = self.exchange.report_top_of_book(current_time)
-                elif t.trader_type == TType.Taker:
-                    if not current_time % t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time, self.q_take[current_time]))
-                        if self.exchange.traded:
-                            self.confirmTrades()
-                            top_of_book = self.exchange.report_top_of_book(current_time)
-                else:
-                    if current_time in t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time))
-                        if self.exchange.traded:
-                            self.confirmTrades()
-                            top_of_book = self.exchange.report_top_of_book(current_time)
-                if random.random() < self.alpha_pj:
-                    self.pennyjumper.process_signal(current_time, top_of_book, self.q_take[current_time])
-                    if self.pennyjumper.cancel_collector:
-                        for c in self.pennyjumper.cancel_collector:
-                            self.exchange.process_order(c)
-                    if self.pennyjumper.quote_collector:
-                        for q in self.pennyjumper.quote_collector:
-                            self.exchange.process_order(q)
-                    top_of_book = self.exchange.report_top_of_book(current_time)
-            if not current_time % write_interval:
-                self.exchange.order_history_to_h5(self.h5filename)
-                self.exchange.sip_to_h5(self.h5filename)
+            if random.random() < self.alpha_pj:
+                self.pennyjumper.process_signal(current_time, top_of_book, self.q_take[current_time])
+                if self.pennyjumper.cancel_collector:
+                    for c in self.pennyjumper.cancel_collector:
+                        self.exchange.process_order(c)
+                if self.pennyjumper.quote_collector:
+                    for q in self.pennyjumper.quote_collector:
+                        self.exchange.process_order(q)
+                top_of_book = self.exchange.report_top_of_book(current_time)
+        self.top_of_book = top_of_book
                 
     def qTakeToh5(self):
+        import pandas as pd
         temp_df = pd.DataFrame({'qt_take': self.q_take, 'lambda_t': self.lambda_t})
         temp_df.to_hdf(self.h5filename, 'qtl', append=True, format='table', complevel=5, complib='blosc')
         
     def mmProfitabilityToh5(self):
+        import pandas as pd
         for m in self.marketmakers:
             temp_df = pd.DataFrame(m.cash_flow_collector)
             temp_df.to_hdf(self.h5filename, 'mmp', append=True, format='table', complevel=5, complib='blosc')
@@ -356,5 +393,6 @@ if __name__ == '__main__':
         h5_file = '%s%s.h5' % (h5dir, h5_root)
     
         market1 = Runner(h5filename=h5_file, **settings)
+        market1.run()
 
         print('Run %d: %.1f seconds' % (j, time.time() - start))
\ No newline at end of file
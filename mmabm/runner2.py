@@ -2,71 +2,257 @@ import random
 import time
 
 import numpy as np
-import pandas as pd
 
+import mmabm.checkpoint as checkpoint
+import mmabm.cohort as cohort
+import mmabm.exogenous as exogenous
+import mmabm.flusher as flusher
+import mmabm.gapool as gapool
+import mmabm.instrument as instrument
+import mmabm.latency as latency
 import mmabm.learner2 as learner
 import mmabm.orderbook as orderbook
+import mmabm.stats as stats
 import mmabm.trader as trader
 
-from mmabm.settings import *
+from mmabm.config import Config
+from mmabm.qtake import make_q_take
+from mmabm.rng import RandomStreams, SCHEDULER, BOOK, QTAKE, PROVIDERS, TAKERS, INFORMED, PENNYJUMPER, MARKETMAKERS
 from mmabm.shared import Side, OType, TType
 from mmabm.signal2 import ImbalanceSignal, OrderFlowSignal
 
 
 class Runner:
+
+    # Config fields that reconfigure() can change once the market is built
+    RECONFIGURABLE = frozenset(['write_interval', 'checkpoint_interval', 'q_provide', 'provider_delta', 'taker_mu',
+                                'pj_alpha', 'mm_maxq', 'arr_int', 'genetic_int',
+                                'oi_action_mutate_p', 'oi_cond_cross_p', 'oi_cond_mutate_p', 'oi_keep_pct',
+                                'of_action_mutate_p', 'of_cond_cross_p', 'of_cond_mutate_p', 'of_keep_pct'])
+
+    # Implementations; override in a subclass to run an alternative (see mmabm.golden)
+    exchange_class = orderbook.Orderbook
+    marketmaker_class = learner.MarketMakerL
     
-    def __init__(self, h5filename='test.h5', mpi=MPI, prime1=PRIME1, run_steps=RUN_STEPS, write_interval=WRITE_INTERVAL):
-        self.exchange = orderbook.Orderbook()
-        self.oi_signal = ImbalanceSignal(OI_SIGNAL, OI_HIST_LEN)
-        self.of_signal = OrderFlowSignal(OF_SIGNAL, OF_HIST_LEN)
+    def __init__(self, h5filename='test.h5', config=None, **kwargs):
+        ''' config is a Config (default: settings.py values); keyword arguments
+        (e.g. run_steps=10000) override individual Config fields
+        '''
+        config = config if config is not None else Config()
+        self.config = config.replace(**kwargs) if kwargs else config
+        config = self.config
+        self._streams = None if config.seed is None else RandomStreams(config.seed)
+        self._rng = random if config.seed is None else self._stream(SCHEDULER)
+        self.exchange = self.exchange_class(fills=True) if config.fills else self.exchange_class()
+        self.oi_signal = ImbalanceSignal(config.oi_signal, config.oi_hist_len)
+        self.of_signal = OrderFlowSignal(config.of_signal, config.of_hist_len)
         self.h5filename = h5filename
-        self.mpi = mpi
-        self.prime1 = prime1
-        self.run_steps = run_steps + 1
+        self.mpi = config.mpi
+        self.prime1 = config.prime1
+        self.run_steps = config.run_steps + 1
         self.liquidity_providers = {}
         self.traders = []
-        if PROVIDER:
-            self.num_providers = NUM_PROVIDERS
-            self.providers = self.buildProviders(PROVIDER_MAXQ, PROVIDER_ALPHA, PROVIDER_DELTA)
-            self.q_provide = Q_PROVIDE
+        self.marketmakers = []
+        self.genetics = None
+        if config.provider:
+            self.num_providers = config.num_providers
+            self.providers = self.buildProviders(config.provider_maxq, config.provider_alpha, config.provider_delta)
+            self.q_provide = config.q_provide
             self.traders.extend(self.providers)
-        if TAKER:
-            self.takers = self.buildTakers(NUM_TAKERS, TAKER_MAXQ, TAKER_MU)
-            self.traders.extend(self.takers)
-        if INFORMED:
-            informedTrades = np.int(INFORMED_MU*np.sum(np.array([t.quantity*self.run_steps/t.delta_t for t in self.takers])) \
-                if TAKER else 1/INFORMED_MU)
-            self.informed_trader = self.buildInformedTrader(INFORMED_MAXQ, INFORMED_RUN_LENGTH, informedTrades)
-            self.traders.append(self.informed_trader)
-        if PENNYJUMPER:
+        if config.taker:
+            self.takers = self.buildTakers(config.num_takers, config.taker_maxq, config.taker_mu)
+            if not config.exogenous:
+                self.traders.extend(self.takers)
+        if config.informed:
+            informedTrades = int(config.informed_mu*np.sum(np.array([t.quantity*self.run_steps/t.delta_t for t in self.takers])) \
+                if config.taker else 1/config.informed_mu)
+            self.informed_trader = self.buildInformedTrader(config.informed_maxq, config.informed_run_length, informedTrades)
+            if not config.exogenous:
+                self.traders.append(self.informed_trader)
+        if config.pennyjumper:
             self.pennyjumper = self.buildPennyJumper()
-            self.alpha_pj = PJ_ALPHA
-        if MARKETMAKER:
-            self.marketmakers = self.buildMarketMakers(NUM_MMS, MM_MAXQ, ARR_INT, GENETIC_INT)
-            self.traders.extend(self.marketmakers)
+            self.alpha_pj = config.pj_alpha
+        if config.marketmaker:
+            self.marketmakers = self.buildMarketMakers(config.num_mms, config.mm_maxq, config.arr_int, config.genetic_int)
+            if config.cohort:
+                self.genetics = gapool.GeneticsPool(config.ga_processes) if config.ga_processes else None
+                self.traders.append(cohort.MarketMakerCohort(self.marketmakers, self.genetics))
+            else:
+                self.traders.extend(self.marketmakers)
         self.num_traders = len(self.traders)
-        self.q_take, self.lambda_t = self.makeQTake(Q_TAKE, LAMBDA0, WHITENOISE, C_LAMBDA)
+        self.q_take, self.lambda_t = self.makeQTake(config.q_take, config.lambda0, config.whitenoise, config.c_lambda)
+        # created before the exogenous flow, which counts its cache hits, and attached once the runner is built
+        self.instrument = instrument.Instrument(h5filename + '.instrument.json') if config.instrument else None
+        self.exogenous = exogenous.flow(self).bind(self._exogenous_traders(), self.prime1) if config.exogenous else None
         self.seedOrderbook()
-        if PROVIDER:
-            self.makeSetup(LAMBDA0)
+        self.write_interval = config.write_interval
+        self.checkpoint_interval = config.checkpoint_interval
+        self.raw_output = config.raw_output
+        self.current_time = self.prime1
+        self.top_of_book = None
+        if config.pennyjumper:
+            self._mcs_step = self.mcsStepPJBatch if config.pj_batch else self.mcsStepPJ
         else:
-            self.prime_MML(1, 1002000, 997995)
-        if PENNYJUMPER:
-            self.runMcsPJ(write_interval)
+            self._mcs_step = self.mcsStep
+        if config.fills:
+            self.confirmTrades = self.confirmFills
+        self.latency = latency.LatencyRecorder().attach(self.exchange) if config.latency else None
+        if self.instrument is not None:
+            self.instrument.attach(self)
+        self.stats = stats.MarketStats(config.stats_window, config.raw_output).attach(self) if config.stats_window else None
+        self.flusher = flusher.Flusher(config.memory_budget).attach(self) if config.memory_budget else None
+
+    def run(self):
+        ''' Prime, run all steps and write the output
+        '''
+        self.prime()
+        self.finish()
+
+    def finish(self):
+        ''' Run the remaining steps and write the output (e.g. after restoring a checkpoint)
+        '''
+        self.run_until(self.run_steps)
+        self.finalize()
+
+    def prime(self):
+        ''' Prime the book with Providers (if any) and seed the MarketMakers
+        '''
+        if self.config.provider:
+            self.makeSetup(self.config.lambda0)
         else:
-            self.runMcs(write_interval)
-        self.exchange.trade_book_to_h5(h5filename)
+            self.prime_MML(1, 1002000, 997995)
+        self.top_of_book = self.exchange.report_top_of_book(self.prime1)
+
+    def step(self, n=1):
+        ''' Run the next n steps (or fewer if the run ends first)
+        '''
+        self.run_until(self.current_time + n)
+
+    def run_until(self, stop):
+        ''' Run steps current_time through stop - 1
+        '''
+        for current_time in range(self.current_time, min(stop, self.run_steps)):
+            self._mcs_step(current_time)
+            self._end_step(current_time)
+
+    def events(self, stop=None):
+        ''' Run steps current_time through stop - 1 one at a time, yielding a dict per step:
+        step, top of book at the end of the step, trades in the step and MM state
+        '''
+        stop = self.run_steps if stop is None else min(stop, self.run_steps)
+        for current_time in range(self.current_time, stop):
+            trade_index = len(self.exchange.trade_book)
+            self._mcs_step(current_time)
+            event = {'step': current_time, 'tob': self.top_of_book,
+                     'trades': self.exchange.trade_book[trade_index:],
+                     'mm': [m.report_state() for m in self.marketmakers]}
+            self._end_step(current_time)
+            yield event
+
+    def _end_step(self, current_time):
+        self.current_time = current_time + 1
+        if self.stats is not None:
+            self.stats.observe(current_time, self.top_of_book)
+        if not current_time % self.write_interval:
+            if self.raw_output:
+                self.exchange.order_history_to_h5(self.h5filename)
+                self.exchange.sip_to_h5(self.h5filename)
+            else:
+                self._discard_raw()
+            if self.stats is not None:
+                self.stats.windows_to_h5(self.h5filename)
+            if self.instrument is not None:
+                self.instrument.report(current_time)
+            if self.flusher is not None:
+                self.flusher.report(current_time)
+        if self.flusher is not None:
+            self.flusher.check()
+        if self.checkpoint_interval and not self.current_time % self.checkpoint_interval:
+            self.checkpoint()
+
+    def reconfigure(self, **changes):
+        ''' Change Config fields of a built (e.g. burned-in) market; only RECONFIGURABLE fields can change.
+        A new taker_mu redraws the Takers' arrival intervals.
+        '''
+        config = self.config.replace(**changes)
+        fixed = sorted(k for k in changes if k not in self.RECONFIGURABLE and getattr(config, k) != getattr(self.config, k))
+        if fixed:
+            raise ValueError('Cannot change {0} once the market is built'.format(fixed))
+        old, self.config = self.config, config
+        self.write_interval = config.write_interval
+        self.checkpoint_interval = config.checkpoint_interval
+        if config.provider:
+            self.q_provide = config.q_provide
+            for p in self.providers:
+                p._delta = config.provider_delta
+        if config.taker and config.taker_mu != old.taker_mu:
+            for t in self.takers:
+                t.delta_t = t._make_delta(config.taker_mu)
+            if self.exogenous is not None:
+                self.exogenous = exogenous.build(self, self.current_time).bind(self._exogenous_traders(), self.current_time)
+        if config.pennyjumper:
+            self.alpha_pj = config.pj_alpha
         for m in self.marketmakers:
-            m.signal_collector_to_h5(h5filename)
-            m.mmProfitabilityToh5(h5filename)
-        self.qTakeToh5()
+            m.reconfigure(config)
+
+    def checkpoint(self, filename=None):
+        ''' Save a snapshot of the run to filename (default: <h5filename>.ckpt); see mmabm.checkpoint
+        '''
+        checkpoint.save(self, filename if filename is not None else self.h5filename + '.ckpt')
+
+    @classmethod
+    def restore(cls, filename, h5filename=None):
+        ''' Return the Runner saved by checkpoint(), ready to continue from where it stopped
+        '''
+        return checkpoint.load(filename, h5filename)
+
+    def finalize(self):
+        ''' Write the trade book, MM signals and profitability and q_take (if raw_output) and the stats
+        '''
+        if self.raw_output:
+            self.exchange.trade_book_to_h5(self.h5filename)
+            for m in self.marketmakers:
+                m.signal_collector_to_h5(self.h5filename)
+                m.mmProfitabilityToh5(self.h5filename)
+            self.qTakeToh5()
+        if self.stats is not None:
+            self.stats.summary_to_h5(self.h5filename)
+        if self.latency is not None:
+            self.latency.dump(self.h5filename + '.latency.json')
+        if self.instrument is not None:
+            self.instrument.report(self.current_time)
+        if self.flusher is not None:
+            self.flusher.report(self.current_time)
+        if self.genetics is not None:
+            self.genetics.close()
+
+    def _trades_to_h5(self, filename):
+        ''' Write the trade book before the end of the run (mmabm.flusher)
+        '''
+        self.exchange.trade_book_to_h5(filename)
+        if self.stats is not None:
+            self.stats.trades_written()
 
+    def _discard_raw(self):
+        ''' Drop the collected orders, top of book and MM cash flow and signals (raw_output False)
+        '''
+        self.exchange.clear_history()
+        for m in self.marketmakers:
+            m.cash_flow_collector.clear()
+            m.oi_signal_collector.clear()
+            m.of_signal_collector.clear()
+
+    def _stream(self, *key):
+        ''' RandomStream for a component; None (use random/np.random) if config.seed is None
+        '''
+        return None if self._streams is None else self._streams.stream(*key)
 
     def buildProviders(self, providerMaxQ, pAlpha, pDelta):
         ''' Providers id starts with 1
         '''
         provider_ids = [1000 + i for i in range(self.num_providers)]
-        provider_list = [trader.Provider(p, providerMaxQ, pDelta, pAlpha) for p in provider_ids]
+        rng = self._stream(PROVIDERS)
+        provider_list = [trader.Provider(p, providerMaxQ, pDelta, pAlpha, rng, self.config.skip_cancel) for p in provider_ids]
         self.liquidity_providers.update(dict(zip(provider_ids, provider_list)))
         return provider_list
 
@@ -74,17 +260,19 @@ class Runner:
         ''' Takers id starts with 2
         '''
         taker_ids = [2000 + i for i in range(numTakers)]
-        return [trader.Taker(t, takerMaxQ, tMu) for t in taker_ids]
+        rng = self._stream(TAKERS)
+        return [trader.Taker(t, takerMaxQ, tMu, rng) for t in taker_ids]
 
     def buildInformedTrader(self, informedMaxQ, informedRunLength, informedTrades):
         ''' Informed trader id starts with 5
         '''
-        return trader.InformedTrader(5000, informedMaxQ, informedTrades, informedRunLength, self.prime1, self.run_steps)
+        return trader.InformedTrader(5000, informedMaxQ, informedTrades, informedRunLength, self.prime1, self.run_steps,
+                                     self._stream(INFORMED), self.config.informed_schedule)
 
     def buildPennyJumper(self):
         ''' PJ id starts with 4
         '''
-        jumper = trader.PennyJumper(4000, 1, self.mpi)
+        jumper = trader.PennyJumper(4000, 1, self.mpi, self._stream(PENNYJUMPER))
         self.liquidity_providers.update({4000: jumper})
         return jumper
 
@@ -92,29 +280,21 @@ class Runner:
         ''' MM id starts with 3
         '''
         marketmaker_ids = [3000 + i for i in range(numMMs)]
-        marketmaker_list = [learner.MarketMakerL(p, maxq, arr_int, g_int) for p in marketmaker_ids]
+        marketmaker_list = [self.marketmaker_class(p, maxq, arr_int, g_int, self.config, self._stream(MARKETMAKERS, i))
+                            for i, p in enumerate(marketmaker_ids)]
         self.liquidity_providers.update(dict(zip(marketmaker_ids, marketmaker_list)))
         return marketmaker_list
 
     def makeQTake(self, q_take, lambda_0, wn, c_lambda):
-        if q_take:
-            noise = np.random.rand(2, self.run_steps)
-            qt_take = np.empty_like(noise)
-            qt_take[:,0] = 0.5
-            for i in range(1, self.run_steps):
-                qt_take[:,i] = qt_take[:,i-1] + (noise[:,i-1]>qt_take[:,i-1])*wn - (noise[:,i-1]<qt_take[:,i-1])*wn
-            lambda_t = -lambda_0*(1 + (np.abs(qt_take[1] - 0.5)/np.sqrt(np.mean(np.square(qt_take[0] - 0.5))))*c_lambda)
-            return qt_take[1], lambda_t
-        else:
-            qt_take = np.array([0.5]*self.run_steps)
-            lambda_t = np.array([-lambda_0]*self.run_steps)
-            return qt_take, lambda_t
+        rng = np.random if self._streams is None else self._stream(QTAKE)
+        return make_q_take(self.run_steps, q_take, lambda_0, wn, c_lambda, rng)
 
     def seedOrderbook(self):
-        seed_provider = trader.Provider(9999, 1, 0.05, 0.025)
+        rng = random if self._streams is None else self._stream(BOOK)
+        seed_provider = trader.Provider(9999, 1, 0.05, 0.025, rng)
         self.liquidity_providers.update({9999: seed_provider})
-        ba = random.choice(range(1000005, 1002001, 5))
-        bb = random.choice(range(997995, 999996, 5))
+        ba = rng.choice(range(1000005, 1002001, 5))
+        bb = rng.choice(range(997995, 999996, 5))
         qask = {'order_id': 1, 'trader_id': 9999, 'timestamp': 0, 'type': OType.ADD, 
                 'quantity': 1, 'side': Side.ASK, 'price': ba}
         qbid = {'order_id': 2, 'trader_id': 9999, 'timestamp': 0, 'type': OType.ADD,
@@ -129,7 +309,7 @@ class Runner:
     def makeSetup(self, lambda0):
         top_of_book = self.exchange.report_top_of_book(0)
         for current_time in range(1, self.prime1):
-            ps = random.sample(self.providers, self.num_providers)
+            ps = self._rng.sample(self.providers, self.num_providers)
             for p in ps:
                 if not current_time % p.delta_t:
                     self.exchange.process_order(p.process_signal(current_time, top_of_book, self.q_provide, -lambda0))
@@ -168,105 +348,166 @@ class Runner:
             self.oi_signal.update_v(c['quantity'] * (1 if c['side'] == Side.ASK else -1))
             self.of_signal.update_v(c['quantity'])
 
-    def runMcs(self, write_interval):
-        top_of_book = self.exchange.report_top_of_book(self.prime1)
-        for current_time in range(self.prime1, self.run_steps):
-            traders = random.sample(self.traders, self.num_traders) # random.shuffle(self.traders)
-            for t in traders:
-                if t.trader_type == TType.Provider:
-                    if not current_time % t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time, top_of_book, self.q_provide, self.lambda_t[current_time]))
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                    t.bulk_cancel(current_time)
-                    if t.cancel_collector:
-                        self.doCancels(t)
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                elif t.trader_type == TType.MarketMaker:
-                    if not current_time % t.arrInt:
-                        self._make_signals(current_time)
-                        t.process_signal1(current_time, (top_of_book['best_bid'], top_of_book['best_ask'],
-                                                         self.oi_signal.v, self.oi_signal.str,
-                                                         self.of_signal.v, self.of_signal.str))
-                        #if t.cancel_collector: # need to check?
-                        self.doCancels(t)
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                        t.process_signal2(current_time, top_of_book['best_bid'], top_of_book['best_ask'])
-                        for q in t.quote_collector:
-                            self.exchange.process_order(q)
-                        #if t.cancel_collector: # need to check?
-                        self.doCancels(t)
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                        self._reset_signals()
-                elif t.trader_type == TType.Taker:
-                    if not current_time % t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time, self.q_take[current_time]))
-                        if self.exchange.traded: # not necessary in current setup - taker always trades if time matches!
-                            self.confirmTrades()
-                            top_of_book = self.exchange.report_top_of_book(current_time)
-                else:
-                    if current_time in t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time))
-                        if self.exchange.traded: # not necessary in current setup - taker always trades if time in list!
-                            self.confirmTrades()
-                            top_of_book = self.exchange.report_top_of_book(current_time)
-            if not current_time % write_interval:
-                self.exchange.order_history_to_h5(self.h5filename)
-                self.exchange.sip_to_h5(self.h5filename)
+    def confirmFills(self):
+        '''confirmTrades for an exchange with fills: each trader's Fills in one confirm_trades_local call'''
+        by_trader = {}
+        imbalance = volume = 0
+        for f in self.exchange.confirm_trade_collector:
+            fills = by_trader.get(f.trader)
+            if fills is None:
+                by_trader[f.trader] = [f]
+            else:
+                fills.append(f)
+            # side of the resting order: ASK -> taker buy
+            imbalance += f.quantity if f.side == Side.ASK else -f.quantity
+            volume += f.quantity
+        for trader_id, fills in by_trader.items():
+            self.liquidity_providers[trader_id].confirm_trades_local(fills)
+        self.oi_signal.update_v(imbalance)
+        self.of_signal.update_v(volume)
 
-    def runMcsPJ(self, write_interval):
-        top_of_book = self.exchange.report_top_of_book(self.prime1)
-        for current_time in range(self.prime1, self.run_steps):
-            traders = random.sample(self.traders, self.num_traders) # random.shuffle(self.traders)
-            for t in traders:
-                if t.trader_type == TType.Provider:
-                    if not current_time % t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time, top_of_book, self.q_provide, self.lambda_t[current_time]))
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                    t.bulk_cancel(current_time)
-                    if t.cancel_collector:
-                        self.doCancels(t)
-                        top_of_book = self.exchange.report_top_of_book(current_time)
-                elif t.trader_type == TType.MarketMaker:
-                    if not current_time % t.arrInt:
-                        self._make_signals(current_time)
-                        t.process_signal1(current_time, (self.oi_signal.v, self.oi_signal.str, 
-                                                         top_of_book['best_bid'], top_of_book['best_ask']))
-                        #if t.cancel_collector: # need to check?
-                        self.doCancels(t)
+    def _exogenous_traders(self):
+        return (self.takers if self.config.taker else []) + ([self.informed_trader] if self.config.informed else [])
+
+    def _with_exogenous(self, current_time):
+        '''The traders and the exogenous orders of current_time in random order'''
+        traders = self.traders + self.exogenous.orders(current_time)
+        return self._rng.sample(traders, len(traders))
+
+    def mcsStep(self, current_time):
+        '''Run one step: each trader in random order'''
+        if self.exogenous is None:
+            traders = self._rng.sample(self.traders, self.num_traders) # random.shuffle(self.traders)
+        else:
+            traders = self._with_exogenous(current_time)
+        self._turns(traders, current_time)
+
+    def _turns(self, traders, current_time):
+        '''Give each of traders, in order, its turn in step current_time'''
+        top_of_book = self.top_of_book
+        for t in traders:
+            if t.trader_type == TType.Provider:
+                if not current_time % t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time, top_of_book, self.q_provide, self.lambda_t[current_time]))
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                t.bulk_cancel(current_time)
+                if t.cancel_collector:
+                    self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+            elif t.trader_type == TType.MarketMaker:
+                if not current_time % t.arrInt:
+                    self._make_signals(current_time)
+                    t.process_signal1(current_time, (top_of_book['best_bid'], top_of_book['best_ask'],
+                                                     self.oi_signal.v, self.oi_signal.str,
+                                                     self.of_signal.v, self.of_signal.str))
+                    #if t.cancel_collector: # need to check?
+                    self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                    t.process_signal2(current_time, top_of_book['best_bid'], top_of_book['best_ask'])
+                    for q in t.quote_collector:
+                        self.exchange.process_order(q)
+                    #if t.cancel_collector: # need to check?
+                    self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                    self._reset_signals()
+            elif t.trader_type == TType.Taker:
+                if not current_time % t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time, self.q_take[current_time]))
+                    if self.exchange.traded: # not necessary in current setup - taker always trades if time matches!
+                        self.confirmTrades()
                         top_of_book = self.exchange.report_top_of_book(current_time)
-                        t.process_signal2(current_time, top_of_book['best_bid'], top_of_book['best_ask'])
-                        for q in t.quote_collector:
-                            self.exchange.process_order(q)
-                        #if t.cancel_collector: # need to check?
-                        self.doCancels(t)
+            else:
+                if current_time in t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time))
+                    if self.exchange.traded: # not necessary in current setup - taker always trades if time in list!
+                        self.confirmTrades()
                         top_of_book = self.exchange.report_top_of_book(current_time)
-                        self._reset_signals()
-                elif t.trader_type == TType.Taker:
-                    if not current_time % t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time, self.q_take[current_time]))
-                        if self.exchange.traded: # not necessary in current setup - taker always trades if time matches!
-                            self.confirmTrades()
-                            top_of_book = self.exchange.report_top_of_book(current_time)
-                else:
-                    if current_time in t.delta_t:
-                        self.exchange.process_order(t.process_signal(current_time))
-                        if self.exchange.traded: # not necessary in current setup - taker always trades if time in list!
-                            self.confirmTrades()
-                            top_of_book = self.exchange.report_top_of_book(current_time)
-                if random.random() < self.alpha_pj:
-                    self.pennyjumper.process_signal(current_time, top_of_book, self.q_take[current_time])
-                    #if self.pennyjumper.cancel_collector: # need to check?
-                    for c in self.pennyjumper.cancel_collector:
-                        self.exchange.process_order(c)
-                    #if self.pennyjumper.quote_collector: # need to check?
-                    for q in self.pennyjumper.quote_collector:
+        self.top_of_book = top_of_book
+
+    def mcsStepPJBatch(self, current_time):
+        '''Run one step: mcsStepPJ with the PennyJumper turns drawn at the start of the step'''
+        traders = self._rng.sample(self.traders, self.num_traders) # random.shuffle(self.traders)
+        start = 0
+        for slot, jumper in self._jumper_turns(self.num_traders, [(self.pennyjumper, self.alpha_pj)]):
+            self._turns(traders[start:slot + 1], current_time)
+            self._jump(jumper, current_time)
+            start = slot + 1
+        self._turns(traders[start:], current_time)
+
+    def _jumper_turns(self, n, jumpers):
+        '''(slot, jumper) turns for a step of n traders, sorted by slot: each of jumpers, (jumper, alpha)
+        pairs, gets a turn after each trader with probability alpha - a Binomial(n, alpha) count of
+        turns at distinct uniformly drawn slots; jumpers with the same slot go in the order given'''
+        binomial = np.random.binomial if self._streams is None else self._rng.binomial
+        turns = []
+        for k, (jumper, alpha) in enumerate(jumpers):
+            slots = self._rng.sample(range(n), int(binomial(n, alpha)))
+            turns.extend((slot, k, jumper) for slot in slots)
+        turns.sort(key=lambda turn: turn[:2])
+        return [(slot, jumper) for slot, _, jumper in turns]
+
+    def _jump(self, jumper, current_time):
+        jumper.process_signal(current_time, self.top_of_book, self.q_take[current_time])
+        for c in jumper.cancel_collector:
+            self.exchange.process_order(c)
+        for q in jumper.quote_collector:
+            self.exchange.process_order(q)
+        self.top_of_book = self.exchange.report_top_of_book(current_time)
+
+    def mcsStepPJ(self, current_time):
+        '''Run one step: each trader in random order with PennyJumper turns'''
+        top_of_book = self.top_of_book
+        traders = self._rng.sample(self.traders, self.num_traders) # random.shuffle(self.traders)
+        for t in traders:
+            if t.trader_type == TType.Provider:
+                if not current_time % t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time, top_of_book, self.q_provide, self.lambda_t[current_time]))
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                t.bulk_cancel(current_time)
+                if t.cancel_collector:
+                    self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+            elif t.trader_type == TType.MarketMaker:
+                if not current_time % t.arrInt:
+                    self._make_signals(current_time)
+                    t.process_signal1(current_time, (top_of_book['best_bid'], top_of_book['best_ask'],
+                                                     self.oi_signal.v, self.oi_signal.str,
+                                                     self.of_signal.v, self.of_signal.str))
+                    #if t.cancel_collector: # need to check?
+                    self.doCancels(t)
+                    top_of_book = self.exchange.report_top_of_book(current_time)
+                    t.process_signal2(current_time, top_of_book['best_bid'], top_of_book['best_ask'])
+                    for q in t.quote_collector:
                         self.exchange.process_order(q)
+                    #if t.cancel_collector: # need to check?
+                    self.doCancels(t)
                     top_of_book = self.exchange.report_top_of_book(current_time)
-            if not current_time % write_interval:
-                self.exchange.order_history_to_h5(self.h5filename)
-                self.exchange.sip_to_h5(self.h5filename)
+                    self._reset_signals()
+            elif t.trader_type == TType.Taker:
+                if not current_time % t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time, self.q_take[current_time]))
+                    if self.exchange.traded: # not necessary in current setup - taker always trades if time matches!
+                        self.confirmTrades()
+                        top_of_book = self.exchange.report_top_of_book(current_time)
+            else:
+                if current_time in t.delta_t:
+                    self.exchange.process_order(t.process_signal(current_time))
+                    if self.exchange.traded: # not necessary in current setup - taker always trades if time in list!
+                        self.confirmTrades()
+                        top_of_book = self.exchange.report_top_of_book(current_time)
+            if self._rng.random() < self.alpha_pj:
+                self.pennyjumper.process_signal(current_time, top_of_book, self.q_take[current_time])
+                #if self.pennyjumper.cancel_collector: # need to check?
+                for c in self.pennyjumper.cancel_collector:
+                    self.exchange.process_order(c)
+                #if self.pennyjumper.quote_collector: # need to check?
+                for q in self.pennyjumper.quote_collector:
+                    self.exchange.process_order(q)
+                top_of_book = self.exchange.report_top_of_book(current_time)
+        self.top_of_book = top_of_book
 
     def qTakeToh5(self):
+        import pandas as pd
         temp_df = pd.DataFrame({'qt_take': self.q_take, 'lambda_t': self.lambda_t})
         temp_df.to_hdf(self.h5filename, 'qtl', append=True, format='table', complevel=5, complib='blosc')
 
@@ -286,5 +527,6 @@ if __name__ == '__main__':
         h5_file = '%s%s.h5' % (h5dir, h5_root)
     
         market1 = Runner(h5filename=h5_file)
+        market1.run()
 
         print('Run %d: %.1f seconds' % (j, time.time() - start))
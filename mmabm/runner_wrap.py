@@ -26,3 +26,4 @@ if __name__ == '__main__':
     h5_file = '%s%s.h5' % (h5dir, h5_root)
         
     market1 = runner.Runner(h5filename=h5_file, **settings)
+    market1.run()
@@ -5,6 +5,18 @@ MPI = 1
 PRIME1 = 20
 RUN_STEPS = 250000
 WRITE_INTERVAL = 5000
+SEED = None # None: global random/np.random; int: seeded per-component streams (mmabm.rng)
+CHECKPOINT_INTERVAL = 0 # steps between snapshots to <h5 file>.ckpt (mmabm.checkpoint); 0: off
+INSTRUMENT = False # count and time the hot paths (mmabm.instrument); report each write interval
+LATENCY = False # process_order latency histograms to <h5 file>.latency.json (mmabm.latency)
+STATS_WINDOW = 0 # steps per window of the 'stats' and 'summary' tables (mmabm.stats); 0: off
+RAW_OUTPUT = True # False: no orders, tob, trades, mmp, signal or qtl tables (needs STATS_WINDOW)
+MEMORY_BUDGET = 0 # MB of unwritten output: collectors are written when they outgrow their share (mmabm.flusher); 0: off
+FILLS = False # one Fill per trade for the trade_book and the confirmations (mmabm.orderbook), confirmed per trader
+
+# Venues (mmabm.multimarket)
+VENUES = ['A', 'B']
+ROUTED = ['taker', 'marketmaker'] # trader kinds routed across venues; the others have a home venue
 
 # Provider
 PROVIDER = True
@@ -13,26 +25,34 @@ PROVIDER_MAXQ = 1
 PROVIDER_ALPHA = 0.0375
 PROVIDER_DELTA = 0.025
 Q_PROVIDE = 0.5
+SKIP_CANCEL = False # Provider.bulk_cancel draws the gaps between cancels: same distribution, different draws
 
 # Taker
 TAKER = True
 NUM_TAKERS = 50
 TAKER_MAXQ = 1
 TAKER_MU = 0.001
+EXOGENOUS = False # Taker and InformedTrader orders drawn up front (mmabm.exogenous): same distribution, different draws
+EXOGENOUS_CACHE = None # directory for the drawn orders of seeded runs, reused by runs with the same parameters
 
 # Informed
 INFORMED = False
 INFORMED_MAXQ = 1
 INFORMED_RUN_LENGTH = 1
 INFORMED_MU = 0.005
+INFORMED_SCHEDULE = False # True: the informed runs are drawn in one vectorized pass (trader.make_schedule)
 
 # Penny Jumper
 PENNYJUMPER = False
 PJ_ALPHA = 0.01
+PJ_BATCH = False # the PennyJumper's turns in a step drawn at once (binomial count, random slots): same distribution, different draws
 
 # Market Maker
 MARKETMAKER = True
 NUM_MMS = 1
+COHORT = False # the MarketMakers act as one group with their Predictors evaluated together (mmabm.cohort)
+PREDICTOR_INDEX = False # match states with a ternary trie over the conditions (mmabm.trie; not with COHORT)
+GA_PROCESSES = 0 # cohort GA generations in a pool of this many processes (mmabm.gapool; needs COHORT and SEED); 0: serial
 ARR_INT = 1
 MM_MAXQ = 5
 GENETIC_INT = 250
@@ -0,0 +1,269 @@
+'''
+Streaming summary statistics of market quality.
+
+MarketStats().attach(runner) observes the runner at the end of every step - the top of
+book, the trades in the step and each MarketMaker's cash flow and inventory - and keeps,
+in constant memory:
+
+per window (e.g. 1000 steps)  spread (mean, min, max), inside depth (mean), trades, volume,
+                              realized volatility (root of the summed squared log midpoint
+                              returns) and each MarketMaker's cash flow, inventory and
+                              marked-to-midpoint profit at the end of the window
+whole run                     running moments (Welford) and P-squared quantile estimates
+                              (5%, 50%, 95%) of the per-step spread, depth, trades, volume,
+                              midpoint return and each MarketMaker's inventory
+
+Runner(stats_window=1000) appends the windows to the 'stats' table of the h5 file at
+every write_interval and writes the whole-run 'summary' table at the end;
+Runner(raw_output=False) drops the raw orders, tob, trades, mmp, signal and qtl tables.
+'''
+import math
+
+import numpy as np
+
+
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+class Moments:
+    '''Running count, mean, variance, min and max (Welford)'''
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+
+    @classmethod
+    def of(cls, values):
+        '''Moments of a numpy array (or anything np.asarray takes)'''
+        values = np.asarray(values, dtype=float)
+        m = cls()
+        if len(values):
+            m.n = len(values)
+            m.mean = float(values.mean())
+            m._m2 = float(((values - m.mean) ** 2).sum())
+            m.min = float(values.min())
+            m.max = float(values.max())
+        return m
+
+    def merge(self, other):
+        '''Combine other's observations with this one's (Chan et al.); return self'''
+        if other.n:
+            n = self.n + other.n
+            delta = other.mean - self.mean
+            self._m2 += other._m2 + delta * delta * self.n * other.n / n
+            self.mean += delta * other.n / n
+            self.n = n
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    '''Estimate of the p quantile in constant memory (Jain and Chlamtac's P-squared algorithm)'''
+
+    def __init__(self, p):
+        self.p = p
+        self.n = 0
+        self._q = []
+        self._pos = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._step = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        self.n += 1
+        q = self._q
+        if self.n <= 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        pos = self._pos
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            self._desired[i] += self._step[i]
+        for i in (1, 2, 3):
+            d = self._desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                h = self._parabolic(i, d)
+                if not q[i - 1] < h < q[i + 1]:
+                    h = q[i] + d * (q[i + d] - q[i]) / (pos[i + d] - pos[i])
+                q[i] = h
+                pos[i] += d
+
+    def _parabolic(self, i, d):
+        q, pos = self._q, self._pos
+        return q[i] + d / (pos[i + 1] - pos[i - 1]) * (
+            (pos[i] - pos[i - 1] + d) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i]) +
+            (pos[i + 1] - pos[i] - d) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1]))
+
+    @property
+    def value(self):
+        if not self.n:
+            return None
+        if self.n <= 5:
+            return self._q[min(int(self.p * self.n), self.n - 1)]
+        return self._q[2]
+
+
+class Summary:
+    '''Moments and QUANTILES of a stream of values'''
+
+    def __init__(self):
+        self.moments = Moments()
+        self.quantiles = [P2Quantile(p) for p in QUANTILES]
+
+    def add(self, x):
+        self.moments.add(x)
+        for q in self.quantiles:
+            q.add(x)
+
+    def to_dict(self):
+        m = self.moments
+        d = {'n': m.n, 'mean': m.mean, 'std': m.std, 'min': m.min, 'max': m.max}
+        d.update(('p%02d' % round(100 * q.p), q.value) for q in self.quantiles)
+        return d
+
+
+class MarketStats:
+
+    def __init__(self, window=1000, keep_trades=True):
+        self.window = window
+        self.keep_trades = keep_trades
+        self.summaries = {}
+        self.windows = []
+        self.exchange = None
+        self.marketmakers = []
+        self._trade_index = 0
+        self._mid = None
+        self._new_window(None)
+
+    def attach(self, runner):
+        '''Observe runner's exchange and market makers; return self'''
+        self.exchange = runner.exchange
+        self.marketmakers = runner.marketmakers
+        return self
+
+    def _new_window(self, start):
+        self._start = start
+        self._end = None
+        self._steps = 0
+        self._spread = Moments()
+        self._depth = 0
+        self._trades = 0
+        self._volume = 0
+        self._rv = 0.0
+        self._mid_open = self._mid
+
+    def _summary(self, name):
+        s = self.summaries.get(name)
+        if s is None:
+            s = self.summaries[name] = Summary()
+        return s
+
+    def observe(self, step, tob):
+        '''Add step's top of book (at the end of the step), trades and MarketMaker state'''
+        trade_book = self.exchange.trade_book
+        trades = len(trade_book) - self._trade_index
+        volume = sum(t['quantity'] for t in trade_book[self._trade_index:]) if trades else 0
+        if self.keep_trades:
+            self._trade_index = len(trade_book)
+        else:
+            trade_book.clear()
+        spread = tob['best_ask'] - tob['best_bid']
+        depth = tob['bid_size'] + tob['ask_size']
+        mid = (tob['best_ask'] + tob['best_bid']) / 2
+        summary = self._summary
+        summary('spread').add(spread)
+        summary('depth').add(depth)
+        summary('trades').add(trades)
+        summary('volume').add(volume)
+        if self._mid is not None:
+            r = math.log(mid / self._mid)
+            summary('return').add(r)
+            self._rv += r * r
+        for m in self.marketmakers:
+            summary('mm%d_delta_inv' % m.trader_id).add(m._delta_inv)
+        if self._start is None:
+            self._start = step
+            if self._mid_open is None:
+                self._mid_open = mid
+        self._mid = mid
+        self._end = step
+        self._steps += 1
+        self._spread.add(spread)
+        self._depth += depth
+        self._trades += trades
+        self._volume += volume
+        if self._steps == self.window:
+            self._close_window(step)
+
+    def _close_window(self, step):
+        row = {'start': self._start, 'end': step, 'steps': self._steps,
+               'spread_mean': self._spread.mean, 'spread_min': self._spread.min, 'spread_max': self._spread.max,
+               'depth_mean': self._depth / self._steps, 'trades': self._trades, 'volume': self._volume,
+               'mid_open': self._mid_open, 'mid_close': self._mid, 'realized_vol': math.sqrt(self._rv)}
+        for m in self.marketmakers:
+            # cash flow is in price/100000 units (see MarketMakerL.confirm_trade_local)
+            row['mm%d_cash_flow' % m.trader_id] = m._cash_flow
+            row['mm%d_delta_inv' % m.trader_id] = m._delta_inv
+            row['mm%d_pnl' % m.trader_id] = m._cash_flow + m._delta_inv * self._mid / 100000
+        self.windows.append(row)
+        self._new_window(None)
+
+    def summary(self):
+        '''{name: {n, mean, std, min, max, p05, p50, p95}} for the whole run so far'''
+        return {name: s.to_dict() for name, s in self.summaries.items()}
+
+    def trades_written(self):
+        '''The exchange's trade_book was written and cleared'''
+        self._trade_index = 0
+
+    def windows_to_h5(self, filename):
+        '''Append the closed windows to the 'stats' table of an h5 file, clear them'''
+        import pandas as pd
+        if self.windows:
+            temp_df = pd.DataFrame(self.windows)
+            temp_df.to_hdf(filename, 'stats', append=True, format='table', data_columns=['start', 'end'], complevel=5, complib='blosc')
+            self.windows.clear()
+
+    def summary_to_h5(self, filename):
+        '''Close the open window and write both tables; the summary replaces any earlier one'''
+        import pandas as pd
+        if self._steps:
+            self._close_window(self._end)
+        self.windows_to_h5(filename)
+        temp_df = pd.DataFrame.from_dict(self.summary(), orient='index')
+        temp_df.index.name = 'metric'
+        temp_df.to_hdf(filename, 'summary', format='table', complevel=5, complib='blosc')
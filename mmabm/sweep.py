@@ -0,0 +1,282 @@
+'''
+Run a grid of Config settings and seeds across a process pool.
+
+Each run gets its own output file (<prefix>_<combo>_<seed>.h5 in the output directory),
+its own RNG seeding inside the worker and is timed. Failed runs are retried and runs whose
+output file already exists are skipped, so an interrupted sweep can be resumed by running
+the same command again. Runs write to a .part file that is renamed on success.
+
+A worker that dies (e.g. killed for memory) breaks the pool and every unfinished run with
+it. A run leaves a .running marker while it runs, so the runs the break interrupted are
+known; runs that had not started go to a new pool and keep their attempt. If a single run
+was interrupted, the break counts as its failed attempt. If several were, none is charged
+and each runs again alone, where a break is its own.
+
+Example:
+    python -m mmabm.sweep --out sweeps/trial1 --seeds 51-60 --set num_providers=30,38 --set run_steps=100000
+'''
+import argparse
+import ast
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import traceback
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import mmabm.latency as latency
+import mmabm.runner2 as runner
+
+from mmabm.config import Config
+
+
+def make_grid(grid, seeds):
+    '''Return a list of (combo index, overrides, seed) for every combination of grid values and seeds'''
+    keys = sorted(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    return [(i, combo, seed) for i, combo in enumerate(combos) for seed in seeds]
+
+# files a Runner writes next to its h5 file
+SIDECARS = ('.latency.json', '.instrument.json')
+RUNNING = '.running' # marks a run in progress in a worker; left behind if the worker dies
+
+
+def run_filename(out_dir, prefix, combo, seed):
+    return os.path.join(out_dir, '%s_%03d_%d.h5' % (prefix, combo, seed))
+
+def run_one(config, seed, h5filename):
+    '''Run one simulation in the current process; return elapsed seconds'''
+    random.seed(seed)
+    np.random.seed(seed)
+    part = h5filename + '.part'
+    if os.path.exists(part):
+        os.remove(part)
+    start = time.time()
+    market = runner.Runner(h5filename=part, config=config)
+    market.run()
+    finish_part(part, h5filename)
+    return time.time() - start
+
+def finish_part(part, h5filename):
+    '''Rename a finished run's .part file, and its sidecar files, to h5filename'''
+    os.replace(part, h5filename)
+    for suffix in SIDECARS:
+        if os.path.exists(part + suffix):
+            os.replace(part + suffix, h5filename + suffix)
+
+def _run_task(config, seed, h5filename):
+    marker = h5filename + RUNNING
+    open(marker, 'w').close()
+    try:
+        return run_one(config, seed, h5filename), None
+    except Exception:
+        return None, traceback.format_exc()
+    finally:
+        os.remove(marker)
+
+
+class Sweep:
+    '''
+    Sweep fans (config, seed) runs out over a process pool.
+
+    grid is a dict of Config field -> list of values; config is the base Config.
+    With streams=True each run's seed is also set as config.seed, so the run uses
+    per-component random streams (mmabm.rng) rather than the global generators.
+    '''
+
+    def __init__(self, grid, seeds, out_dir, config=None, prefix='abm', processes=None, retries=1, log=print,
+                 streams=False):
+        self.config = config if config is not None else Config()
+        self.runs = make_grid(grid, seeds)
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.processes = processes or os.cpu_count()
+        self.retries = retries
+        self.log = log
+        self.streams = streams
+        self.results = []
+        # validate every combination before starting any work
+        self._configs = {i: self.config.replace(**overrides) for i, overrides, _ in self.runs}
+
+    def run(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        todo = []
+        for combo, overrides, seed in self.runs:
+            h5filename = run_filename(self.out_dir, self.prefix, combo, seed)
+            record = {'combo': combo, 'seed': seed, 'overrides': overrides, 'h5filename': h5filename,
+                      'attempts': 0, 'seconds': None, 'status': 'pending', 'error': None}
+            self.results.append(record)
+            if os.path.exists(h5filename):
+                record['status'] = 'skipped'
+            else:
+                todo.append(record)
+        self._total = len(todo)
+        self._done = 0
+        self.log('Sweep: %d runs, %d already done, %d workers' % (len(self.runs), len(self.runs) - self._total, self.processes))
+        start = time.time()
+        try:
+            while todo:
+                todo, alone = self._run_pool(todo)
+                for record in alone:
+                    todo.extend(self._run_pool([record], 1)[0])
+            self.log('Sweep finished in %.1f seconds' % (time.time() - start))
+        finally:
+            self._write_manifest()
+        self._merge_latency()
+        return self.results
+
+    def _run_pool(self, records, processes=None):
+        '''
+        Run records in a new pool; return (again, alone): the records to run again in a new
+        pool and, if the pool broke with several runs in progress, those runs
+        '''
+        again = []
+        broken = [] # (record, traceback)
+        with ProcessPoolExecutor(max_workers=processes or self.processes) as pool:
+            pending = {}
+            for record in records:
+                self._submit_to(pool, record, pending, again)
+            while pending:
+                for future in as_completed(list(pending)):
+                    record = pending.pop(future)
+                    try:
+                        seconds, error = future.result()
+                    except BrokenProcessPool:
+                        broken.append((record, traceback.format_exc()))
+                        continue
+                    except Exception:
+                        seconds, error = None, traceback.format_exc()
+                    if self._finish(record, seconds, error):
+                        self._submit_to(pool, record, pending, again)
+        started = [r for r, _ in broken if os.path.exists(r['h5filename'] + RUNNING)]
+        alone = []
+        for record, error in broken:
+            if len(records) == 1 or started == [record]:
+                # the break is this run's failure
+                if self._finish(record, None, error):
+                    again.append(record)
+            else:
+                record['attempts'] -= 1
+                (alone if record in started else again).append(record)
+            if os.path.exists(record['h5filename'] + RUNNING):
+                os.remove(record['h5filename'] + RUNNING)
+        return again, alone
+
+    def _finish(self, record, seconds, error):
+        '''Record a run's attempt; return True if it failed and should be retried'''
+        name = os.path.basename(record['h5filename'])
+        if error is None:
+            self._done += 1
+            record['status'] = 'done'
+            record['seconds'] = seconds
+            self.log('[%d/%d] %s: %.1f seconds' % (self._done, self._total, name, seconds))
+        elif record['attempts'] <= self.retries:
+            self.log('%s failed (attempt %d), retrying\n%s' % (name, record['attempts'], error))
+            return True
+        else:
+            self._done += 1
+            record['status'] = 'failed'
+            record['error'] = error
+            self.log('[%d/%d] %s failed after %d attempts\n%s' % (self._done, self._total, name,
+                                                                  record['attempts'], error))
+        return False
+
+    def _submit_to(self, pool, record, pending, again):
+        # a pool that broke since the last result refuses new work: the record waits for the next pool
+        try:
+            pending[self._submit(pool, record)] = record
+        except BrokenProcessPool:
+            again.append(record)
+
+    def _submit(self, pool, record):
+        config = self._configs[record['combo']]
+        if self.streams:
+            config = config.replace(seed=record['seed'])
+        future = pool.submit(_run_task, config, record['seed'], record['h5filename'])
+        record['attempts'] += 1
+        return future
+
+    def _merge_latency(self):
+        filenames = [r['h5filename'] + '.latency.json' for r in self.results if r['status'] in ('done', 'skipped')]
+        filenames = [f for f in filenames if os.path.exists(f)]
+        if filenames:
+            latency.merge_files(filenames).dump(os.path.join(self.out_dir, '%s_latency.json' % self.prefix))
+
+    def _write_manifest(self):
+        manifest = {'base_config': self.config.to_dict(), 'runs': self.results}
+        with open(os.path.join(self.out_dir, '%s_sweep.json' % self.prefix), 'w') as f:
+            json.dump(manifest, f, indent=1, default=str)
+
+
+def parse_seeds(text):
+    '''"51-60" -> 51..60; "1,5,9" -> [1, 5, 9]'''
+    seeds = []
+    for part in text.split(','):
+        if '-' in part:
+            lo, hi = part.split('-')
+            seeds.extend(range(int(lo), int(hi) + 1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+def parse_value(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+def parse_set(items):
+    '''["num_providers=30,38", "taker=True"] -> {'num_providers': [30, 38], 'taker': [True]}'''
+    grid = {}
+    for item in items:
+        key, values = item.split('=', 1)
+        grid[key] = [parse_value(v) for v in _split_values(values)]
+    return grid
+
+def _split_values(text):
+    # split on commas outside brackets so tuple values (oi_cond_probs=(0.1,0.1,0.8)) survive
+    parts, depth, current = [], 0, ''
+    for ch in text:
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        if ch == ',' and not depth:
+            parts.append(current)
+            current = ''
+        else:
+            current += ch
+    parts.append(current)
+    return parts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mmabm.sweep', description='Run a grid of settings and seeds in parallel.')
+    parser.add_argument('--out', required=True, help='output directory')
+    parser.add_argument('--seeds', default='51', help='seeds, e.g. 51-60 or 1,5,9')
+    parser.add_argument('--set', action='append', default=[], metavar='FIELD=V1,V2',
+                        help='Config field and the values to sweep; may be repeated')
+    parser.add_argument('--grid', help='JSON file with a dict of Config field -> list of values')
+    parser.add_argument('--prefix', default='abm', help='output file prefix')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: number of cores)')
+    parser.add_argument('--retries', type=int, default=1, help='retries per failed run')
+    parser.add_argument('--streams', action='store_true', help='use seeded per-component random streams')
+    args = parser.parse_args(argv)
+    grid = {}
+    if args.grid:
+        with open(args.grid) as f:
+            grid.update(json.load(f))
+    grid.update(parse_set(args.set))
+    sweep = Sweep(grid, parse_seeds(args.seeds), args.out, prefix=args.prefix, processes=args.processes,
+                  retries=args.retries, log=lambda msg: print(msg, flush=True), streams=args.streams)
+    results = sweep.run()
+    return 1 if any(r['status'] == 'failed' for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,7 +2,7 @@ import random
 
 import numpy as np
 
-from math import floor, log
+from math import floor, inf, log
 from mmabm.shared import Side, OType, TType
 
 
@@ -16,13 +16,15 @@ class ZITrader:
     '''
     trader_type = TType.ZITrader
 
-    def __init__(self, name, maxq):
+    def __init__(self, name, maxq, rng=None):
         '''
         Initialize ZITrader with some base class attributes and a method
         
         quote_collector is a public container for carrying quotes to the exchange
+        rng is a RandomStream (mmabm.rng); the default is the random module
         '''
         self.trader_id = name # trader id
+        self._rng = random if rng is None else rng
         self.quantity = self._make_q(maxq)
         self.quote_collector = []
         self._quote_sequence = 0
@@ -34,10 +36,16 @@ class ZITrader:
     def __str__(self):
         return str(tuple([self.trader_id, self.quantity]))
     
+    def confirm_trades_local(self, fills):
+        '''confirm_trade_local for each of fills (mmabm.orderbook.Fill), in order'''
+        confirm = self.confirm_trade_local
+        for f in fills:
+            confirm(f)
+    
     def _make_q(self, maxq):
         '''Determine order size'''
         default_arr = np.array([1, 5, 10, 25, 50])
-        return random.choice(default_arr[default_arr<=maxq])
+        return self._rng.choice(default_arr[default_arr<=maxq])
     
     def _make_add_quote(self, time, side, price):
         '''Make one add quote (dict)'''
@@ -56,15 +64,19 @@ class Provider(ZITrader):
     '''
     trader_type = TType.Provider
         
-    def __init__(self, name, maxq, delta, pAlpha):
+    def __init__(self, name, maxq, delta, pAlpha, rng=None, skip_cancel=False):
         '''Provider has own delta; a local_book to track outstanding orders and a 
         cancel_collector to convey cancel messages to the exchange.
+        skip_cancel: bulk_cancel draws the gaps between cancelled orders instead of one
+        uniform per order - the same distribution, different draws.
         '''
-        super().__init__(name, maxq)
+        super().__init__(name, maxq, rng)
         self._delta = delta
         self.delta_t = self._make_delta(pAlpha)
         self.local_book = {}
         self.cancel_collector = []
+        if skip_cancel:
+            self.bulk_cancel = self._bulk_cancel_skip
                 
     def __repr__(self):
         class_name = type(self).__name__
@@ -74,7 +86,7 @@ class Provider(ZITrader):
         return str(tuple([self.trader_id, self.quantity, self._delta]))
     
     def _make_delta(self, pAlpha):
-        return int(floor(random.expovariate(pAlpha)+1)*self.quantity)
+        return int(floor(self._rng.expovariate(pAlpha)+1)*self.quantity)
     
     def _make_cancel_quote(self, q, time):
         return {'type': OType.CANCEL, 'timestamp': time, 'order_id': q['order_id'], 'trader_id': q['trader_id'],
@@ -87,18 +99,46 @@ class Provider(ZITrader):
         else:
             self.local_book[confirm['order_id']]['quantity'] -= confirm['quantity']
             
+    def confirm_trades_local(self, fills):
+        '''confirm_trade_local for each of fills (mmabm.orderbook.Fill), in order'''
+        local_book = self.local_book
+        for f in fills:
+            to_modify = local_book[f.order_id]
+            if f.quantity == to_modify['quantity']:
+                del local_book[f.order_id]
+            else:
+                to_modify['quantity'] -= f.quantity
+            
     def bulk_cancel(self, time):
         '''bulk_cancel cancels _delta percent of outstanding orders'''
         self.cancel_collector.clear()
         for x in self.local_book.keys():
-            if random.random() < self._delta:
+            if self._rng.random() < self._delta:
                 self.cancel_collector.append(self._make_cancel_quote(self.local_book[x], time))
         for c in self.cancel_collector:        
             del self.local_book[c['order_id']]
 
+    def _bulk_cancel_skip(self, time):
+        '''bulk_cancel cancels each outstanding order with probability _delta, skipping
+        geometric gaps between the cancelled orders: one draw per cancel (plus one)'''
+        self.cancel_collector.clear()
+        n = len(self.local_book)
+        if not n or self._delta <= 0:
+            return
+        log_keep = log(1.0 - self._delta) if self._delta < 1 else -inf
+        i = int(log(1.0 - self._rng.random()) / log_keep)
+        if i >= n:
+            return
+        order_ids = list(self.local_book)
+        while i < n:
+            self.cancel_collector.append(self._make_cancel_quote(self.local_book[order_ids[i]], time))
+            i += 1 + int(log(1.0 - self._rng.random()) / log_keep)
+        for c in self.cancel_collector:
+            del self.local_book[c['order_id']]
+
     def process_signal(self, time, qsignal, q_provider, lambda_t):
         '''Provider buys or sells with probability related to q_provide'''
-        if random.random() < q_provider:
+        if self._rng.random() < q_provider:
             side = Side.BID
             price = self._choose_price_from_exp(side, qsignal['best_ask'], lambda_t)
         else:
@@ -111,7 +151,7 @@ class Provider(ZITrader):
     def _choose_price_from_exp(self, side, inside_price, lambda_t):
         '''Prices chosen from an exponential distribution'''
         # make pricing explicit for now. Logic scales for other mpi.
-        plug = int(lambda_t*log(random.random()))
+        plug = int(lambda_t*log(self._rng.random()))
         if side == Side.BID:
             return inside_price-1-plug
         else:
@@ -129,11 +169,12 @@ class MarketMaker(Provider):
     '''
     trader_type = TType.MarketMaker
 
-    def __init__(self, name, maxq, pAlpha, delta, num_quotes, quote_range):
+    def __init__(self, name, maxq, pAlpha, delta, num_quotes, quote_range, rng=None):
         '''_num_quotes and _quote_range determine the depth of MM quoting;
         _position and _cashflow are stored MM metrics
         '''
-        super().__init__(name, maxq, delta, pAlpha)
+        super().__init__(name, maxq, delta, pAlpha, rng)
+        self._np_rng = np.random if rng is None else rng
         self._num_quotes = num_quotes
         self._quote_range = quote_range
         self._position = 0
@@ -161,6 +202,8 @@ class MarketMaker(Provider):
         else:
             self.local_book[confirm['order_id']]['quantity'] -= confirm['quantity']
         self._cumulate_cashflow(confirm['timestamp'])
+        
+    confirm_trades_local = ZITrader.confirm_trades_local
          
     def _cumulate_cashflow(self, timestamp):
         self.cash_flow_collector.append({'mmid': self.trader_id, 'timestamp': timestamp, 'cash_flow': self._cash_flow,
@@ -173,13 +216,13 @@ class MarketMaker(Provider):
         ''' 
         # make pricing explicit for now. Logic scales for other mpi and quote ranges.
         self.quote_collector.clear()
-        if random.random() < q_provider:
+        if self._rng.random() < q_provider:
             max_bid_price = qsignal['best_bid'] if qsignal['bid_size'] > 1 else qsignal['best_bid'] - 1
-            prices = np.random.choice(range(max_bid_price-self._quote_range+1, max_bid_price+1), size=self._num_quotes)
+            prices = self._np_rng.choice(range(max_bid_price-self._quote_range+1, max_bid_price+1), size=self._num_quotes)
             side = Side.BID
         else:
             min_ask_price = qsignal['best_ask'] if qsignal['ask_size'] > 1 else qsignal['best_ask'] + 1
-            prices = np.random.choice(range(min_ask_price, min_ask_price+self._quote_range), size=self._num_quotes)
+            prices = self._np_rng.choice(range(min_ask_price, min_ask_price+self._quote_range), size=self._num_quotes)
             side = Side.ASK
         for price in prices:
             q = self._make_add_quote(time, side, price)
@@ -197,7 +240,7 @@ class PennyJumper(ZITrader):
     '''
     trader_type = TType.PennyJumper
     
-    def __init__(self, name, maxq, mpi):
+    def __init__(self, name, maxq, mpi, rng=None):
         '''
         Initialize PennyJumper
         
@@ -205,7 +248,7 @@ class PennyJumper(ZITrader):
         PennyJumper tracks private _ask_quote and _bid_quote to determine whether it is alone
         at the inside or not.
         '''
-        super().__init__(name, maxq)
+        super().__init__(name, maxq, rng)
         self._mpi = mpi
         self.cancel_collector = []
         self._ask_quote = None
@@ -237,7 +280,7 @@ class PennyJumper(ZITrader):
         self.cancel_collector.clear()
         if qsignal['best_ask'] - qsignal['best_bid'] > self._mpi:
             # q_taker > 0.5 implies greater probability of a buy order; PJ jumps the bid
-            if random.random() < q_taker:
+            if self._rng.random() < q_taker:
                 if self._bid_quote: # check if not alone at the bid
                     if self._bid_quote['price'] < qsignal['best_bid'] or self._bid_quote['quantity'] < qsignal['bid_size']:
                         self.cancel_collector.append(self._make_cancel_quote(self._bid_quote, time))
@@ -274,21 +317,59 @@ class Taker(ZITrader):
     '''
     trader_type = TType.Taker
 
-    def __init__(self, name, maxq, tMu):
-        super().__init__(name, maxq)
+    def __init__(self, name, maxq, tMu, rng=None):
+        super().__init__(name, maxq, rng)
         self.delta_t = self._make_delta(tMu)
         
     def _make_delta(self, tMu):
-        return int(floor(random.expovariate(tMu)+1)*self.quantity)
+        return int(floor(self._rng.expovariate(tMu)+1)*self.quantity)
         
     def process_signal(self, time, q_taker):
         '''Taker buys or sells with 50% probability.'''
-        if random.random() < q_taker: # q_taker > 0.5 implies greater probability of a buy order
+        if self._rng.random() < q_taker: # q_taker > 0.5 implies greater probability of a buy order
             return self._make_add_quote(time, Side.BID, 2000000)
         else:
             return self._make_add_quote(time, Side.ASK, 0)
         
         
+def make_schedule(num_runs, run_length, start, stop, rng=np.random):
+    '''Sorted array of the steps of num_runs non-overlapping runs of run_length steps in [start, stop),
+    uniform over the placements: the first steps are a sorted sample of the positions left after
+    taking run_length - 1 steps per run out, spread back by run_length - 1 per earlier run.'''
+    span = stop - start - num_runs*(run_length - 1)
+    if num_runs > span:
+        raise ValueError('{0} runs of {1} steps do not fit in [{2}, {3})'.format(num_runs, run_length, start, stop))
+    firsts = np.sort(rng.choice(span, num_runs, replace=False)) + start + np.arange(num_runs)*(run_length - 1)
+    return (firsts[:, None] + np.arange(run_length)).ravel()
+
+
+class Schedule:
+    '''
+    Sorted active steps in [start, stop) with an O(1) "step in schedule" check (a byte per step)
+    '''
+
+    def __init__(self, steps, start, stop):
+        self.steps = np.asarray(steps, dtype=np.int64)
+        self._start = start
+        active = np.zeros(max(stop - start, 0), dtype=np.uint8)
+        active[self.steps - start] = 1
+        self._active = active.tobytes()
+
+    def __repr__(self):
+        class_name = type(self).__name__
+        return '{0}({1} steps)'.format(class_name, len(self.steps))
+
+    def __contains__(self, step):
+        i = step - self._start
+        return 0 <= i < len(self._active) and self._active[i] == 1
+
+    def __iter__(self):
+        return iter(self.steps.tolist())
+
+    def __len__(self):
+        return len(self.steps)
+
+
 class InformedTrader(ZITrader):
     '''
     InformedTrader generates quotes (dicts) based upon a fixed direction
@@ -299,11 +380,16 @@ class InformedTrader(ZITrader):
     '''
     trader_type = TType.Informed
     
-    def __init__(self, name, maxq, informedTrades, informedRunLength, start, stop):
-        ZITrader.__init__(self, name, maxq)
-        self._side = random.choice([Side.BID, Side.ASK])
+    def __init__(self, name, maxq, informedTrades, informedRunLength, start, stop, rng=None, schedule=False):
+        '''schedule: delta_t is a Schedule of non-overlapping runs drawn in one pass (make_schedule)
+        instead of the set built run by run'''
+        ZITrader.__init__(self, name, maxq, rng)
+        self._side = self._rng.choice([Side.BID, Side.ASK])
         self._price = 0 if self._side == Side.ASK else 2000000
-        self.delta_t = self._make_delta(informedTrades, informedRunLength, start, stop)
+        if schedule:
+            self.delta_t = self._make_schedule(informedTrades, informedRunLength, start, stop)
+        else:
+            self.delta_t = self._make_delta(informedTrades, informedRunLength, start, stop)
         
     def _make_delta(self, informedTrades, informedRunLength, start, stop):
         numChoices = int(informedTrades/(informedRunLength*self.quantity)) + 1
@@ -311,7 +397,7 @@ class InformedTrader(ZITrader):
         delta_t = set()
         for _ in range(1, numChoices):
             runL = 0
-            step = random.choice(choiceRange)
+            step = self._rng.choice(choiceRange)
             while runL < informedRunLength:
                 while step in delta_t:
                     step += 1
@@ -319,6 +405,11 @@ class InformedTrader(ZITrader):
                 step += 1
                 runL += 1
         return delta_t
+
+    def _make_schedule(self, informedTrades, informedRunLength, start, stop):
+        numRuns = int(informedTrades/(informedRunLength*self.quantity))
+        np_rng = np.random if self._rng is random else self._rng
+        return Schedule(make_schedule(numRuns, informedRunLength, start, stop, np_rng), start, stop)
         
     def process_signal(self, time):
         '''InformedTrader buys or sells pre-specified attribute.'''
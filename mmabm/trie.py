@@ -0,0 +1,147 @@
+'''
+Ternary trie over the Predictors' conditions.
+
+ConditionTrie(predictors) has one level per condition bit and up to three children per node
+('0', '1' and '2', don't care), with the chromosomes at the leaves. A state only follows
+the child for its bit and the don't-care child, so match() visits the matching chromosomes
+and the paths to them instead of every chromosome. Each node also keeps the minimum accuracy
+below it: best() searches the matching nodes in order of that minimum and stops once the
+rest cannot beat the minimum-accuracy chromosomes already found. update(c) refreshes the
+minimum on c's path after its accuracy changes.
+
+IndexedPredictors is a Predictors that matches with best(), updates the trie with its
+accuracies and rebuilds it after each new_genes(); its current chromosomes are the same, in
+the same order, as Predictors'. The trie is not pickled (its leaves are keyed by the
+chromosomes' ids): a restored IndexedPredictors rebuilds it. Config(predictor_index=True)
+gives the MarketMakers IndexedPredictors; not with cohort=True, whose PredictorCohort matches
+the states of all its members itself.
+'''
+import heapq
+import itertools
+import math
+
+from mmabm.genetics2 import Predictors
+
+
+_BIT = {'0': 0, '1': 1, '2': 2}
+
+
+class _Node:
+
+    __slots__ = ('children', 'chroms', 'best', 'parent')
+
+    def __init__(self, parent=None):
+        self.children = [None, None, None]
+        self.chroms = [] # (index, Chromosome) at a leaf
+        self.best = math.inf
+        self.parent = parent
+
+    def refresh(self):
+        if self.chroms:
+            self.best = min(c.accuracy for _, c in self.chroms)
+        else:
+            self.best = min([child.best for child in self.children if child is not None], default=math.inf)
+
+
+class ConditionTrie:
+
+    def __init__(self, predictors):
+        self._root = _Node()
+        self._leaves = {}
+        self.length = len(predictors[0].condition) if predictors else 0
+        for i, c in enumerate(predictors):
+            node = self._root
+            for x in c.condition:
+                k = _BIT[x]
+                if node.children[k] is None:
+                    node.children[k] = _Node(node)
+                node = node.children[k]
+            node.chroms.append((i, c))
+            self._leaves[id(c)] = node
+        self._refresh(self._root)
+
+    def __len__(self):
+        return len(self._leaves)
+
+    def _refresh(self, node):
+        for child in node.children:
+            if child is not None:
+                self._refresh(child)
+        node.refresh()
+
+    def update(self, c):
+        '''Refresh the minimum accuracies on c's path after c.accuracy changed'''
+        node = self._leaves[id(c)]
+        while node is not None:
+            old = node.best
+            node.refresh()
+            if node.best == old:
+                break
+            node = node.parent
+
+    def match(self, state):
+        '''All the chromosomes whose condition matches state, in predictor order'''
+        found = []
+        stack = [(self._root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if depth == self.length:
+                found.extend(node.chroms)
+                continue
+            for child in (node.children[_BIT[state[depth]]], node.children[2]):
+                if child is not None:
+                    stack.append((child, depth + 1))
+        return [c for _, c in sorted(found, key=lambda ic: ic[0])]
+
+    def best(self, state):
+        '''The matching chromosomes with the minimum accuracy, in predictor order'''
+        found = []
+        min_acc = math.inf
+        count = itertools.count()
+        heap = [(self._root.best, next(count), self._root, 0)]
+        while heap and heap[0][0] <= min_acc:
+            _, _, node, depth = heapq.heappop(heap)
+            if depth == self.length:
+                for i, c in node.chroms:
+                    if c.accuracy < min_acc:
+                        min_acc = c.accuracy
+                        found = [(i, c)]
+                    elif c.accuracy == min_acc:
+                        found.append((i, c))
+                continue
+            for child in (node.children[_BIT[state[depth]]], node.children[2]):
+                if child is not None and child.best <= min_acc:
+                    heapq.heappush(heap, (child.best, next(count), child, depth + 1))
+        return [c for _, c in sorted(found, key=lambda ic: ic[0])]
+
+
+class IndexedPredictors(Predictors):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._index = ConditionTrie(self.predictors)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_index']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._index = ConditionTrie(self.predictors)
+
+    def _match_state(self, state):
+        self.current[:] = self._index.best(state)
+
+    def update_accuracies(self, actual):
+        super().update_accuracies(actual)
+        for c in self.current:
+            self._index.update(c)
+
+    def _new_genes_uf(self):
+        super()._new_genes_uf()
+        self._index = ConditionTrie(self.predictors)
+
+    def _new_genes_wf(self):
+        super()._new_genes_wf()
+        self._index = ConditionTrie(self.predictors)
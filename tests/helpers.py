@@ -0,0 +1,51 @@
+'''
+Shared test fixtures: a temporary directory per test and small, seeded Runners.
+'''
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from mmabm.runner2 import Runner
+
+
+def make_runner(h5filename, seed, runner_class=Runner, **kwargs):
+    '''Seed random and np.random with seed and build runner_class(h5filename, **kwargs)'''
+    random.seed(seed)
+    np.random.seed(seed)
+    return runner_class(h5filename=h5filename, **kwargs)
+
+
+class RunnerTestCase(unittest.TestCase):
+    '''
+    A TestCase with a temporary directory, tmpdir, removed after each test, and make_runner().
+
+    The class attributes set make_runner's defaults: seed (for random and np.random),
+    run_steps, write_interval and runner_kwargs (other Runner arguments - e.g.
+    {'config': Config(seed=23)} for a run on seeded streams). run_steps and write_interval
+    override those of a config argument.
+    '''
+
+    runner_class = Runner
+    seed = 17
+    run_steps = 300
+    write_interval = 100
+    runner_kwargs = {}
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.h5filename = self.path('test.h5')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        '''name in the temporary directory'''
+        return os.path.join(self.tmpdir.name, name)
+
+    def make_runner(self, seed=None, h5filename=None, **kwargs):
+        '''A runner_class writing to h5filename (default: test.h5); kwargs override the class's Config fields'''
+        kwargs = dict({'run_steps': self.run_steps, 'write_interval': self.write_interval}, **dict(self.runner_kwargs, **kwargs))
+        return make_runner(h5filename or self.h5filename, self.seed if seed is None else seed, self.runner_class, **kwargs)
@@ -0,0 +1,54 @@
+import unittest
+
+from benchmarks import harness
+from benchmarks.imports import import_times
+from benchmarks.micro import make_book, make_predictors
+
+
+class TestHarness(unittest.TestCase):
+
+    def test_run(self):
+        calls = []
+        def setup():
+            calls.append('setup')
+            return lambda: calls.append('fn')
+        b = harness.Benchmark('x', 'test', setup, ops=10, repeat=3)
+        r = b.run()
+        self.assertEqual(calls, ['setup', 'fn'] * 3)
+        self.assertEqual(r['repeat'], 3)
+        self.assertLessEqual(r['min'], r['median'])
+        self.assertAlmostEqual(r['per_op'], r['min'] / 10)
+
+    def test_measured(self):
+        b = harness.Benchmark('x', 'test', lambda: lambda: 2.5, repeat=2, measured=True)
+        self.assertEqual(b.run()['min'], 2.5)
+
+    def test_compare(self):
+        baseline = {'results': {'a': {'min': 1.0}, 'b': {'min': 1.0}, 'c': {'min': 1.0}}}
+        results = {'results': {'a': {'min': 1.5}, 'b': {'min': 0.5}, 'c': {'min': 1.05}, 'd': {'min': 1.0}}}
+        rows = harness.compare(results, baseline, 0.1)
+        self.assertEqual([(r[0], r[4]) for r in rows], [('a', 'slower'), ('b', 'faster'), ('c', 'same')])
+        self.assertIn('slower', harness.format_comparison(rows))
+
+    def test_select(self):
+        import benchmarks.micro
+        names = [b.name for b in harness.select('book.add')]
+        self.assertEqual(names, ['book.add[depth=10]', 'book.add[depth=100]', 'book.add[depth=1000]'])
+
+    def test_fixtures(self):
+        book, resting = make_book(5, 3)
+        self.assertEqual(len(resting), 30)
+        self.assertEqual(book.report_top_of_book(1)['bid_size'], 3)
+        self.assertEqual(len(make_predictors(50).predictors), 50)
+
+    def test_gapool(self):
+        import benchmarks.micro
+        names = [b.name for b in harness.select('gapool')]
+        self.assertEqual(names, ['gapool.new_genes[n=100,processes=%d]' % p for p in (1, 2, 4)])
+        self.assertGreater(harness.select('gapool.new_genes[n=100,processes=2]')[0].run(1)['min'], 0)
+
+    def test_import_times(self):
+        # the simulation modules load pandas only when they write
+        times = import_times('mmabm.runner2')
+        self.assertGreater(times['mmabm.runner2'], times['mmabm.orderbook'])
+        self.assertNotIn('pandas', times)
@@ -0,0 +1,81 @@
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+import mmabm.checkpoint as checkpoint
+
+from mmabm.config import Config
+from mmabm.runner2 import Runner
+
+from tests.helpers import RunnerTestCase
+
+
+class TestCheckpoint(RunnerTestCase):
+
+    run_steps = 400
+
+    def _tables(self, h5filename):
+        with pd.HDFStore(h5filename, 'r') as store:
+            return {key: store[key] for key in store.keys()}
+
+    def _assertSameOutput(self, h5a, h5b):
+        t1 = self._tables(h5a)
+        t2 = self._tables(h5b)
+        self.assertEqual(sorted(t1), sorted(t2))
+        for key in t1:
+            pd.testing.assert_frame_equal(t1[key], t2[key])
+
+    def _checkResume(self, **kwargs):
+        h5a = self.path('a.h5')
+        r1 = self.make_runner(h5filename=h5a, **kwargs)
+        r1.run()
+        r2 = self.make_runner(**kwargs)
+        r2.prime()
+        r2.run_until(250)
+        r2.checkpoint()
+        # keep going (and writing) past the checkpoint, then lose the process
+        r2.run_until(380)
+        del r2
+        random.seed(99)
+        np.random.seed(99)
+        r3 = Runner.restore(self.h5filename + '.ckpt')
+        self.assertEqual(r3.current_time, 250)
+        r3.finish()
+        self._assertSameOutput(h5a, self.h5filename)
+
+    def test_resume(self):
+        self._checkResume()
+
+    def test_resume_seeded(self):
+        self._checkResume(config=Config(seed=5))
+
+    def test_checkpoint_interval(self):
+        r1 = self.make_runner(checkpoint_interval=150)
+        r1.prime()
+        r1.run_until(200)
+        self.assertTrue(os.path.exists(self.h5filename + '.ckpt'))
+        r2 = checkpoint.load(self.h5filename + '.ckpt')
+        self.assertEqual(r2.current_time, 150)
+
+    def test_dumps_loads(self):
+        r1 = self.make_runner(config=Config(seed=3))
+        r1.prime()
+        r1.run_until(100)
+        data = checkpoint.dumps(r1)
+        r1.run_until(r1.run_steps)
+        r2 = checkpoint.loads(data, truncate=False)
+        r2.run_until(r2.run_steps)
+        self.assertEqual(r1.exchange.trade_book, r2.exchange.trade_book)
+        self.assertEqual(r1.marketmakers[0].cash_flow_collector, r2.marketmakers[0].cash_flow_collector)
+        with self.assertRaises(ValueError):
+            checkpoint.loads(b'not a checkpoint')
+
+    def test_truncate_h5(self):
+        pd.DataFrame({'a': range(10)}).to_hdf(self.h5filename, 'x', append=True, format='table')
+        pd.DataFrame({'a': range(5)}).to_hdf(self.h5filename, 'y', append=True, format='table')
+        checkpoint.truncate_h5(self.h5filename, {'/x': 4})
+        self.assertEqual(checkpoint.h5_rows(self.h5filename), {'/x': 4})
+        with self.assertRaises(ValueError):
+            checkpoint.truncate_h5(self.h5filename, {'/x': 6})
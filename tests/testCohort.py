@@ -0,0 +1,72 @@
+import copy
+import random
+
+import mmabm.golden as golden
+
+from mmabm.cohort import MarketMakerCohort, PredictorCohort
+from mmabm.config import Config
+from mmabm.genetics2 import Predictors
+from mmabm.rng import RandomStreams, GENETICS
+from mmabm.runner2 import Runner
+
+from tests.helpers import RunnerTestCase
+
+
+class CohortRunner(Runner):
+
+    def __init__(self, h5filename='test.h5', config=None, **kwargs):
+        super().__init__(h5filename, (config or Config()).replace(cohort=True), **kwargs)
+
+
+class TestCohort(RunnerTestCase):
+
+    runner_class = CohortRunner
+    seed = 41
+    run_steps = 800
+    write_interval = 200
+
+    def _makePredictors(self, seed):
+        return Predictors(30, 12, 6, [0.1, 0.1, 0.8], 0.1, 0.2, 0.1, 0.02, 0.5, True, 'uf',
+                          RandomStreams(seed).stream(GENETICS))
+
+    def test_predictor_cohort(self):
+        alone = [self._makePredictors(s) for s in range(5)]
+        members = copy.deepcopy(alone)
+        cohort = PredictorCohort(members)
+        rng = random.Random(3)
+        for step in range(1, 400):
+            actual = rng.randint(-20, 20)
+            state = ''.join(rng.choice('01') for _ in range(12))
+            for p in alone:
+                p.update_accuracies(actual)
+            cohort.update_accuracies(actual)
+            if not step % 50:
+                for i, (p, m) in enumerate(zip(alone, members)):
+                    p.new_genes()
+                    m.new_genes()
+                    cohort.reload(i)
+            forecasts = cohort.get_forecast(state)
+            for p, m, f in zip(alone, members, forecasts):
+                p._match_state(state)
+                self.assertEqual(p.current, m.current)
+                if p.current:
+                    self.assertEqual(sum(c.strategy for c in p.current) / len(p.current), f)
+                self.assertEqual([(c.accuracy, c.used) for c in p.predictors],
+                                 [(c.accuracy, c.used) for c in m.predictors])
+
+    def test_same_as_one_marketmaker(self):
+        config = Config(oi_num_chroms=40, of_num_chroms=40, genetic_int=50)
+        self.assertIsNone(golden.compare_runners(CohortRunner, config=config, steps=600))
+
+    def test_run(self):
+        r1 = self.make_runner(num_mms=6, oi_num_chroms=40, of_num_chroms=40)
+        cohorts = [t for t in r1.traders if isinstance(t, MarketMakerCohort)]
+        self.assertEqual(len(cohorts), 1)
+        self.assertEqual(cohorts[0].members, r1.marketmakers)
+        r1.run()
+        # no market maker trades with another
+        mm_ids = {m.trader_id for m in r1.marketmakers}
+        for t in r1.exchange.trade_book:
+            self.assertFalse(t['resting_trader_id'] in mm_ids and t['incoming_trader_id'] in mm_ids)
+        for m in r1.marketmakers:
+            self.assertLess(m._localbook.bid_book_prices[-1], m._localbook.ask_book_prices[0])
@@ -0,0 +1,60 @@
+import dataclasses
+import unittest
+
+import mmabm.settings as settings
+
+from mmabm.config import Config
+from mmabm.learner2 import MarketMakerL
+
+
+class TestConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.c1 = Config()
+
+    def test_defaults(self):
+        for f in dataclasses.fields(Config):
+            expected = getattr(settings, f.name.upper())
+            if isinstance(expected, list):
+                expected = tuple(expected)
+            self.assertEqual(getattr(self.c1, f.name), expected, f.name)
+        self.assertEqual(self.c1.oi_cond_len, settings.OI_COND_LEN)
+        self.assertEqual(self.c1.of_cond_len, settings.OF_COND_LEN)
+
+    def test_immutable(self):
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            self.c1.num_providers = 5
+        self.assertEqual(hash(self.c1), hash(Config()))
+
+    def test_replace(self):
+        c2 = self.c1.replace(num_providers=5, oi_cond_probs=[0.1, 0.1, 0.8])
+        self.assertEqual(c2.num_providers, 5)
+        self.assertEqual(c2.oi_cond_probs, (0.1, 0.1, 0.8))
+        self.assertEqual(self.c1.num_providers, settings.NUM_PROVIDERS)
+        self.assertNotEqual(c2, self.c1)
+
+    def test_dict(self):
+        self.assertEqual(Config.from_dict(self.c1.to_dict()), self.c1)
+        with self.assertRaises(ValueError):
+            Config.from_dict({'num_provider': 5})
+
+    def test_validate(self):
+        with self.assertRaises(ValueError):
+            Config(run_steps=0)
+        with self.assertRaises(ValueError):
+            Config(prime1=100, run_steps=50)
+        with self.assertRaises(ValueError):
+            Config(q_provide=1.5)
+        with self.assertRaises(ValueError):
+            Config(of_cond_probs=(0.5, 0.5, 0.5))
+        with self.assertRaises(ValueError):
+            Config(oi_signal=(1, 2, 3))
+        with self.assertRaises(ValueError):
+            self.c1.replace(oi_keep_pct=0)
+
+    def test_marketmaker_config(self):
+        m1 = MarketMakerL(3001, 5, 1, 250, self.c1.replace(oi_num_chroms=20, of_num_chroms=30))
+        self.assertEqual(len(m1._oi.predictors), 20)
+        self.assertEqual(len(m1._of.predictors), 30)
+        m2 = MarketMakerL(3002, 5, 1, 250)
+        self.assertEqual(len(m2._oi.predictors), settings.OI_NUM_CHROMS)
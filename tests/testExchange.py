@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from mmabm.exchange import ConsolidatedQuote, Exchange
+from mmabm.shared import Side, OType
+
+
+def _order(trader_id, order_id, side, price, quantity=1, otype=OType.ADD, timestamp=1):
+    return {'order_id': order_id, 'trader_id': trader_id, 'timestamp': timestamp, 'type': otype,
+            'quantity': quantity, 'side': side, 'price': price}
+
+
+class TestExchange(unittest.TestCase):
+
+    def setUp(self):
+        self.ex1 = Exchange(('A', 'B'))
+        self.ex1.home.update({1001: 'A', 1002: 'B'})
+        # A: 99 @ 101; B: 98 @ 102
+        for trader_id, bid, ask in ((1001, 99, 101), (1002, 98, 102)):
+            book = self.ex1.books[self.ex1.home[trader_id]]
+            book.add_order_to_book(_order(trader_id, 1, Side.BID, bid))
+            book.add_order_to_book(_order(trader_id, 2, Side.ASK, ask))
+
+    def test_home(self):
+        self.assertEqual(self.ex1.books['A']._bid_book_prices, [99])
+        self.assertEqual(self.ex1.books['B']._ask_book_prices, [102])
+        tob = self.ex1.report_top_of_book(1)
+        self.assertEqual(tob, {'timestamp': 1, 'best_bid': 99, 'best_ask': 101, 'bid_size': 1, 'ask_size': 1,
+                               'bid_venue': 'A', 'ask_venue': 'A'})
+
+    def test_route(self):
+        # marketable: to the venue with the best price on the other side
+        self.assertEqual(self.ex1.route(_order(2000, 1, Side.BID, 2000000)), 'A')
+        self.assertEqual(self.ex1.route(_order(2000, 2, Side.ASK, 0)), 'A')
+        # resting: to the venue with the worst price on the order's side
+        self.assertEqual(self.ex1.route(_order(3000, 1, Side.BID, 100)), 'B')
+        self.assertEqual(self.ex1.route(_order(3000, 2, Side.ASK, 100)), 'B')
+        self.ex1.process_order(_order(3000, 3, Side.ASK, 100))
+        self.assertEqual(self.ex1.books['B']._ask_book_prices, [100, 102])
+        # cancels follow the order
+        self.assertEqual(self.ex1.route(_order(3000, 3, Side.ASK, 100, otype=OType.CANCEL)), 'B')
+        with self.assertRaises(KeyError):
+            self.ex1.route(_order(3000, 4, Side.ASK, 100, otype=OType.CANCEL))
+
+    def test_trade(self):
+        self.ex1.books['A'].add_order_to_book(_order(1001, 3, Side.ASK, 103))
+        self.ex1.process_order(_order(2000, 1, Side.BID, 2000000, quantity=2))
+        self.assertTrue(self.ex1.traded)
+        # matched in A only: through 101 and 103, not B's 102
+        self.assertEqual([(t['venue'], t['price']) for t in self.ex1.trade_book], [('A', 101), ('A', 103)])
+        self.assertEqual([c['order_id'] for c in self.ex1.confirm_trade_collector], [2, 3])
+        self.assertEqual(self.ex1.books['A'].trade_book, [])
+        self.ex1.books['A'].add_order_to_book(_order(1001, 4, Side.ASK, 104))
+        tob = self.ex1.report_top_of_book(2)
+        self.assertEqual((tob['best_bid'], tob['bid_venue'], tob['best_ask'], tob['ask_venue']), (99, 'A', 102, 'B'))
+
+    def test_consolidated_quote(self):
+        rng = random.Random(7)
+        venues = ('A', 'B', 'C')
+        quote = ConsolidatedQuote(venues)
+        tops = {}
+        for step in range(2000):
+            venue = rng.choice(venues)
+            bid = rng.randint(95, 100)
+            tops[venue] = {'best_bid': bid, 'bid_size': rng.randint(1, 5), 'best_ask': bid + rng.randint(1, 3),
+                           'ask_size': rng.randint(1, 5)}
+            quote.update(venue, tops[venue])
+            report = quote.report(step)
+            best_bid = max(t['best_bid'] for t in tops.values())
+            best_ask = min(t['best_ask'] for t in tops.values())
+            self.assertEqual(report['best_bid'], best_bid)
+            self.assertEqual(report['bid_size'], sum(t['bid_size'] for t in tops.values() if t['best_bid'] == best_bid))
+            self.assertEqual(tops[report['bid_venue']]['best_bid'], best_bid)
+            self.assertEqual(report['best_ask'], best_ask)
+            self.assertEqual(report['ask_size'], sum(t['ask_size'] for t in tops.values() if t['best_ask'] == best_ask))
+            self.assertEqual(tops[report['ask_venue']]['best_ask'], best_ask)
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+import mmabm.exogenous as exogenous
+
+from mmabm.config import Config
+from mmabm.shared import Side
+
+from tests.helpers import RunnerTestCase
+
+
+class TestExogenous(RunnerTestCase):
+
+    run_steps = 3000
+    write_interval = 5000
+    runner_kwargs = {'config': Config(seed=17), 'exogenous': True, 'informed': True}
+
+    def test_build(self):
+        r1 = self.make_runner()
+        self.assertNotIn(r1.takers[0], r1.traders)
+        self.assertNotIn(r1.informed_trader, r1.traders)
+        flow = r1.exogenous
+        self.assertTrue((np.diff(flow.step) >= 0).all())
+        for t in r1.takers:
+            steps = flow.step[flow.trader_id == t.trader_id]
+            self.assertEqual(steps.tolist(), [s for s in range(r1.prime1, r1.run_steps) if not s % t.delta_t])
+        informed = flow.trader_id == r1.informed_trader.trader_id
+        self.assertEqual(flow.step[informed].tolist(), sorted(r1.informed_trader.delta_t))
+        self.assertEqual(set(flow.side[informed].tolist()), {r1.informed_trader._side.value})
+        # buys with probability q_take
+        taker = ~informed
+        buys = (flow.side[taker] == Side.BID.value).sum()
+        expected = np.asarray(r1.q_take)[flow.step[taker]].sum()
+        self.assertLess(abs(buys - expected), 4 * np.sqrt(taker.sum() / 4))
+        with self.assertRaises(ValueError):
+            Config(exogenous=True, pennyjumper=True)
+
+    def test_run(self):
+        r1 = self.make_runner()
+        r1.run()
+        exogenous_ids = {t.trader_id for t in r1.takers} | {r1.informed_trader.trader_id}
+        orders = [(o['timestamp'], o['trader_id'], o['side']) for o in r1.exchange.order_history
+                  if o['trader_id'] in exogenous_ids]
+        flow = r1.exogenous
+        self.assertEqual(sorted(orders), list(zip(flow.step.tolist(), flow.trader_id.tolist(), flow.side.tolist())))
+
+    def test_cache(self):
+        cache = self.path('cache')
+        r1 = self.make_runner(exogenous_cache=cache)
+        self.assertEqual(os.listdir(cache), ['exogenous_%s.npz' % exogenous.cache_key(r1.config)])
+        r2 = self.make_runner(exogenous_cache=cache)
+        for name in ('step', 'trader_id', 'side', 'quantity'):
+            np.testing.assert_array_equal(getattr(r1.exogenous, name), getattr(r2.exogenous, name))
+        self.assertNotEqual(exogenous.cache_key(r1.config), exogenous.cache_key(r1.config.replace(seed=18)))
+        r3 = self.make_runner(exogenous_cache=cache, instrument=True)
+        r4 = self.make_runner(exogenous_cache=cache, instrument=True, run_steps=2000)
+        self.assertEqual(r3.instrument.counters['exogenous.hits'], 1)
+        self.assertEqual(r4.instrument.counters['exogenous.misses'], 1)
+
+    def test_cache_informed_schedule(self):
+        # the informed schedule is part of the key: each variant gets its own cached flow
+        cache = self.path('cache')
+        for schedule in (False, True):
+            r1 = self.make_runner(config=Config(seed=3), run_steps=5000, exogenous_cache=cache,
+                                  informed_schedule=schedule)
+            flow = r1.exogenous
+            steps = flow.step[flow.trader_id == r1.informed_trader.trader_id].tolist()
+            self.assertEqual(steps, sorted(s for s in r1.informed_trader.delta_t if r1.prime1 <= s < r1.run_steps))
+        self.assertEqual(len(os.listdir(cache)), 2)
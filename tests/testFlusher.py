@@ -0,0 +1,70 @@
+import json
+
+import pandas as pd
+
+from mmabm.config import Config
+from mmabm.flusher import Flusher, row_bytes
+from mmabm.orderbook import Fill
+from mmabm.shared import Side
+
+from tests.helpers import RunnerTestCase
+
+
+class TestFlusher(RunnerTestCase):
+
+    run_steps = 500
+    write_interval = 250
+    runner_kwargs = {'config': Config(seed=23), 'num_mms': 2}
+
+    def _tables(self, h5filename):
+        with pd.HDFStore(h5filename, 'r') as store:
+            tables = {k: store[k].reset_index(drop=True) for k in store.keys()}
+        tables['/mmp'] = tables['/mmp'].sort_values(['mmid', 'timestamp'], kind='stable').reset_index(drop=True)
+        return tables
+
+    def test_row_bytes(self):
+        fill = Fill(2, 1001, 1, 1, 2001, 1, 125, 1, Side.BID)
+        self.assertGreater(row_bytes(fill), row_bytes({}))
+        self.assertGreater(row_bytes(fill.row()), row_bytes({'a': 1}))
+
+    def test_run(self):
+        r1 = self.make_runner(h5filename=self.path('r1.h5'))
+        r1.run()
+        r2 = self.make_runner(h5filename=self.path('r2.h5'), memory_budget=1)
+        self.assertEqual([c.name for c in r2.flusher.collectors],
+                         ['orders', 'tob', 'trades', 'mmp_3000', 'signal_3000', 'mmp_3001', 'signal_3001'])
+        r2.prime()
+        while r2.current_time < r2.run_steps:
+            r2.step()
+            for c in r2.flusher.collectors:
+                self.assertLessEqual(c.rows(), c.limit or 0)
+        r2.finalize()
+        self.assertTrue(r2.flusher.collectors[0].writes)
+        t1, t2 = self._tables(r1.h5filename), self._tables(r2.h5filename)
+        self.assertEqual(sorted(t1), sorted(t2))
+        for key in t1:
+            pd.testing.assert_frame_equal(t1[key], t2[key])
+        # the watchdog: at each write_interval and at the end
+        with open(r2.h5filename + '.flusher.jsonl') as f:
+            reports = [json.loads(line) for line in f]
+        self.assertEqual([s['step'] for s in reports], [250, 500, 501])
+        self.assertEqual(set(reports[-1]['rows']), {c.name for c in r2.flusher.collectors})
+
+    def test_stats(self):
+        # the stats count the trades of each step across trade_book writes
+        r1 = self.make_runner(h5filename=self.path('r1.h5'), stats_window=100)
+        r1.run()
+        r2 = self.make_runner(h5filename=self.path('r2.h5'), stats_window=100)
+        r2.flusher = Flusher(0.01)
+        r2.flusher.runner = r2
+        r2.flusher.register('trades', r2, '_trades_to_h5', r2.exchange.trade_book)
+        r2.run()
+        self.assertGreater(r2.flusher.collectors[0].writes, 1)
+        self.assertEqual(r1.stats.windows, r2.stats.windows)
+        self.assertEqual(r1.stats.summary(), r2.stats.summary())
+
+    def test_config(self):
+        with self.assertRaises(ValueError):
+            Config(memory_budget=-1)
+        with self.assertRaises(ValueError):
+            Config(memory_budget=16, raw_output=False, stats_window=100)
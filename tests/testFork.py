@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import time
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import mmabm.fork as fork
+
+from mmabm.config import Config
+
+from tests.helpers import RunnerTestCase
+
+
+def _die_or_run(market, changes, h5filename, run_branch=fork.run_branch):
+    if changes.get('arr_int') == 2:
+        os._exit(1)
+    if changes.get('arr_int') == 3:
+        time.sleep(60)
+    return run_branch(market, changes, h5filename)
+
+
+class TestFork(RunnerTestCase):
+
+    seed = 3
+    run_steps = 400
+
+    def setUp(self):
+        super().setUp()
+        self.config = Config(run_steps=400, write_interval=100)
+
+    def _tables(self, h5filename):
+        with pd.HDFStore(h5filename, 'r') as store:
+            return {key: store[key] for key in store.keys()}
+
+    def test_reconfigure(self):
+        market = fork.burn_in(self.config, self.path('b.h5'), 100, seed=3)
+        market.reconfigure(arr_int=3, oi_keep_pct=0.5, q_provide=0.4)
+        self.assertEqual(market.config.arr_int, 3)
+        self.assertEqual(market.marketmakers[0].arrInt, 3)
+        self.assertEqual(market.marketmakers[0]._oi._keep, 50)
+        self.assertEqual(market.q_provide, 0.4)
+        with self.assertRaises(ValueError):
+            market.reconfigure(num_providers=3)
+        with self.assertRaises(ValueError):
+            market.reconfigure(arr_int=0)
+        # unchanged structural fields are allowed
+        market.reconfigure(num_providers=market.config.num_providers)
+
+    def test_fork(self):
+        h5filename = self.path('straight.h5')
+        self.make_runner(h5filename=h5filename, config=self.config).run()
+        market = fork.burn_in(self.config, self.path('burnin.h5'), 150, seed=3)
+        f = fork.Fork(market, [{}, {'arr_int': 2, 'taker_mu': 0.01}], self.tmpdir.name, processes=2, log=lambda msg: None)
+        results = f.run()
+        self.assertEqual([r['status'] for r in results], ['done', 'done'])
+        # the parent is untouched
+        self.assertEqual(market.current_time, 150)
+        # a branch without changes reproduces the uninterrupted run
+        t1 = self._tables(h5filename)
+        t2 = self._tables(f.filename(0))
+        self.assertEqual(sorted(t1), sorted(t2))
+        for key in t1:
+            pd.testing.assert_frame_equal(t1[key], t2[key])
+        t3 = self._tables(f.filename(1))
+        self.assertFalse(t1['/trades'].equals(t3['/trades']))
+        # both branches share the burn-in
+        pd.testing.assert_frame_equal(t1['/tob'][t1['/tob'].timestamp < 100], t3['/tob'][t3['/tob'].timestamp < 100])
+
+    def test_bad_branch(self):
+        market = fork.burn_in(self.config, self.path('b.h5'), 50, seed=3)
+        with self.assertRaises(ValueError):
+            fork.Fork(market, [{'num_mms': 2}], self.tmpdir.name)
+
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), 'the patch reaches forked workers only')
+    def test_dead_worker(self):
+        market = fork.burn_in(self.config, self.path('burnin.h5'), 350, seed=3)
+        f = fork.Fork(market, [{'arr_int': 2}, {}, {'arr_int': 3}], self.tmpdir.name, processes=2, timeout=3,
+                      log=lambda msg: None)
+        with mock.patch('mmabm.fork.run_branch', _die_or_run):
+            results = f.run()
+        self.assertEqual([r['status'] for r in results], ['failed', 'done', 'failed'])
+        self.assertIn('exited with code 1', results[0]['error'])
+        self.assertIn('timed out', results[2]['error'])
+        self.assertTrue(os.path.exists(f.filename(1)))
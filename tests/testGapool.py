@@ -0,0 +1,59 @@
+import copy
+import pickle
+import unittest
+
+import mmabm.golden as golden
+
+from mmabm.config import Config
+from mmabm.gapool import GeneticsPool
+from mmabm.genetics2 import Predictors
+from mmabm.rng import RandomStreams, GENETICS
+from mmabm.runner2 import Runner
+
+
+class PoolRunner(Runner):
+
+    def __init__(self, h5filename='test.h5', config=None, **kwargs):
+        super().__init__(h5filename, (config or Config()).replace(ga_processes=2), **kwargs)
+
+
+class TestGeneticsPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = GeneticsPool(2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def _makePredictors(self, seed):
+        p = Predictors(30, 12, 6, [0.1, 0.1, 0.8], 0.1, 0.2, 0.1, 0.02, 0.5, True, 'uf',
+                       RandomStreams(seed).stream(GENETICS))
+        for i, c in enumerate(p.predictors):
+            c.used = i % 3
+            c.accuracy = (i * 7) % 11
+        return p
+
+    def test_new_genes(self):
+        serial = [self._makePredictors(s) for s in range(4)]
+        pooled = copy.deepcopy(serial)
+        for _ in range(3):
+            for p in serial:
+                p.new_genes()
+            self.pool.new_genes(pooled)
+            for p1, p2 in zip(serial, pooled):
+                self.assertEqual([(c, c.accuracy) for c in p1.predictors], [(c, c.accuracy) for c in p2.predictors])
+                self.assertIs(p2._rng, p2._np_rng)
+        # a pickled pool restarts its workers
+        pool = pickle.loads(pickle.dumps(self.pool))
+        self.assertEqual(pool.processes, 2)
+        self.assertIsNone(pool._pool)
+
+    def test_config(self):
+        with self.assertRaises(ValueError):
+            Config(ga_processes=2, seed=1)
+        with self.assertRaises(ValueError):
+            Config(ga_processes=2, cohort=True)
+
+    def test_runner(self):
+        config = Config(cohort=True, seed=5, num_mms=3, oi_num_chroms=40, of_num_chroms=40, genetic_int=50)
+        self.assertIsNone(golden.compare_runners(PoolRunner, config=config, steps=300))
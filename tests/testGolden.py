@@ -0,0 +1,66 @@
+import random
+
+import mmabm.golden as golden
+import mmabm.replay as replay
+
+from mmabm.config import Config
+from mmabm.genetics2 import Predictors
+from mmabm.orderbook import Orderbook
+from mmabm.runner2 import Runner
+
+from tests.helpers import RunnerTestCase
+
+
+class LateOrderbook(Orderbook):
+    '''Prices trades one tick high from the 50th trade'''
+
+    def _add_trade_to_book(self, resting_trader_id, resting_order_id, resting_timestamp,
+                           incoming_trader_id, incoming_order_id, timestamp, price, quantity, side):
+        if len(self.trade_book) >= 50:
+            price += 1
+        super()._add_trade_to_book(resting_trader_id, resting_order_id, resting_timestamp,
+                                   incoming_trader_id, incoming_order_id, timestamp, price, quantity, side)
+
+
+class SlowLearningPredictors(Predictors):
+    '''Ignores outcomes of 3'''
+
+    def update_accuracies(self, actual):
+        if actual != 3:
+            super().update_accuracies(actual)
+
+
+class TestGolden(RunnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config = Config(oi_num_chroms=40, of_num_chroms=40, genetic_int=50)
+        self.before = random.getstate()
+
+    def test_same(self):
+        self.assertIsNone(golden.compare_runners(Runner, config=self.config, steps=300))
+        self.assertIsNone(golden.compare_runners(golden.runner_class(Orderbook, Predictors), config=self.config, steps=300))
+        self.assertIsNone(golden.compare_predictors(Predictors, config=self.config, steps=300))
+        # the caller's random state is not disturbed
+        self.assertEqual(random.getstate(), self.before)
+
+    def test_runner_divergence(self):
+        d = golden.compare_runners(golden.runner_class(exchange_class=LateOrderbook), config=self.config, steps=2000)
+        self.assertEqual(d.field, 'trades')
+        self.assertIsInstance(d.step, int)
+        self.assertEqual(d.reference[0]['price'] + 1, d.candidate[0]['price'])
+        self.assertIn('first divergence', str(d))
+        d = golden.compare_runners(golden.runner_class(predictors_class=SlowLearningPredictors), config=self.config, steps=2000)
+        self.assertIn('chromosomes', d.field)
+
+    def test_predictors_divergence(self):
+        d = golden.compare_predictors(SlowLearningPredictors, config=self.config, steps=300)
+        self.assertIn(d.field, ('forecast', 'chromosomes', 'predictors'))
+
+    def test_orderbooks(self):
+        self.make_runner(4, run_steps=1000, write_interval=500).run()
+        orders = [o for chunk in replay.read_orders(self.h5filename) for o in chunk]
+        self.assertIsNone(golden.compare_orderbooks(Orderbook, orders))
+        d = golden.compare_orderbooks(LateOrderbook, orders)
+        self.assertEqual(d.field, 'trades')
+        self.assertTrue(d.step.startswith('order '))
@@ -0,0 +1,80 @@
+import json
+
+import mmabm.checkpoint as checkpoint
+import mmabm.instrument as instrument
+
+from mmabm.config import Config
+
+from tests.helpers import RunnerTestCase
+
+
+class TestInstrument(RunnerTestCase):
+
+    seed = 23
+
+    def setUp(self):
+        super().setUp()
+        self.logged = []
+
+    def test_off(self):
+        r1 = self.make_runner()
+        self.assertIsNone(r1.instrument)
+        self.assertNotIn('process_order', vars(r1.exchange))
+
+    def test_counts(self):
+        r1 = self.make_runner(instrument=True)
+        r1.instrument.log = self.logged.append
+        r1.prime()
+        r1.run_until(r1.run_steps)
+        snap = r1.instrument.snapshot(r1.current_time)
+        counters = snap['counters']
+        orders = sum(v for k, v in counters.items() if k.startswith('orders.'))
+        # every order but the two seed orders goes through process_order
+        self.assertEqual(orders, r1.exchange._order_index - 2)
+        self.assertEqual(counters['fills'], len(r1.exchange.trade_book))
+        self.assertLessEqual(counters['levels_touched'], counters['fills'])
+        self.assertEqual(snap['timers']['step']['calls'], r1.run_steps - r1.prime1)
+        self.assertEqual(snap['timers']['process_order']['calls'], orders)
+        self.assertEqual(counters['ga_generations'], snap['timers']['new_genes']['calls'])
+        self.assertEqual(snap['timers']['order_history_to_h5']['calls'], 3)
+        self.assertEqual(len(self.logged), 3)
+
+    def test_ga_pool(self):
+        # generations run in the pool's workers are counted as in a serial cohort
+        config = Config(seed=23, cohort=True, num_mms=2, oi_num_chroms=20, of_num_chroms=20, genetic_int=50)
+        generations = []
+        for processes in (0, 2):
+            r1 = self.make_runner(config=config.replace(ga_processes=processes), instrument=True)
+            r1.instrument.log = self.logged.append
+            r1.prime()
+            r1.run_until(r1.run_steps)
+            if r1.genetics is not None:
+                r1.genetics.close()
+                self.assertGreater(r1.instrument.timers['ga_pool'][0], 0)
+            generations.append(r1.instrument.snapshot(r1.current_time)['counters']['ga_generations'])
+        self.assertGreater(generations[0], 0)
+        self.assertEqual(generations[1], generations[0])
+
+    def test_same_output(self):
+        r1 = self.make_runner()
+        r1.prime()
+        r1.run_until(r1.run_steps)
+        r2 = self.make_runner(instrument=True)
+        r2.instrument.log = self.logged.append
+        r2.prime()
+        r2.run_until(r2.run_steps)
+        self.assertEqual(r1.exchange.trade_book, r2.exchange.trade_book)
+        # instrumented runners can be checkpointed
+        r3 = checkpoint.loads(checkpoint.dumps(r2), truncate=False)
+        self.assertEqual(r3.instrument.timers, r2.instrument.timers)
+
+    def test_report(self):
+        r1 = self.make_runner(instrument=True)
+        r1.instrument.log = self.logged.append
+        r1.run()
+        with open(self.h5filename + '.instrument.json') as f:
+            snaps = json.load(f)
+        self.assertEqual([s['step'] for s in snaps], [100, 200, 300, 301])
+        self.assertEqual(snaps[-1]['timers']['trade_book_to_h5']['calls'], 1)
+        self.assertIn('process_order', self.logged[-1])
+        self.assertIn('fills', instrument.format_table(snaps[-1]))
@@ -0,0 +1,94 @@
+import os
+import unittest
+
+import mmabm.latency as latency
+
+from mmabm.config import Config
+from mmabm.orderbook import Orderbook
+from mmabm.shared import Side, OType
+from mmabm.sweep import Sweep
+
+from tests.helpers import RunnerTestCase
+
+
+class TestLogHistogram(unittest.TestCase):
+
+    def test_bucket(self):
+        previous = -1
+        for v in range(5000):
+            b = latency.bucket(v)
+            low, high = latency.bucket_range(b)
+            self.assertTrue(low <= v < high)
+            self.assertGreaterEqual(b, previous)
+            self.assertLessEqual(high - low, max(1, low / 8))
+            previous = b
+
+    def test_percentile(self):
+        h = latency.LogHistogram()
+        for v in range(1, 1001):
+            h.record(v)
+        self.assertEqual(h.n, 1000)
+        self.assertEqual(h.mean, 500.5)
+        self.assertAlmostEqual(h.percentile(50), 500, delta=500 / 8)
+        self.assertAlmostEqual(h.percentile(99), 990, delta=990 / 8)
+        self.assertEqual(h.percentile(100), 1000)
+        self.assertIsNone(latency.LogHistogram().percentile(50))
+
+    def test_merge(self):
+        h1 = latency.LogHistogram()
+        h2 = latency.LogHistogram()
+        for v in range(100):
+            h1.record(v)
+            h2.record(v * 10)
+        d = h1.to_dict()
+        h3 = latency.LogHistogram.from_dict(d).merge(h2)
+        self.assertEqual(h3.n, 200)
+        self.assertEqual(h3.max, 990)
+        self.assertEqual(h3.min, 0)
+        self.assertEqual(h3.total, h1.total + h2.total)
+
+
+class TestLatencyRecorder(RunnerTestCase):
+
+    seed = 5
+    run_steps = 200
+    write_interval = 1000
+
+    def _order(self, order_id, otype, side, price, trader_id=1):
+        return {'order_id': order_id, 'trader_id': trader_id, 'timestamp': 1, 'type': otype,
+                'quantity': 1, 'side': side, 'price': price}
+
+    def test_kinds(self):
+        book = Orderbook()
+        book.add_order_to_book(self._order(1, OType.ADD, Side.BID, 99))
+        book.add_order_to_book(self._order(2, OType.ADD, Side.ASK, 101))
+        recorder = latency.LatencyRecorder().attach(book)
+        book.process_order(self._order(3, OType.ADD, Side.BID, 98))
+        book.process_order(self._order(4, OType.ADD, Side.ASK, 102))
+        book.process_order(self._order(3, OType.CANCEL, Side.BID, 98))
+        book.process_order(self._order(5, OType.ADD, Side.BID, 101))
+        h = recorder.histograms
+        self.assertEqual(h['add_resting'].n, 2)
+        self.assertEqual(h['cancel'].n, 1)
+        self.assertEqual(h['add_crossing'].n, 1)
+        self.assertEqual(h['cancel@depth<=2'].n, 1)
+        self.assertEqual(h['add_crossing@depth<=2'].n, 1)
+        self.assertIn('add_crossing', recorder.summary())
+
+    def test_runner(self):
+        r1 = self.make_runner(latency=True)
+        r1.run()
+        recorder = latency.LatencyRecorder.load(self.h5filename + '.latency.json')
+        self.assertGreater(recorder.histograms['add_crossing'].n, 0)
+        total = sum(recorder.histograms[k].n for k in latency.KINDS if k in recorder.histograms)
+        self.assertEqual(total, r1.exchange._order_index - 2)
+        merged = latency.merge_files([self.h5filename + '.latency.json'] * 2)
+        self.assertEqual(merged.histograms['cancel'].n, 2 * recorder.histograms['cancel'].n)
+
+    def test_sweep(self):
+        config = Config(run_steps=40, write_interval=1000, oi_num_chroms=10, of_num_chroms=10, latency=True)
+        results = Sweep({}, [1, 2], self.tmpdir.name, config=config, processes=2, log=lambda msg: None).run()
+        for r in results:
+            self.assertTrue(os.path.exists(r['h5filename'] + '.latency.json'))
+        merged = latency.LatencyRecorder.load(self.path('abm_latency.json'))
+        self.assertGreater(merged.histograms['cancel'].n, 0)
@@ -0,0 +1,81 @@
+import os
+
+import pandas as pd
+
+import mmabm.checkpoint as checkpoint
+
+from mmabm.config import Config
+from mmabm.multimarket import MultiRunner, consolidate, run_venues, venue_config
+
+from tests.helpers import RunnerTestCase
+
+
+class TestMultiMarket(RunnerTestCase):
+
+    runner_class = MultiRunner
+    seed = 37
+    run_steps = 600
+    write_interval = 200
+
+    def test_venues(self):
+        m1 = self.make_runner(venues=('A', 'B', 'C'))
+        home = m1.exchange.home
+        self.assertEqual([home[p.trader_id] for p in m1.providers[:4]], ['A', 'B', 'C', 'A'])
+        for t in m1.takers + m1.marketmakers:
+            self.assertNotIn(t.trader_id, home)
+        for book in m1.exchange.books.values():
+            self.assertEqual(len(book._bid_book_prices), 1)
+            self.assertEqual(len(book._ask_book_prices), 1)
+        self.assertEqual(len(m1.liquidity_providers[9999].local_book), 6)
+
+    def test_run(self):
+        m1 = self.make_runner()
+        m1.run()
+        with pd.HDFStore(self.h5filename, 'r') as store:
+            keys = set(store.keys())
+        self.assertLessEqual({'/trades', '/tob', '/orders_A', '/orders_B', '/tob_A', '/tob_B'}, keys)
+        trades = pd.read_hdf(self.h5filename, 'trades')
+        self.assertEqual(set(trades['venue']), {'A', 'B'})
+        tob = pd.read_hdf(self.h5filename, 'tob')
+        self.assertTrue((tob['best_bid'] < tob['best_ask']).all())
+        # the consolidated quote matches the books
+        exchange = m1.exchange
+        tob = exchange.report_top_of_book(m1.run_steps)
+        self.assertEqual(tob['best_bid'], max(b._bid_book_prices[-1] for b in exchange.books.values()))
+        self.assertEqual(tob['best_ask'], min(b._ask_book_prices[0] for b in exchange.books.values()))
+        self.assertEqual(exchange.books[tob['ask_venue']]._ask_book_prices[0], tob['best_ask'])
+
+    def test_checkpoint(self):
+        m1 = self.make_runner(config=Config(seed=37))
+        m1.prime()
+        m1.run_until(300)
+        m2 = checkpoint.loads(checkpoint.dumps(m1), truncate=False)
+        m1.run_until(m1.run_steps)
+        m2.run_until(m2.run_steps)
+        self.assertEqual(m1.exchange.trade_book, m2.exchange.trade_book)
+        self.assertEqual(m1.top_of_book, m2.top_of_book)
+
+    def test_venue_config(self):
+        config = Config(num_providers=5, num_takers=4, num_mms=1, informed=True, seed=3)
+        configs = [venue_config(config, i) for i in range(2)]
+        self.assertEqual([c.num_providers for c in configs], [3, 2])
+        self.assertEqual([c.num_takers for c in configs], [2, 2])
+        self.assertEqual([c.num_mms for c in configs], [1, 0])
+        self.assertEqual([c.informed for c in configs], [True, False])
+        self.assertEqual([c.venues for c in configs], [('A',), ('B',)])
+        self.assertNotEqual(configs[0].seed, configs[1].seed)
+
+    def test_run_venues(self):
+        with self.assertRaises(ValueError):
+            run_venues(Config(), self.h5filename, seed=1)
+        config = Config(routed=(), run_steps=300, write_interval=100)
+        filenames = run_venues(config, self.h5filename, seed=41, processes=2)
+        self.assertEqual([os.path.basename(f) for f in filenames], ['test_A.h5', 'test_B.h5'])
+        out = self.path('nbbo.h5')
+        consolidate(filenames, config.venues, out, chunksize=500)
+        tob = pd.read_hdf(out, 'tob')
+        venue_tob = [pd.read_hdf(f, 'tob') for f in filenames]
+        self.assertEqual(len(tob), sum(len(t) for t in venue_tob))
+        last = [t.iloc[-1] for t in venue_tob]
+        self.assertEqual(tob['best_bid'].iloc[-1], max(t['best_bid'] for t in last))
+        self.assertEqual(tob['best_ask'].iloc[-1], min(t['best_ask'] for t in last))
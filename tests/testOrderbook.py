@@ -1,4 +1,4 @@
-from mmabm.orderbook import Orderbook
+from mmabm.orderbook import Orderbook, Fill, trade_rows
 from mmabm.shared import Side, OType
 import unittest
 
@@ -234,6 +234,31 @@ class TestOrderbook(unittest.TestCase):
         self.assertTrue(self.ex1.confirm_trade_collector)
         self.assertDictEqual(t2, self.ex1.confirm_trade_collector[0])
 
+    def test_fills(self):
+        '''
+        Orderbook(fills=True) makes one Fill per trade for trade_book and confirm_trade_collector:
+        the same trades and confirmations as the dicts
+        '''
+        ex2 = Orderbook(fills=True)
+        q1 = {'order_id': 1, 'trader_id': 1100, 'timestamp': 10, 'type': OType.ADD, 'quantity': 5,
+              'side': Side.BID, 'price': 100000}
+        q2 = {'order_id': 2, 'trader_id': 1100, 'timestamp': 11, 'type': OType.ADD, 'quantity': 4,
+              'side': Side.ASK, 'price': 0}
+        for book in (self.ex1, ex2):
+            book.add_order_to_book(self.q1_buy)
+            book.add_order_to_book(self.q1_sell)
+        for q in (self.q2_buy, self.q2_sell, self.q3_buy, self.q3_sell, self.q4_buy, self.q4_sell, q1, q2):
+            self.ex1.process_order(q)
+            ex2.process_order(q)
+            self.assertEqual(self.ex1.traded, ex2.traded)
+            if ex2.traded:
+                self.assertEqual([{k: c[k] for k in ('timestamp', 'trader', 'order_id', 'quantity', 'side', 'price')}
+                                  for c in ex2.confirm_trade_collector], self.ex1.confirm_trade_collector)
+        self.assertEqual(len(ex2.trade_book), 6)
+        self.assertTrue(all(type(f) is Fill for f in ex2.trade_book))
+        self.assertIs(ex2.trade_book[-1], ex2.confirm_trade_collector[-1])
+        self.assertEqual(trade_rows(ex2.trade_book), self.ex1.trade_book)
+
     def test_process_order(self):
         '''
         process_order() impacts confirm_modify_collector, traded indicator, order_history, 
@@ -512,6 +537,23 @@ class TestOrderbook(unittest.TestCase):
         tob_check = {'timestamp': 5, 'best_bid': 50, 'best_ask': 52, 'bid_size': 2, 'ask_size': 2}
         self.ex1.report_top_of_book(5)
         self.assertDictEqual(self.ex1._sip_collector[0], tob_check)
+
+    def test_engine_protocol(self):
+        '''
+        best_bid() and best_ask() are None for an empty side; flush_tob() returns and clears the feed
+        '''
+        self.assertIsNone(self.ex1.best_bid())
+        self.assertIsNone(self.ex1.best_ask())
+        self.ex1.add_order_to_book(self.q1_buy)
+        self.ex1.add_order_to_book(self.q3_buy)
+        self.ex1.add_order_to_book(self.q3_sell)
+        self.assertEqual(self.ex1.best_bid(), 50)
+        self.assertEqual(self.ex1.best_ask(), 53)
+        collector = self.ex1._sip_collector
+        tob = self.ex1.report_top_of_book(5)
+        self.assertEqual(self.ex1.flush_tob(), [tob])
+        self.assertFalse(self.ex1._sip_collector)
+        self.assertIs(self.ex1._sip_collector, collector)
    
     @unittest.skip('For most runs - use for collapse testing')
     def test_market_collapse(self):
@@ -0,0 +1,36 @@
+import unittest
+
+import numpy as np
+
+from mmabm.qtake import walk, make_q_take
+
+
+class TestQTake(unittest.TestCase):
+
+    def _loop_q_take(self, run_steps, lambda_0, wn, c_lambda):
+        '''The original element-wise NumPy loop'''
+        noise = np.random.rand(2, run_steps)
+        qt_take = np.empty_like(noise)
+        qt_take[:,0] = 0.5
+        for i in range(1, run_steps):
+            qt_take[:,i] = qt_take[:,i-1] + (noise[:,i-1]>qt_take[:,i-1])*wn - (noise[:,i-1]<qt_take[:,i-1])*wn
+        lambda_t = -lambda_0*(1 + (np.abs(qt_take[1] - 0.5)/np.sqrt(np.mean(np.square(qt_take[0] - 0.5))))*c_lambda)
+        return qt_take[1], lambda_t
+
+    def test_walk(self):
+        self.assertEqual(walk([0.9, 0.9, 0.1, 0.5], 0.25), [0.5, 0.75, 1.0, 0.75, 0.5])
+        self.assertEqual(walk([], 0.1), [0.5])
+
+    def test_make_q_take(self):
+        for run_steps in (3, 20001):
+            np.random.seed(11)
+            expected_q, expected_l = self._loop_q_take(run_steps, 100, 0.001, 10.0)
+            np.random.seed(11)
+            q, l = make_q_take(run_steps, True, 100, 0.001, 10.0)
+            np.testing.assert_array_equal(q, expected_q)
+            np.testing.assert_array_equal(l, expected_l)
+
+    def test_no_q_take(self):
+        q, l = make_q_take(5, False, 100, 0.001, 10.0)
+        np.testing.assert_array_equal(q, np.array([0.5]*5))
+        np.testing.assert_array_equal(l, np.array([-100]*5))
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+import mmabm.replay as replay
+
+from mmabm.orderbook import Orderbook
+
+from tests.helpers import make_runner
+
+
+class BadOrderbook(Orderbook):
+    '''Reports trades one tick high and the ask size one too many'''
+
+    def _add_trade_to_book(self, resting_trader_id, resting_order_id, resting_timestamp,
+                           incoming_trader_id, incoming_order_id, timestamp, price, quantity, side):
+        super()._add_trade_to_book(resting_trader_id, resting_order_id, resting_timestamp,
+                                   incoming_trader_id, incoming_order_id, timestamp, price + 1, quantity, side)
+
+    def report_top_of_book(self, now_time):
+        tob = super().report_top_of_book(now_time)
+        tob['ask_size'] += 1
+        return tob
+
+
+class TestReplay(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.h5filename = os.path.join(cls.tmpdir.name, 'test.h5')
+        make_runner(cls.h5filename, 11, run_steps=600, write_interval=200, pennyjumper=True).run()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_replay(self):
+        r1 = replay.Replay(self.h5filename, chunksize=1000).run()
+        self.assertGreater(r1.num_orders, 1000)
+        self.assertTrue(r1.trade_book)
+        self.assertTrue(r1.diff_trades().empty)
+        self.assertGreater(r1.tob_checked, 500)
+        self.assertEqual(r1.tob_mismatches, [])
+        self.assertIn('0 differ', r1.report())
+
+    def test_no_tob(self):
+        r1 = replay.Replay(self.h5filename, check_tob=False).run()
+        self.assertEqual(r1.tob_checked, 0)
+        self.assertTrue(r1.diff_trades().empty)
+
+    def test_engine(self):
+        self.assertIs(replay.load_engine('mmabm.orderbook:Orderbook'), Orderbook)
+        r1 = replay.Replay(self.h5filename, BadOrderbook).run()
+        self.assertEqual(len(r1.diff_trades()), len(r1.trade_book))
+        self.assertEqual(len(r1.tob_mismatches), r1.tob_checked)
+        with self.assertRaisesRegex(TypeError, 'best_bid, best_ask, report_top_of_book, flush_tob, clear_history'):
+            replay.Replay(self.h5filename, type('NoTob', (), {'add_order_to_book': print, 'add_order_to_history': print,
+                                                              'process_order': print}))
+        self.assertFalse(r1.diff_tob().empty)
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from mmabm.results import Results, Run
+
+from tests.helpers import make_runner
+
+
+class TestResults(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.h5filenames = []
+        for seed in (31, 32):
+            h5filename = os.path.join(cls.tmpdir.name, 'abm_%d.h5' % seed)
+            make_runner(h5filename, seed, run_steps=400, write_interval=100).run()
+            cls.h5filenames.append(h5filename)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_run(self):
+        run = Run(self.h5filenames[0])
+        tob = pd.read_hdf(self.h5filenames[0], 'tob')
+        self.assertIn('tob', run.keys())
+        self.assertEqual(run.nrows('tob'), len(tob))
+        self.assertEqual(run.columns('tob'), list(tob.columns))
+        self.assertEqual(run.data_columns('tob'), ['timestamp'])
+        chunks = list(run.iter('tob', chunksize=100))
+        self.assertEqual([len(c) for c in chunks[:-1]], [100] * (len(chunks) - 1))
+        pd.testing.assert_frame_equal(pd.concat(chunks), tob)
+
+    def test_where(self):
+        run = Run(self.h5filenames[0])
+        tob = pd.read_hdf(self.h5filenames[0], 'tob')
+        # on a data column: filtered by the store
+        expected = tob[tob['timestamp'] > 250][['best_bid']]
+        pd.testing.assert_frame_equal(run.read('tob', columns=['best_bid'], where='timestamp > 250', chunksize=64),
+                                      expected)
+        # on other columns: filtered in pandas
+        expected = tob[(tob['timestamp'] > 250) & (tob['bid_size'] > 1)][['best_bid']]
+        pd.testing.assert_frame_equal(run.read('tob', columns=['best_bid'], where='timestamp > 250 & bid_size > 1',
+                                               chunksize=64), expected)
+        self.assertEqual(list(run.read('tob', where='timestamp < 0').columns), list(tob.columns))
+
+    def test_results(self):
+        results = Results(os.path.join(self.tmpdir.name, '*.h5'), self.h5filenames[0], processes=2)
+        self.assertEqual([r.h5filename for r in results], self.h5filenames)
+        trades = [pd.read_hdf(f, 'trades') for f in self.h5filenames]
+        rows = sum(len(c) for _, c in results.iter('trades', chunksize=50))
+        self.assertEqual(rows, sum(len(t) for t in trades))
+        described = results.describe('trades', 'price', where='timestamp > 100')
+        prices = [t[t['timestamp'] > 100]['price'] for t in trades]
+        for name, p in zip(described.index, prices):
+            self.assertEqual(described.loc[name, 'n'], len(p))
+            self.assertAlmostEqual(described.loc[name, 'mean'], p.mean())
+        everything = pd.concat(prices)
+        self.assertAlmostEqual(described.loc['all', 'mean'], everything.mean())
+        self.assertAlmostEqual(described.loc['all', 'std'], everything.std())
+        self.assertEqual(described.loc['all', 'max'], everything.max())
+        self.assertEqual(results.map(_rows, 'tob'), [len(pd.read_hdf(f, 'tob')) for f in self.h5filenames])
+
+
+def _rows(h5filename, key):
+    return Run(h5filename).nrows(key)
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from mmabm.config import Config
+from mmabm.rng import RandomStreams, PROVIDERS, TAKERS
+
+from tests.helpers import RunnerTestCase
+
+
+class TestRandomStream(unittest.TestCase):
+
+    def setUp(self):
+        self.streams = RandomStreams(51, block=16)
+
+    def test_deterministic(self):
+        s1 = self.streams.stream(PROVIDERS)
+        s2 = RandomStreams(51, block=16).stream(PROVIDERS)
+        # buffering does not change the sequence
+        s3 = RandomStreams(51, block=1000).stream(PROVIDERS)
+        draws = [s1.random() for _ in range(100)]
+        self.assertEqual(draws, [s2.random() for _ in range(100)])
+        self.assertEqual(draws, [s3.random() for _ in range(100)])
+
+    def test_independent(self):
+        s1 = self.streams.stream(PROVIDERS)
+        s2 = self.streams.stream(TAKERS)
+        self.assertNotEqual([s1.random() for _ in range(10)], [s2.random() for _ in range(10)])
+        # drawing from one stream does not move another
+        s3 = self.streams.stream(TAKERS)
+        s4 = self.streams.stream(TAKERS)
+        for _ in range(50):
+            self.streams.stream(PROVIDERS).random()
+        self.assertEqual(s3.random(), s4.random())
+        self.assertNotEqual(s3.child(0).random(), s3.child(1).random())
+
+    def test_api(self):
+        s1 = self.streams.stream(0)
+        for _ in range(200):
+            self.assertTrue(0 <= s1.random() < 1)
+            self.assertGreater(s1.expovariate(0.5), 0)
+            self.assertTrue(5 <= s1.randrange(5, 10) < 10)
+            self.assertTrue(1 <= s1.randint(1, 3) <= 3)
+            self.assertIn(s1.choice([2, 4, 6]), [2, 4, 6])
+        self.assertEqual(s1.choices(['a', 'b'], [0, 1], k=5), ['b'] * 5)
+        sample = s1.sample(range(20), 20)
+        self.assertEqual(sorted(sample), list(range(20)))
+        self.assertEqual(len(s1.sample(range(20), 5)), 5)
+        with self.assertRaises(ValueError):
+            s1.sample(range(3), 4)
+        self.assertEqual(s1.random((2, 5)).shape, (2, 5))
+        self.assertEqual(s1.choice([0, 1, 2], 4, p=[0, 1, 0]).tolist(), [1, 1, 1, 1])
+        self.assertTrue(0 <= s1.binomial(10, 0.5) <= 10)
+
+
+class TestSeededRunner(RunnerTestCase):
+
+    write_interval = 1000000
+
+    def _run(self, seed, global_seed):
+        r1 = self.make_runner(global_seed, config=Config(seed=seed))
+        r1.prime()
+        r1.run_until(r1.run_steps)
+        return r1
+
+    def test_reproducible(self):
+        r1 = self._run(7, 1)
+        r2 = self._run(7, 2)
+        self.assertTrue(r1.exchange.trade_book)
+        self.assertEqual(r1.exchange.trade_book, r2.exchange.trade_book)
+        self.assertEqual(r1.marketmakers[0].cash_flow_collector, r2.marketmakers[0].cash_flow_collector)
+        np.testing.assert_array_equal(r1.q_take, r2.q_take)
+
+    def test_seeds_differ(self):
+        r1 = self._run(7, 1)
+        r2 = self._run(8, 1)
+        self.assertNotEqual(r1.exchange.trade_book, r2.exchange.trade_book)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from mmabm.config import Config
+from mmabm.orderbook import trade_rows
+from mmabm.runner2 import Runner
+
+from tests.helpers import RunnerTestCase
+
+
+class TestRunner(RunnerTestCase):
+
+    write_interval = 1000000
+
+    def test_build(self):
+        r1 = self.make_runner()
+        self.assertEqual(r1.current_time, r1.prime1)
+        self.assertIsNone(r1.top_of_book)
+        self.assertFalse(r1.exchange.trade_book)
+        self.assertEqual(len(r1.exchange._sip_collector), 0)
+
+    def test_step(self):
+        r1 = self.make_runner()
+        r1.prime()
+        self.assertEqual(r1.top_of_book['timestamp'], r1.prime1)
+        r1.step()
+        self.assertEqual(r1.current_time, r1.prime1 + 1)
+        r1.step(10)
+        self.assertEqual(r1.current_time, r1.prime1 + 11)
+        r1.run_until(100)
+        self.assertEqual(r1.current_time, 100)
+        # cannot step past the end of the run
+        r1.step(1000)
+        self.assertEqual(r1.current_time, r1.run_steps)
+
+    def test_step_matches_run_until(self):
+        r1 = self.make_runner()
+        r1.prime()
+        r1.run_until(r1.run_steps)
+        r2 = self.make_runner()
+        r2.prime()
+        r2.step(25)
+        r2.run_until(150)
+        for _ in r2.events():
+            pass
+        self.assertEqual(r1.exchange.trade_book, r2.exchange.trade_book)
+        self.assertEqual(r1.exchange._sip_collector, r2.exchange._sip_collector)
+        self.assertEqual(r1.marketmakers[0].cash_flow_collector, r2.marketmakers[0].cash_flow_collector)
+
+    def test_events(self):
+        r1 = self.make_runner()
+        r1.prime()
+        steps = []
+        trades = 0
+        for event in r1.events():
+            steps.append(event['step'])
+            trades += len(event['trades'])
+            self.assertEqual(event['tob'], r1.top_of_book)
+            self.assertEqual(event['mm'][0]['mmid'], 3000)
+            if event['step'] == 99:
+                break
+        self.assertEqual(steps, list(range(r1.prime1, 100)))
+        self.assertEqual(trades, len(r1.exchange.trade_book))
+        self.assertEqual(r1.current_time, 100)
+        # resume from where the generator stopped
+        self.assertEqual([e['step'] for e in r1.events(105)], [100, 101, 102, 103, 104])
+
+    def test_config(self):
+        r1 = self.make_runner()
+        r2 = Runner(h5filename=self.h5filename, config=r1.config.replace(num_providers=10, num_takers=5))
+        self.assertEqual(len(r1.providers), 38)
+        self.assertEqual(len(r2.providers), 10)
+        self.assertEqual(len(r2.takers), 5)
+        self.assertEqual(r1.run_steps, 301)
+        self.assertEqual(r2.run_steps, 301)
+
+    def test_fills(self):
+        r1 = self.make_runner(config=Config(seed=19), num_mms=3, run_steps=1000)
+        r2 = Runner(h5filename=self.path('fills.h5'), config=r1.config.replace(fills=True))
+        self.assertEqual(r2.confirmTrades, r2.confirmFills)
+        for r in (r1, r2):
+            r.prime()
+            r.run_until(r.run_steps)
+        self.assertTrue(r1.exchange.trade_book)
+        self.assertEqual(trade_rows(r2.exchange.trade_book), r1.exchange.trade_book)
+        self.assertEqual([m.cash_flow_collector for m in r1.marketmakers], [m.cash_flow_collector for m in r2.marketmakers])
+        for r in (r1, r2):
+            r.exchange.trade_book_to_h5(r.h5filename)
+        pd.testing.assert_frame_equal(pd.read_hdf(r1.h5filename, 'trades'), pd.read_hdf(r2.h5filename, 'trades'))
+
+    def test_jumper_turns(self):
+        r1 = self.make_runner(config=Config(seed=19), pennyjumper=True, pj_batch=True)
+        self.assertEqual(r1._mcs_step, r1.mcsStepPJBatch)
+        # a turn after each of 50 traders with probability 0.1 (one jumper) or 0.3 (another)
+        a, b = object(), object()
+        counts = np.zeros((2, 50))
+        for _ in range(4000):
+            turns = r1._jumper_turns(50, [(a, 0.1), (b, 0.3)])
+            self.assertEqual(turns, sorted(turns, key=lambda turn: (turn[0], turn[1] is b)))
+            for slot, jumper in turns:
+                counts[int(jumper is b), slot] += 1
+        self.assertAlmostEqual(counts[0].mean() / 4000, 0.1, delta=0.01)
+        self.assertAlmostEqual(counts[1].mean() / 4000, 0.3, delta=0.01)
+        self.assertLess(abs(counts[1] / 4000 - 0.3).max(), 0.04)
+        r1.run()
+        self.assertTrue(any(o['trader_id'] == 4000 for o in r1.exchange.order_history))
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from mmabm.config import Config
+from mmabm.stats import Moments, P2Quantile, Summary
+
+from tests.helpers import RunnerTestCase
+
+
+class TestStats(RunnerTestCase):
+
+    seed = 29
+    run_steps = 350
+
+    def test_moments(self):
+        values = np.random.RandomState(3).normal(5, 2, 1001)
+        m1, m2, m3 = Moments(), Moments(), Moments()
+        for v in values:
+            m1.add(v)
+        for v in values[:300]:
+            m2.add(v)
+        for v in values[300:]:
+            m3.add(v)
+        m2.merge(m3)
+        for m in (m1, m2):
+            self.assertEqual(m.n, 1001)
+            self.assertAlmostEqual(m.mean, values.mean())
+            self.assertAlmostEqual(m.variance, values.var(ddof=1))
+            self.assertEqual((m.min, m.max), (values.min(), values.max()))
+        self.assertEqual(Moments().variance, 0.0)
+
+    def test_p2_quantile(self):
+        values = np.random.RandomState(5).normal(0, 1, 20000)
+        for p in (0.05, 0.5, 0.95):
+            q = P2Quantile(p)
+            for v in values:
+                q.add(v)
+            self.assertAlmostEqual(q.value, np.quantile(values, p), delta=0.05)
+        q = P2Quantile(0.5)
+        self.assertIsNone(q.value)
+        for v in (3, 1, 2):
+            q.add(v)
+        self.assertEqual(q.value, 2)
+        s = Summary()
+        s.add(1)
+        self.assertEqual(sorted(s.to_dict()), ['max', 'mean', 'min', 'n', 'p05', 'p50', 'p95', 'std'])
+
+    def test_config(self):
+        with self.assertRaises(ValueError):
+            Config(raw_output=False)
+        with self.assertRaises(ValueError):
+            Config(stats_window=-1)
+
+    def test_runner_stats(self):
+        r1 = self.make_runner(stats_window=100)
+        r1.run()
+        windows = pd.read_hdf(self.h5filename, 'stats')
+        summary = pd.read_hdf(self.h5filename, 'summary')
+        trades = pd.read_hdf(self.h5filename, 'trades')
+        steps = r1.run_steps - r1.prime1
+        self.assertEqual(list(windows['steps']), [100, 100, 100, steps - 300])
+        self.assertEqual(windows['start'].iloc[0], r1.prime1)
+        self.assertEqual(windows['end'].iloc[-1], r1.run_steps - 1)
+        self.assertEqual(windows['trades'].sum(), len(trades))
+        self.assertEqual(windows['volume'].sum(), trades['quantity'].sum())
+        self.assertEqual(summary.loc['trades', 'n'], steps)
+        self.assertAlmostEqual(summary.loc['volume', 'mean'] * steps, trades['quantity'].sum())
+        # the top of book at the end of each step
+        r2 = self.make_runner(h5filename=self.path('events.h5'))
+        r2.prime()
+        spread = np.array([e['tob']['best_ask'] - e['tob']['best_bid'] for e in r2.events()])
+        self.assertAlmostEqual(summary.loc['spread', 'mean'], spread.mean())
+        self.assertEqual(summary.loc['spread', 'max'], spread.max())
+        self.assertEqual(windows['spread_max'].iloc[0], spread[:100].max())
+        mm = r1.marketmakers[0]
+        self.assertEqual(windows['mm%d_delta_inv' % mm.trader_id].iloc[-1], mm._delta_inv)
+        self.assertIn('mm%d_delta_inv' % mm.trader_id, summary.index)
+
+    def test_no_raw_output(self):
+        h5raw = self.path('raw.h5')
+        r1 = self.make_runner(h5filename=h5raw, stats_window=100)
+        r1.run()
+        r2 = self.make_runner(stats_window=100, raw_output=False)
+        r2.run()
+        with pd.HDFStore(self.h5filename, 'r') as store:
+            self.assertEqual(sorted(store.keys()), ['/stats', '/summary'])
+        self.assertEqual(r2.exchange.trade_book, [])
+        pd.testing.assert_frame_equal(pd.read_hdf(h5raw, 'stats'), pd.read_hdf(self.h5filename, 'stats'))
+        pd.testing.assert_frame_equal(pd.read_hdf(h5raw, 'summary'), pd.read_hdf(self.h5filename, 'summary'))
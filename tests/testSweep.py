@@ -0,0 +1,119 @@
+import os
+import time
+
+from mmabm.config import Config
+from mmabm.sweep import Sweep, make_grid, parse_seeds, parse_set, run_filename, RUNNING
+
+from tests.helpers import RunnerTestCase
+
+
+def _die(h5filename, wait_for=None):
+    open(h5filename + RUNNING, 'w').close()
+    while wait_for and not os.path.exists(wait_for + RUNNING):
+        time.sleep(0.01)
+    os._exit(1)
+
+def _hold(h5filename):
+    open(h5filename + RUNNING, 'w').close()
+    time.sleep(5)
+    return 5.0, None
+
+def _fail(h5filename):
+    return None, 'failed on purpose'
+
+
+class DyingSweep(Sweep):
+    '''The first run of each combo in die kills its worker, in hold runs until killed, in fail fails'''
+
+    die, hold, fail = (), (), ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._acted = set()
+
+    def _submit(self, pool, record):
+        combo = record['combo']
+        if combo in self._acted or combo not in self.die + self.hold + self.fail:
+            return super()._submit(pool, record)
+        if combo in self.die:
+            others = [r['h5filename'] for r in self.results if r['combo'] in self.hold]
+            future = pool.submit(_die, record['h5filename'], *others)
+        else:
+            future = pool.submit(_hold if combo in self.hold else _fail, record['h5filename'])
+        self._acted.add(combo)
+        record['attempts'] += 1
+        return future
+
+
+class TestSweep(RunnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config = Config(run_steps=40, write_interval=1000, oi_num_chroms=10, of_num_chroms=10)
+
+    def test_make_grid(self):
+        runs = make_grid({'num_takers': [10, 20], 'num_providers': [5]}, [1, 2])
+        self.assertEqual(len(runs), 4)
+        self.assertEqual(runs[0], (0, {'num_providers': 5, 'num_takers': 10}, 1))
+        self.assertEqual(runs[3], (1, {'num_providers': 5, 'num_takers': 20}, 2))
+        self.assertEqual(make_grid({}, [7]), [(0, {}, 7)])
+
+    def test_parse(self):
+        self.assertEqual(parse_seeds('51-53,60'), [51, 52, 53, 60])
+        self.assertEqual(parse_set(['num_providers=30,38', 'taker=True', 'oi_cond_probs=(0.1,0.1,0.8),(0.05,0.05,0.9)']),
+                         {'num_providers': [30, 38], 'taker': [True],
+                          'oi_cond_probs': [(0.1, 0.1, 0.8), (0.05, 0.05, 0.9)]})
+
+    def test_bad_grid(self):
+        with self.assertRaises(ValueError):
+            Sweep({'num_providers': [-1]}, [1], self.tmpdir.name, config=self.config)
+
+    def test_run(self):
+        messages = []
+        sweep = Sweep({'num_takers': [10, 20]}, [3], self.tmpdir.name, config=self.config, processes=2,
+                      log=messages.append)
+        results = sweep.run()
+        self.assertEqual([r['status'] for r in results], ['done', 'done'])
+        for r in results:
+            self.assertTrue(os.path.exists(r['h5filename']))
+            self.assertGreater(r['seconds'], 0)
+        self.assertTrue(os.path.exists(self.path('abm_sweep.json')))
+        # resume: existing outputs are skipped
+        os.remove(run_filename(self.tmpdir.name, 'abm', 1, 3))
+        results = Sweep({'num_takers': [10, 20]}, [3], self.tmpdir.name, config=self.config, processes=1,
+                        log=messages.append).run()
+        self.assertEqual([r['status'] for r in results], ['skipped', 'done'])
+
+    def _sweep(self, retries=1, processes=1, log=None, **behaviour):
+        sweep = DyingSweep({'num_takers': [10, 20]}, [3], self.tmpdir.name, config=self.config, processes=processes,
+                           retries=retries, log=log or (lambda msg: None))
+        vars(sweep).update(behaviour)
+        return sweep.run()
+
+    def test_broken_pool(self):
+        # the run that killed the pool fails; the run that had not started is not charged
+        results = self._sweep(retries=0, die=(0,))
+        self.assertEqual([r['status'] for r in results], ['failed', 'done'])
+        self.assertIn('BrokenProcessPool', results[0]['error'])
+        self.assertEqual(results[1]['attempts'], 1)
+        self.assertFalse(os.path.exists(results[0]['h5filename'] + RUNNING))
+        self.assertTrue(os.path.exists(self.path('abm_sweep.json')))
+        os.remove(results[1]['h5filename'])
+        results = self._sweep(die=(0,))
+        self.assertEqual([r['status'] for r in results], ['done', 'done'])
+        self.assertEqual([r['attempts'] for r in results], [2, 1])
+
+    def test_broken_pool_together(self):
+        # two runs in progress when the pool broke: neither is charged, both run again alone
+        results = self._sweep(retries=0, processes=2, die=(0,), hold=(1,))
+        self.assertEqual([r['status'] for r in results], ['done', 'done'])
+        self.assertEqual([r['attempts'] for r in results], [1, 1])
+
+    def test_failed_after_break(self):
+        # combo 0 fails and is resubmitted after combo 1 has killed the pool
+        def log(msg):
+            if msg.startswith('abm_000_3.h5 failed'):
+                time.sleep(1)
+        results = self._sweep(log=log, fail=(0,), die=(1,))
+        self.assertEqual([r['status'] for r in results], ['done', 'done'])
+        self.assertEqual([r['attempts'] for r in results], [2, 2])
@@ -3,8 +3,9 @@ import unittest
 
 import numpy as np
 
+from mmabm.orderbook import Fill
 from mmabm.shared import Side, OType
-from mmabm.trader import ZITrader, Provider, MarketMaker, PennyJumper, Taker, InformedTrader
+from mmabm.trader import ZITrader, Provider, MarketMaker, PennyJumper, Taker, InformedTrader, Schedule, make_schedule
 
 
 class TestTrader(unittest.TestCase):
@@ -99,6 +100,25 @@ class TestTrader(unittest.TestCase):
                     'side': Side.BID, 'price': 125}
         self.assertDictEqual(self.p1.local_book.get(trade2['order_id']), expected) 
     
+    def test_confirm_trades_local(self):
+        '''
+        confirm_trades_local confirms a batch of Fills as confirm_trade_local does one at a time
+        '''
+        fills = [Fill(2, 0, 1, 1, 2001, 1, 125, 1, Side.BID), Fill(2, 0, 2, 2, 2001, 1, 125, 2, Side.BID),
+                 Fill(3, 0, 2, 2, 2002, 1, 125, 1, Side.BID)]
+        for trader in (self.p1, self.m1):
+            twin = MarketMaker(3001, 1, 0.005, 0.05, 12, 60) if trader is self.m1 else Provider(1001, 1, 0.025, 0.0375)
+            for t in (trader, twin):
+                t.local_book = {1: dict(self.q1, trader_id=t.trader_id), 2: dict(self.q2, trader_id=t.trader_id)}
+            trader.confirm_trades_local(fills)
+            for f in fills:
+                twin.confirm_trade_local(f)
+            self.assertDictEqual(trader.local_book, twin.local_book)
+            self.assertEqual(trader.local_book[2]['quantity'], 2)
+        self.assertEqual(self.m1._position, 4)
+        self.assertEqual(self.m1._cash_flow, -500)
+        self.assertEqual(len(self.m1.cash_flow_collector), 3)
+        
     def test_choose_price_from_exp(self):
         sell_price = self.p1._choose_price_from_exp(Side.BID, 75000, -100)
         self.assertLess(sell_price, 75000)
@@ -165,6 +185,31 @@ class TestTrader(unittest.TestCase):
         self.p1.bulk_cancel(12)
         self.assertFalse(self.p1.cancel_collector)
 
+    def test_bulk_cancel_skip_Provider(self):
+        '''
+        Each order is cancelled with probability _delta, wherever it is in the local_book
+        '''
+        p2 = Provider(1002, 1, 0.025, 0.0375, random.Random(5), skip_cancel=True)
+        self.assertEqual(p2.bulk_cancel, p2._bulk_cancel_skip)
+        p2.bulk_cancel(1)
+        self.assertFalse(p2.cancel_collector)
+        p2._delta = 0.1
+        counts = [0] * 20
+        for _ in range(20000):
+            p2.local_book = {k: dict(self.q1, order_id=k, trader_id=1002) for k in range(20)}
+            p2.bulk_cancel(1)
+            for c in p2.cancel_collector:
+                counts[c['order_id']] += 1
+                self.assertNotIn(c['order_id'], p2.local_book)
+            self.assertEqual(len(p2.local_book) + len(p2.cancel_collector), 20)
+        for count in counts:
+            self.assertAlmostEqual(count / 20000, 0.1, delta=0.01)
+        p2._delta = 1
+        p2.local_book = {k: dict(self.q1, order_id=k, trader_id=1002) for k in range(20)}
+        p2.bulk_cancel(2)
+        self.assertFalse(p2.local_book)
+        self.assertEqual(len(p2.cancel_collector), 20)
+
 # MarketMaker tests
    
     def test_repr_MarketMaker(self):
@@ -454,3 +499,40 @@ class TestTrader(unittest.TestCase):
         self.assertEqual(q1['side'], self.i1._side)
         self.assertEqual(q1['price'], self.i1._price)
         self.assertEqual(q1['quantity'], 1)
+
+    def test_make_schedule(self):
+        '''
+        Non-overlapping runs inside [start, stop), sorted, with the same number of steps as the walk
+        '''
+        np.random.seed(11)
+        steps = make_schedule(40, 5, 20, 1000)
+        self.assertEqual(len(steps), 200)
+        self.assertEqual(len(set(steps.tolist())), 200)
+        self.assertTrue((np.diff(steps) > 0).all())
+        self.assertTrue(20 <= steps[0] and steps[-1] < 1000)
+        # each run is run_length consecutive steps
+        runs = steps.reshape(40, 5)
+        self.assertTrue((np.diff(runs, axis=1) == 1).all())
+        with self.assertRaises(ValueError):
+            make_schedule(40, 5, 20, 200)
+        i2 = InformedTrader(5002, 1, 250, 2, 20, 100000, schedule=True)
+        self.assertIsInstance(i2.delta_t, Schedule)
+        self.assertEqual(len(i2.delta_t), len(self.i1.delta_t))
+        for step in range(100000):
+            self.assertEqual(step in i2.delta_t, step in i2.delta_t.steps)
+        self.assertNotIn(100000, i2.delta_t)
+        self.assertNotIn(-1, i2.delta_t)
+
+    def test_schedule_marginals(self):
+        '''
+        The chance that a step is active is the same as with the walk, away from the ends
+        '''
+        random.seed(5)
+        np.random.seed(5)
+        walk = np.zeros(200)
+        schedule = np.zeros(200)
+        for _ in range(1000):
+            walk[list(InformedTrader(5002, 1, 30, 3, 20, 120).delta_t)] += 1
+            schedule[list(InformedTrader(5003, 1, 30, 3, 20, 120, schedule=True).delta_t)] += 1
+        self.assertEqual(walk.sum(), schedule.sum())
+        self.assertAlmostEqual(walk[40:100].mean() / 1000, schedule[40:100].mean() / 1000, delta=0.02)
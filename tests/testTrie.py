@@ -0,0 +1,79 @@
+import random
+import unittest
+
+import mmabm.checkpoint as checkpoint
+import mmabm.golden as golden
+
+from mmabm.config import Config
+from mmabm.genetics2 import Predictors
+from mmabm.rng import RandomStreams, GENETICS
+from mmabm.trie import ConditionTrie, IndexedPredictors
+
+from tests.helpers import RunnerTestCase
+
+
+class TestConditionTrie(unittest.TestCase):
+
+    def setUp(self):
+        self.predictors = Predictors(500, 12, 6, [0.2, 0.2, 0.6], 0.1, 0.2, 0.1, 0.02, 0.5, True, 'uf',
+                                     RandomStreams(5).stream(GENETICS))
+        self.rng = random.Random(5)
+        for c in self.predictors.predictors:
+            c.accuracy = self.rng.randrange(20)
+        self.trie = ConditionTrie(self.predictors.predictors)
+        self.states = [''.join(self.rng.choice('01') for _ in range(12)) for _ in range(200)]
+
+    def _linear(self, state):
+        return [c for c in self.predictors.predictors
+                if all(x == s or x == '2' for x, s in zip(c.condition, state))]
+
+    def test_match(self):
+        self.assertEqual(len(self.trie), len(self.predictors.predictors))
+        for state in self.states:
+            self.assertEqual(self.trie.match(state), self._linear(state))
+
+    def test_best(self):
+        for state in self.states:
+            self.predictors._match_state(state)
+            self.assertEqual(self.trie.best(state), self.predictors.current)
+            # a new minimum is found after update()
+            c = self.rng.choice(self._linear(state))
+            c.accuracy = -1
+            self.trie.update(c)
+            self.assertEqual(self.trie.best(state), [c])
+            c.accuracy = 30
+            self.trie.update(c)
+
+
+class TestIndexedPredictors(unittest.TestCase):
+
+    def test_same(self):
+        config = Config(oi_num_chroms=200, genetic_int=50)
+        self.assertIsNone(golden.compare_predictors(IndexedPredictors, config=config, steps=500))
+
+    def test_runner(self):
+        config = Config(oi_num_chroms=40, of_num_chroms=40, genetic_int=50)
+        self.assertIsNone(golden.compare_runners(golden.runner_class(predictors_class=IndexedPredictors),
+                                                 config=config, steps=300))
+        self.assertIsInstance(golden.runner_class()(config=config.replace(predictor_index=True)).marketmakers[0]._oi,
+                              IndexedPredictors)
+        with self.assertRaises(ValueError):
+            Config(predictor_index=True, cohort=True)
+
+
+class TestIndexedRunner(RunnerTestCase):
+
+    run_steps = 400
+    runner_kwargs = {'config': Config(seed=5, predictor_index=True, oi_num_chroms=40, of_num_chroms=40,
+                                      genetic_int=50)}
+
+    def test_checkpoint(self):
+        r1 = self.make_runner()
+        r1.prime()
+        r1.run_until(150)
+        r2 = checkpoint.loads(checkpoint.dumps(r1), truncate=False)
+        self.assertIsInstance(r2.marketmakers[0]._oi, IndexedPredictors)
+        r1.run_until(r1.run_steps)
+        r2.run_until(r2.run_steps)
+        self.assertEqual(r1.exchange.trade_book, r2.exchange.trade_book)
+        self.assertEqual(r1.marketmakers[0].cash_flow_collector, r2.marketmakers[0].cash_flow_collector)